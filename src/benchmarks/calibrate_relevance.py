@@ -0,0 +1,126 @@
+"""Calibrate the thresholds of the local relevance scorers.
+
+For every question of the RAG test cases, the chunks are retrieved from the
+configured index and graded by the LLM grader, which is the reference. Each
+local scorer then scores the same chunks, and every (low, high) threshold
+pair is evaluated:
+
+- recall: share of the chunks the LLM keeps that the local mode also keeps.
+- precision: share of the chunks the local mode keeps that the LLM keeps.
+- llm: share of the chunks sent to the LLM because they are borderline.
+
+The pair with the fewest LLM calls whose recall reaches ``--target-recall``
+is reported. Set it as ``relevance_low_threshold`` and
+``relevance_high_threshold`` in the RAG configuration. The defaults are
+uncalibrated placeholders, so the ``local`` grading mode stays off until
+this has been run for the index.
+
+Run from the ``src`` directory, with the credentials of the index and the
+LLM in the environment:
+
+    python -m benchmarks.calibrate_relevance
+    python -m benchmarks.calibrate_relevance --scorers lexical hybrid --provider pinecone --index-name edwards-sgc-testing
+"""
+
+import csv
+import json
+import asyncio
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from rag_agent.graph import get_embedding_model, get_retrieval_grader
+from rag_agent.grading import grade_concurrently
+from rag_agent.relevance import RelevanceScorerFactory
+from rag_agent.vector_stores.vectorial_db import VectorSearchFactory
+
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+RAG_TEST_CASES_PATH = SRC_DIR / "evaluators" / "llm" / "test_cases" / "rag_test_cases.csv"
+THRESHOLDS = np.round(np.arange(0, 1.0001, 0.05), 2)
+
+
+def load_questions(path: Path = RAG_TEST_CASES_PATH) -> list[str]:
+    with open(path, encoding="utf-8") as f:
+        return [row["Pregunta"].strip() for row in csv.DictReader(f) if row.get("Pregunta", "").strip()]
+
+
+def evaluate_thresholds(scores: np.ndarray, labels: np.ndarray, low: float, high: float) -> dict[str, float]:
+    """Recall, precision and LLM share of the local mode against the LLM labels."""
+    borderline = (scores >= low) & (scores < high)
+    # Borderline chunks are graded by the LLM, so they get the reference verdict
+    kept = (scores >= high) | (borderline & labels)
+    relevant = labels.sum()
+    return {
+        "low": float(low),
+        "high": float(high),
+        "recall": float((kept & labels).sum() / relevant) if relevant else 1.0,
+        "precision": float((kept & labels).sum() / kept.sum()) if kept.sum() else 1.0,
+        "llm": float(borderline.mean()) if len(scores) else 0.0,
+    }
+
+
+def calibrate(scores: np.ndarray, labels: np.ndarray, target_recall: float) -> tuple[dict, list[dict]]:
+    results = [
+        evaluate_thresholds(scores, labels, low, high)
+        for low in THRESHOLDS
+        for high in THRESHOLDS
+        if low <= high
+    ]
+    candidates = [result for result in results if result["recall"] >= target_recall]
+    best = min(candidates, key=lambda result: (result["llm"], -result["precision"]))
+    return best, results
+
+
+async def collect(questions: list[str], scorers: list[str], provider: str, index_name: str, concurrency: int):
+    """Retrieve, grade with the LLM and score locally the chunks of every question."""
+    embedding_model = get_embedding_model()
+    retriever = VectorSearchFactory.create_vectorial_instance(provider, index_name, embedding_model)
+    scorer_instances = {
+        name: RelevanceScorerFactory.create_scorer_instance(name, embedding_model)
+        for name in scorers
+    }
+
+    labels = []
+    scores = {name: [] for name in scorers}
+    for question in questions:
+        documents = await retriever.retrieve(question)
+        labels.extend(await grade_concurrently(get_retrieval_grader(), question, documents, concurrency))
+        for name, scorer in scorer_instances.items():
+            scores[name].extend((await scorer.ascore(question, documents)).tolist())
+        print(f"{len(documents)} chunks: {question}")
+    return np.array(labels, dtype=bool), {name: np.array(values) for name, values in scores.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the local relevance scorer thresholds")
+    parser.add_argument("--scorers", nargs="+", default=["lexical", "hybrid"], help="Local scorers to calibrate")
+    parser.add_argument("--provider", default="pinecone", help="Vector store provider")
+    parser.add_argument("--index-name", default="edwards-sgc-testing", help="Vector store index")
+    parser.add_argument("--test-cases", type=Path, default=RAG_TEST_CASES_PATH, help="CSV with a 'Pregunta' column")
+    parser.add_argument("--target-recall", type=float, default=0.95, help="Minimum recall against the LLM grader")
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM grader calls in flight")
+    parser.add_argument("--output", type=Path, help="Write the labels, scores and full threshold sweep as JSON")
+    args = parser.parse_args()
+
+    questions = load_questions(args.test_cases)
+    labels, scores = asyncio.run(collect(questions, args.scorers, args.provider, args.index_name, args.concurrency))
+    print(f"\n{len(labels)} chunks, {int(labels.sum())} graded relevant by the LLM\n")
+
+    report = {"labels": labels.tolist(), "scorers": {}}
+    for name, values in scores.items():
+        best, results = calibrate(values, labels, args.target_recall)
+        report["scorers"][name] = {"scores": values.tolist(), "best": best, "sweep": results}
+        print(
+            f"{name:<14} low={best['low']:.2f} high={best['high']:.2f} "
+            f"recall={best['recall']:.3f} precision={best['precision']:.3f} llm={best['llm']:.1%}"
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
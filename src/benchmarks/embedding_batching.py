@@ -0,0 +1,108 @@
+"""Throughput of query embedding with and without micro-batching.
+
+Every simulated user embeds ``--queries`` distinct questions one after the
+other, at 1, 10 and 100 concurrent users. Each level runs twice: once
+calling the model directly and once through ``MicroBatchingEmbeddings``.
+Queries per second, mean latency and the number of embedding requests sent
+are reported.
+
+By default the embedding service is simulated: each request costs
+``--request-ms`` plus ``--text-ms`` per text and at most ``--max-in-flight``
+requests run at once, like a rate-limited deployment. With ``--model`` the
+real deployment is used (without the embedding cache, so every query is
+embedded).
+
+Run from the ``src`` directory:
+
+    python -m benchmarks.embedding_batching
+    python -m benchmarks.embedding_batching --model azure_openai:embedding-test --queries 5
+"""
+
+import time
+import asyncio
+import argparse
+import statistics
+
+from langchain.embeddings import init_embeddings
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from common.embedding_batcher import MicroBatchingEmbeddings, MAX_BATCH_SIZE, MAX_WAIT_MS
+
+
+class SimulatedEmbeddings(Embeddings):
+    """Fake embedding service with a per-request and per-text cost and limited concurrency."""
+
+    def __init__(self, request_ms: float, text_ms: float, max_in_flight: int):
+        self.request_ms = request_ms
+        self.text_ms = text_ms
+        self.max_in_flight = max_in_flight
+        self.fake = DeterministicFakeEmbedding(size=1536)
+        self.requests = 0
+        self._semaphore = None
+
+    def embed_documents(self, texts):
+        return self.fake.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.fake.embed_query(text)
+
+    async def aembed_documents(self, texts):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        async with self._semaphore:
+            self.requests += 1
+            await asyncio.sleep((self.request_ms + self.text_ms * len(texts)) / 1000)
+        return self.fake.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+
+async def run_users(embeddings: Embeddings, users: int, queries: int) -> tuple[float, list[float]]:
+    latencies = []
+
+    async def user(user_id: int):
+        for i in range(queries):
+            started_at = time.perf_counter()
+            await embeddings.aembed_query(f"Pregunta {i} del usuario {user_id}")
+            latencies.append((time.perf_counter() - started_at) * 1000)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*[user(user_id) for user_id in range(users)])
+    return time.perf_counter() - started_at, latencies
+
+
+async def main(args):
+    print(f"max batch size {args.max_batch_size}, max wait {args.max_wait_ms} ms\n")
+    print(f"{'users':>5} {'mode':<8} {'queries/s':>10} {'mean ms':>9} {'p95 ms':>8} {'requests':>9}")
+    for users in args.users:
+        for mode in ("direct", "batched"):
+            if args.model:
+                base = init_embeddings(args.model)
+            else:
+                base = SimulatedEmbeddings(args.request_ms, args.text_ms, args.max_in_flight)
+            embeddings = base if mode == "direct" else MicroBatchingEmbeddings(base, args.max_batch_size, args.max_wait_ms)
+
+            elapsed, latencies = await run_users(embeddings, users, args.queries)
+            if mode == "batched":
+                requests = embeddings.stats["requests"]
+            else:
+                requests = getattr(base, "requests", len(latencies))
+            p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+            print(
+                f"{users:>5} {mode:<8} {len(latencies) / elapsed:>10.1f} "
+                f"{statistics.mean(latencies):>9.1f} {p95:>8.1f} {requests:>9}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding micro-batching benchmark")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 10, 100], help="Concurrent users levels")
+    parser.add_argument("--queries", type=int, default=20, help="Queries per user")
+    parser.add_argument("--model", help="Benchmark a real embedding model instead of the simulated one")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--request-ms", type=float, default=40, help="Simulated cost of a request")
+    parser.add_argument("--text-ms", type=float, default=0.5, help="Simulated cost of each text of a request")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="Simulated concurrent requests limit")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+"""Measure the import cost of the graph modules.
+
+Each module is imported in a fresh interpreter with ``-X importtime`` so the
+numbers don't depend on what was imported before. For every module the total
+cumulative import time is reported, followed by its most expensive imports.
+
+Run from the ``src`` directory:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --modules supervisor.graph rag_agent.graph --top 15
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_MODULES = [
+    "supervisor.graph",
+    "supervisor.router",
+    "rag_agent.graph",
+    "sql_agent.bigquery_graph",
+    "transaction_agent.graph",
+    "memory_graph.graph",
+]
+
+
+def measure_import(module: str) -> tuple[int, list[tuple[int, int, str]]]:
+    """
+    Import ``module`` in a subprocess and parse the ``-X importtime`` report.
+
+    Returns the cumulative import time of the module in microseconds and the
+    (self, cumulative, name) entries of every module imported along the way.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        env={**os.environ, "PYTHONPATH": str(SRC_DIR)},
+        capture_output=True,
+        text=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((int(self_us), int(cumulative_us), name.rstrip()))
+
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+        raise RuntimeError(f"Importing {module} failed: {error}")
+
+    total = next((cumulative for _, cumulative, name in entries if name.strip() == module), 0)
+    return total, entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-module import time benchmark")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--top", type=int, default=10, help="Number of most expensive imports to show per module")
+    args = parser.parse_args()
+
+    summary = []
+    for module in args.modules:
+        try:
+            total, entries = measure_import(module)
+        except RuntimeError as e:
+            print(f"{module}: {e}\n")
+            summary.append((module, None))
+            continue
+
+        summary.append((module, total))
+        print(f"{module}: {total / 1000:.1f} ms")
+        for self_us, cumulative_us, name in sorted(entries, key=lambda entry: entry[0], reverse=True)[:args.top]:
+            print(f"    self {self_us / 1000:8.1f} ms | cumulative {cumulative_us / 1000:8.1f} ms | {name.strip()}")
+        print()
+
+    print("Summary")
+    for module, total in summary:
+        print(f"    {module:<30} {'failed' if total is None else f'{total / 1000:.1f} ms'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Memory footprint, latency and recall of the in-memory provider per quantization level.
+
+Builds an ``InMemoryIndex`` of ``--vectors`` synthetic embeddings for each
+quantization level and runs ``--queries`` searches against it. The vectors
+are clustered like real embeddings of a document collection, and every query
+is a perturbed copy of a stored vector. Recall@k is measured against the
+exact float32 results.
+
+Run from the ``src`` directory:
+
+    python -m benchmarks.in_memory_quantization
+    python -m benchmarks.in_memory_quantization --vectors 100000 --dimension 3072
+"""
+
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+from rag_agent.document import Document
+from rag_agent.vector_stores.in_memory_vector_search import InMemoryIndex, QUANTIZATIONS
+
+
+def synthetic_embeddings(rng: np.random.Generator, count: int, dimension: int, clusters: int = 64) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dimension), dtype=np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, dimension), dtype=np.float32)
+    return vectors
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    vectors = synthetic_embeddings(rng, args.vectors, args.dimension)
+    documents = [Document(f"chunk {i}", f"file_{i % 100}.pdf", "") for i in range(args.vectors)]
+    queries = vectors[rng.integers(0, args.vectors, args.queries)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape, dtype=np.float32)
+
+    exact = None
+    print(f"{args.vectors} vectors of dimension {args.dimension}, {args.queries} queries, k={args.k}\n")
+    print(f"{'quantization':<13} {'footprint MB':>13} {'build ms':>9} {'mean ms':>8} {'p95 ms':>7} {'recall@k':>9}")
+    for quantization in QUANTIZATIONS:
+        index = InMemoryIndex(quantization)
+        started_at = time.perf_counter()
+        index.add(documents, vectors)
+        build_ms = (time.perf_counter() - started_at) * 1000
+
+        latencies, results = [], []
+        for query in queries:
+            started_at = time.perf_counter()
+            hits = index.search(query, args.k)
+            latencies.append((time.perf_counter() - started_at) * 1000)
+            results.append({document.content for document, _ in hits})
+        if exact is None:
+            exact = results
+        recall = statistics.mean(len(found & expected) / len(expected) for found, expected in zip(results, exact))
+        p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+        print(
+            f"{quantization:<13} {index.memory_footprint() / 2**20:>13.1f} {build_ms:>9.1f} "
+            f"{statistics.mean(latencies):>8.2f} {p95:>7.2f} {recall:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-memory vector provider quantization benchmark")
+    parser.add_argument("--vectors", type=int, default=20000, help="Number of stored vectors")
+    parser.add_argument("--dimension", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Number of searches per level")
+    parser.add_argument("--k", type=int, default=4, help="Documents retrieved per search")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,100 @@
+"""Micro-batching front-end for the embedding models.
+
+Under concurrent load every request embeds its own question with a separate
+HTTP call. ``MicroBatchingEmbeddings`` collects the ``aembed_query`` calls
+that arrive within ``max_wait_ms`` of each other (or until ``max_batch_size``
+texts are waiting) and sends them as one ``aembed_documents`` request, then
+hands each caller its vector.
+
+OpenAI embedding models return the same vector for a text whether it comes
+through ``embed_query`` or ``embed_documents``, so batching doesn't change
+the results.
+"""
+
+import os
+import asyncio
+import weakref
+
+from langchain_core.embeddings import Embeddings
+
+
+MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+
+
+class _Batch:
+    def __init__(self):
+        self.texts: list[str] = []
+        self.futures: list[asyncio.Future] = []
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """Embedding model wrapper that coalesces concurrent single-text requests."""
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        # Pending batch of each event loop
+        self._batches: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Batch]" = weakref.WeakKeyDictionary()
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"queries": 0, "requests": 0}
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(loop)
+        if batch is None:
+            batch = self._batches[loop] = _Batch()
+            batch.timer = loop.call_later(self.max_wait_ms / 1000, self._flush, loop)
+
+        future = loop.create_future()
+        batch.texts.append(text)
+        batch.futures.append(future)
+        self.stats["queries"] += 1
+        if len(batch.texts) >= self.max_batch_size:
+            self._flush(loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        batch = self._batches.pop(loop, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        self.stats["requests"] += 1
+        task = loop.create_task(self._embed_batch(batch))
+        # Keep a reference so the task isn't garbage collected while running
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _embed_batch(self, batch: _Batch) -> None:
+        try:
+            vectors = await self.embeddings.aembed_documents(batch.texts)
+            if len(vectors) != len(batch.texts):
+                # The vectors can't be matched to their texts, fail every caller instead of leaving some waiting
+                raise ValueError(f"The embedding model returned {len(vectors)} vectors for {len(batch.texts)} texts.")
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, vector in zip(batch.futures, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def batching_stats(self) -> dict[str, float]:
+        """Queries received, embedding requests sent and mean batch size."""
+        return {
+            **self.stats,
+            "mean_batch_size": round(self.stats["queries"] / self.stats["requests"], 2) if self.stats["requests"] else 0.0,
+        }
@@ -0,0 +1,261 @@
+"""Two-tier cache for the embedding models.
+
+The same texts are embedded over and over (questions by the vector stores,
+the SQL few-shot examples on every ``query_gen``, store searches in the help
+node...). ``CachedEmbeddings`` wraps an embedding model and looks the
+vectors up by model and normalized text:
+
+1. An in-memory LRU of ``EMBEDDING_CACHE_MEMORY_SIZE`` vectors.
+2. A SQLite file shared by the processes of the host, trimmed to
+   ``EMBEDDING_CACHE_DISK_ROWS`` vectors, least recently used first.
+
+The vectors of a model are dropped when its version changes. The version is
+the ``EMBEDDING_MODEL_VERSION`` setting, to be bumped when the deployment
+behind a model name is replaced.
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import functools
+import unicodedata
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+logger = logging.getLogger("embeddings")
+
+CACHE_PATH = Path(os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3"))
+MEMORY_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "4096"))
+DISK_CACHE_ROWS = int(os.getenv("EMBEDDING_CACHE_DISK_ROWS", "200000"))
+EMBEDDING_MODEL_VERSION = os.getenv("EMBEDDING_MODEL_VERSION", "1")
+# The disk tier is trimmed every this many writes
+EVICTION_INTERVAL = 500
+
+
+def normalize_for_cache(text: str) -> str:
+    """Unicode-normalize the text and collapse whitespace; case is kept, it changes the embedding."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_for_cache(text)}".encode("utf-8")).hexdigest()
+
+
+class SQLiteEmbeddingStore:
+    """Disk tier: vectors as float32 blobs in a SQLite file, evicted by last use."""
+
+    def __init__(self, path: Path = CACHE_PATH, max_rows: int = DISK_CACHE_ROWS):
+        self.path = Path(path)
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS models (model TEXT PRIMARY KEY, version TEXT NOT NULL)")
+
+    def check_version(self, model: str, version: str) -> None:
+        """Drop the vectors of ``model`` if they were computed by another version of it."""
+        with self._lock, self._connection:
+            row = self._connection.execute("SELECT version FROM models WHERE model = ?", (model,)).fetchone()
+            if row is not None and row[0] == version:
+                return
+            if row is not None:
+                deleted = self._connection.execute("DELETE FROM embeddings WHERE model = ?", (model,)).rowcount
+                logger.info("Embedding model %s changed version %s -> %s, dropped %d cached vectors", model, row[0], version, deleted)
+            self._connection.execute("INSERT OR REPLACE INTO models (model, version) VALUES (?, ?)", (model, version))
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        # Bounded number of SQL parameters per statement
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock, self._connection:
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                if rows:
+                    self._connection.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time(), *(key for key, _ in rows)],
+                    )
+            found.update((key, np.frombuffer(vector, dtype=np.float32).tolist()) for key, vector in rows)
+        return found
+
+    def put_many(self, model: str, items: dict[str, list[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(key, model, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()],
+            )
+            self._writes += len(items)
+            if self._writes >= EVICTION_INTERVAL:
+                self._writes = 0
+                self._evict()
+
+    def _evict(self) -> None:
+        rows = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if rows > self.max_rows:
+            self._connection.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (rows - self.max_rows,),
+            )
+
+
+@functools.lru_cache(maxsize=1)
+def get_disk_store() -> Optional[SQLiteEmbeddingStore]:
+    """Shared disk tier, or None (memory only) if the file can't be opened."""
+    try:
+        return SQLiteEmbeddingStore()
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Embedding disk cache disabled, %s can't be opened: %s", CACHE_PATH, e)
+        return None
+
+
+class CachedEmbeddings(Embeddings):
+    """Embedding model wrapper that serves repeated texts from the cache tiers."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: str,
+        version: str = EMBEDDING_MODEL_VERSION,
+        memory_size: int = MEMORY_CACHE_SIZE,
+        disk_store: Optional[SQLiteEmbeddingStore] = None,
+    ):
+        self.embeddings = embeddings
+        self.model = model
+        # The version is part of the key so processes still on the old version can't serve stale vectors
+        self.key_prefix = f"{model}@{version}"
+        self.memory_size = memory_size
+        self.disk_store = disk_store
+        self._memory: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        if self.disk_store is not None:
+            self.disk_store.check_version(model, version)
+
+    def _memory_get(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+        return found
+
+    def _memory_put(self, items: dict[str, list[float]]) -> None:
+        with self._lock:
+            for key, vector in items.items():
+                self._memory[key] = vector
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, keys: list[str]) -> dict[str, list[float]]:
+        """Vectors of ``keys`` found in the memory tier, then in the disk tier."""
+        found = self._memory_get(keys)
+        self.stats["memory_hits"] += len(found)
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing and self.disk_store is not None:
+            from_disk = self.disk_store.get_many(missing)
+            self.stats["disk_hits"] += len(from_disk)
+            self._memory_put(from_disk)
+            found.update(from_disk)
+        return found
+
+    def _store(self, items: dict[str, list[float]]) -> None:
+        self._memory_put(items)
+        if self.disk_store is not None:
+            self.disk_store.put_many(self.model, items)
+
+    def _missing_texts(self, texts: list[str], keys: list[str], found: dict) -> dict[str, str]:
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        self.stats["misses"] += len(missing)
+        return missing
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [cache_key(self.key_prefix, text) for text in texts]
+        found = self._lookup(keys)
+        missing = self._missing_texts(texts, keys, found)
+        if missing:
+            computed = dict(zip(missing, self.embeddings.embed_documents(list(missing.values()))))
+            self._store(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [cache_key(self.key_prefix, text) for text in texts]
+        found = self._memory_get(keys)
+        if len(found) == len(set(keys)):
+            self.stats["memory_hits"] += len(found)
+            return [found[key] for key in keys]
+        # The disk tier blocks, keep it off the event loop
+        found = await asyncio.to_thread(self._lookup, keys)
+        missing = self._missing_texts(texts, keys, found)
+        if missing:
+            computed = dict(zip(missing, await self.embeddings.aembed_documents(list(missing.values()))))
+            await asyncio.to_thread(self._store, computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        key = cache_key(self.key_prefix, text)
+        found = self._lookup([key])
+        if key not in found:
+            self.stats["misses"] += 1
+            found[key] = self.embeddings.embed_query(text)
+            self._store({key: found[key]})
+        return found[key]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = cache_key(self.key_prefix, text)
+        found = self._memory_get([key])
+        if key in found:
+            self.stats["memory_hits"] += 1
+            return found[key]
+        found = await asyncio.to_thread(self._lookup, [key])
+        if key not in found:
+            self.stats["misses"] += 1
+            found[key] = await self.embeddings.aembed_query(text)
+            await asyncio.to_thread(self._store, {key: found[key]})
+        return found[key]
+
+    def cache_stats(self) -> dict[str, float]:
+        """Hit counters per tier and overall hit rate."""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "memory_size": len(self._memory),
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+        }
+
+
+STORE_EMBEDDING_MODEL = "azure_openai:embedding-test"
+
+
+async def aembed_texts(texts: list[str]) -> list[list[float]]:
+    """Embedding function of the LangGraph store index (see ``langgraph.json``)."""
+    from common.models import get_embeddings
+
+    return await get_embeddings(STORE_EMBEDDING_MODEL).aembed_documents(texts)
@@ -0,0 +1,183 @@
+"""Shared HTTP connection pools for the LLM and embedding clients.
+
+Every model handle talking to the same endpoint reuses one tuned httpx
+client, with keep-alive and HTTP/2, instead of each SDK client opening its
+own pool. The pools count requests, new connections and the time requests
+wait for a connection, so ``pool_stats()`` can be used to size them for the
+expected concurrency.
+"""
+
+import os
+import time
+import functools
+import importlib.util
+from dataclasses import dataclass, asdict
+
+import httpx
+
+from common.scheduler import RateLimitRetryTransport, SyncRateLimitRetryTransport
+
+
+MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "50"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))  # Seconds
+TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+# HTTP/2 multiplexes the requests over few connections, it needs the h2 package
+HTTP2 = importlib.util.find_spec("h2") is not None
+# Connection acquisitions slower than this count as waits
+WAIT_THRESHOLD_MS = 1.0
+
+
+@dataclass
+class PoolStats:
+    requests: int = 0
+    new_connections: int = 0
+    waits: int = 0
+    wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+
+class _PoolCounter:
+    """Request, connection and wait counters of a pool."""
+
+    def __init__(self):
+        self.stats = PoolStats()
+
+    def start(self) -> None:
+        self.stats.requests += 1
+        self.stats.in_flight += 1
+        self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+
+    def end(self) -> None:
+        self.stats.in_flight -= 1
+
+    def tracer(self):
+        """
+        httpcore trace callback of one request. The pool emits no event of its
+        own, but the first event of a request comes from the connection it was
+        given, so the time until then is the time spent waiting for one.
+        """
+        started_at = time.perf_counter()
+        acquired = False
+
+        def trace(event_name: str, info: dict) -> None:
+            nonlocal acquired
+            if not acquired:
+                acquired = True
+                self._acquired((time.perf_counter() - started_at) * 1000)
+            if event_name == "connection.connect_tcp.complete":
+                self.stats.new_connections += 1
+
+        return trace
+
+    def atracer(self):
+        trace = self.tracer()
+
+        async def atrace(event_name: str, info: dict) -> None:
+            trace(event_name, info)
+
+        return atrace
+
+    def _acquired(self, wait_ms: float) -> None:
+        self.stats.wait_ms += wait_ms
+        self.stats.max_wait_ms = max(self.stats.max_wait_ms, wait_ms)
+        if wait_ms >= WAIT_THRESHOLD_MS:
+            self.stats.waits += 1
+
+
+class CountingAsyncTransport(httpx.AsyncHTTPTransport):
+    """httpx transport that records pool statistics."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.counter = _PoolCounter()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.counter.start()
+        request.extensions["trace"] = self.counter.atracer()
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self.counter.end()
+
+    def open_connections(self) -> tuple[int, int]:
+        connections = self._pool.connections
+        return len(connections), sum(connection.is_idle() for connection in connections)
+
+
+class CountingTransport(httpx.HTTPTransport):
+    """Sync counterpart of ``CountingAsyncTransport``."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.counter = _PoolCounter()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.counter.start()
+        request.extensions["trace"] = self.counter.tracer()
+        try:
+            return super().handle_request(request)
+        finally:
+            self.counter.end()
+
+    def open_connections(self) -> tuple[int, int]:
+        connections = self._pool.connections
+        return len(connections), sum(connection.is_idle() for connection in connections)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+_async_transports: dict[str, CountingAsyncTransport] = {}
+_sync_transports: dict[str, CountingTransport] = {}
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_client(endpoint: str) -> httpx.AsyncClient:
+    """Return the shared async client of ``endpoint``."""
+    transport = CountingAsyncTransport(http2=HTTP2, limits=_limits())
+    _async_transports[endpoint] = transport
+    return httpx.AsyncClient(transport=RateLimitRetryTransport(transport), timeout=TIMEOUT)
+
+
+@functools.lru_cache(maxsize=None)
+def get_client(endpoint: str) -> httpx.Client:
+    """Return the shared sync client of ``endpoint``."""
+    transport = CountingTransport(http2=HTTP2, limits=_limits())
+    _sync_transports[endpoint] = transport
+    return httpx.Client(transport=SyncRateLimitRetryTransport(transport), timeout=TIMEOUT)
+
+
+def pool_stats() -> dict[str, dict]:
+    """
+    Statistics of every pool, keyed by ``"<endpoint> (async|sync)"``.
+
+    ``reuse_ratio`` is the share of requests served on an already open
+    connection. ``waits`` counts the requests that waited at least
+    ``WAIT_THRESHOLD_MS`` for a connection (all busy, including with streamed
+    responses), ``wait_ms`` and ``max_wait_ms`` their total and longest wait.
+    ``in_flight`` counts requests until their response headers arrive.
+    """
+    stats = {}
+    for kind, transports in (("async", _async_transports), ("sync", _sync_transports)):
+        for endpoint, transport in list(transports.items()):
+            pool = transport.counter.stats
+            open_connections, idle_connections = transport.open_connections()
+            stats[f"{endpoint} ({kind})"] = {
+                **asdict(pool),
+                "wait_ms": round(pool.wait_ms, 1),
+                "max_wait_ms": round(pool.max_wait_ms, 1),
+                "open_connections": open_connections,
+                "idle_connections": idle_connections,
+                "reuse_ratio": round(1 - pool.new_connections / pool.requests, 3) if pool.requests else None,
+                "http2": HTTP2,
+            }
+    return stats
@@ -0,0 +1,78 @@
+"""Shared chat model and embedding clients.
+
+Models are built on first use and memoized, so modules don't create clients
+at import time and identical configurations share one instance. Clients of
+the same endpoint share one pooled HTTP client (see ``common.http_pool``).
+
+Every model is admitted through the process-wide scheduler of
+``common.scheduler``: requests wait for their deployment's rpm/tpm quota in
+priority order and 429 responses are retried with backoff.
+"""
+
+import os
+import functools
+
+from langchain.chat_models import init_chat_model
+from langchain.embeddings import init_embeddings
+
+from common.embedding_batcher import MicroBatchingEmbeddings
+from common.embedding_cache import CachedEmbeddings, get_disk_store
+from common.http_pool import get_async_client, get_client
+from common.scheduler import INTERACTIVE, scheduler
+
+
+# Providers whose clients accept a shared httpx client, with the env var holding their endpoint
+HTTP_POOL_ENDPOINTS = {
+    "azure_openai": "AZURE_OPENAI_ENDPOINT",
+    "openai": "OPENAI_BASE_URL",
+}
+
+
+def deployment_name(model: str) -> str:
+    """Deployment of a ``provider:model`` string, e.g. ``"gpt-4.1"`` for ``"azure_openai:gpt-4.1"``."""
+    return model.split(":", 1)[-1]
+
+
+def http_clients(model: str) -> dict:
+    """Shared pooled clients for the endpoint of ``model`` and their settings, empty if its provider doesn't take them."""
+    provider = model.split(":", 1)[0] if ":" in model else "openai"
+    if provider not in HTTP_POOL_ENDPOINTS:
+        return {}
+    endpoint = os.getenv(HTTP_POOL_ENDPOINTS[provider]) or provider
+    return {
+        "http_async_client": get_async_client(endpoint),
+        "http_client": get_client(endpoint),
+        # The pooled clients' transport retries (see common.scheduler), SDK retries would multiply them
+        "max_retries": 0,
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def get_chat_model(model: str, temperature: float = 0, tags: tuple[str, ...] = (), priority: int = INTERACTIVE):
+    """
+    Return the chat model for ``model`` (e.g. ``"azure_openai:gpt-4.1"``).
+
+    ``priority`` is the scheduler class of the model's requests: interactive
+    turns go first, background work (memory extraction, evaluators) waits
+    and leaves part of the quota free.
+    """
+    deployment = deployment_name(model)
+    return init_chat_model(
+        model,
+        temperature=temperature,
+        tags=list(tags) or None,
+        rate_limiter=scheduler.rate_limiter(deployment, priority),
+        callbacks=[scheduler.usage_callback(deployment)],
+        **http_clients(model),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_embeddings(model: str):
+    """
+    Return the embedding model for ``model`` (e.g. ``"azure_openai:embedding-test"``),
+    behind the two-tier embedding cache and the micro-batching front-end.
+    """
+    # Cache misses of concurrent requests are coalesced into one embedding request
+    embeddings = MicroBatchingEmbeddings(init_embeddings(model, **http_clients(model)))
+    return CachedEmbeddings(embeddings, model, disk_store=get_disk_store())
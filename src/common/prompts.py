@@ -0,0 +1,140 @@
+"""Registry of the chat prompts used by the agents.
+
+Prompts are vendored in the ``*/prompts/`` modules (including the LangChain
+Hub ones, so nothing is fetched at runtime), pinned by version and compiled
+into ``ChatPromptTemplate`` objects once per process.
+
+To update a prompt, add its new version to ``PROMPTS`` and pin it in
+``PROMPT_VERSIONS``; the previous version stays available for comparison.
+
+The SQL query generation prompt isn't registered: it's a ``FewShotPromptTemplate``
+assembled by each SQL graph from the examples of ``sql_agent_few_shot``.
+"""
+
+import functools
+from typing import Optional
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from rag_agent.prompts.adaptative_rag_agent_prompt import (
+    RAG_GENERATION_PROMPT,
+    GRADE_DOCUMENTS_PROMPT,
+    GRADE_DOCUMENTS_HUMAN_PROMPT,
+    GRADE_DOCUMENTS_BATCH_PROMPT,
+    GRADE_DOCUMENTS_BATCH_HUMAN_PROMPT,
+    GRADE_HALLUCINATIONS_PROMPT,
+    GRADE_HALLUCINATIONS_HUMAN_PROMPT,
+    GRADE_ANSWER_PROMPT,
+    GRADE_ANSWER_HUMAN_PROMPT,
+    TRANSFORM_QUERY_PROMPT,
+    TRANSFORM_QUERY_HUMAN_PROMPT,
+    MULTI_QUERY_PROMPT,
+    MULTI_QUERY_HUMAN_PROMPT,
+    GRADE_GENERATION_PROMPT,
+    GRADE_GENERATION_HUMAN_PROMPT,
+)
+from sql_agent.prompts.sql_agent_prompt import QUERY_CHECK_SYSTEM, GENERATE_MSG_SYSTEM
+from supervisor.prompts.edwards_prompt import EDWARDS_BASE_PROMPT
+from supervisor.prompts.supervisor_prompt import SUPERVISOR_PROMPT_TEMPLATE, SUPERVISOR_TARGETS_PROMPT_TEMPLATE
+from supervisor.prompts.rags_supervisor_prompt import RAGS_SUPERVISOR_PROMPT_TEMPLATE
+from supervisor.prompts.clickup_supervisor_prompt import CLICKUP_SUPERVISOR_PROMPT_TEMPLATE
+from supervisor.prompts.summary_prompt import SUMMARY_PROMPT_TEMPLATE
+from transaction_agent.prompts.clickup_agent_prompt import QMS_ASSISTANT_PROMPT, HRM_ASSISTANT_PROMPT
+
+
+# Messages of every prompt version, by prompt name
+PROMPTS = {
+    "rag/generate": {
+        # Vendored from the LangChain Hub "rlm/rag-prompt"
+        "rlm/rag-prompt": [("human", RAG_GENERATION_PROMPT)],
+    },
+    "rag/grade_documents": {
+        "v1": [("system", GRADE_DOCUMENTS_PROMPT), ("human", GRADE_DOCUMENTS_HUMAN_PROMPT)],
+    },
+    "rag/grade_documents_batch": {
+        "v1": [("system", GRADE_DOCUMENTS_BATCH_PROMPT), ("human", GRADE_DOCUMENTS_BATCH_HUMAN_PROMPT)],
+    },
+    "rag/grade_hallucinations": {
+        "v1": [("system", GRADE_HALLUCINATIONS_PROMPT), ("human", GRADE_HALLUCINATIONS_HUMAN_PROMPT)],
+    },
+    "rag/grade_answer": {
+        "v1": [("system", GRADE_ANSWER_PROMPT), ("human", GRADE_ANSWER_HUMAN_PROMPT)],
+    },
+    "rag/grade_generation": {
+        "v1": [("system", GRADE_GENERATION_PROMPT), ("human", GRADE_GENERATION_HUMAN_PROMPT)],
+    },
+    "rag/transform_query": {
+        "v1": [("system", TRANSFORM_QUERY_PROMPT), ("human", TRANSFORM_QUERY_HUMAN_PROMPT)],
+    },
+    "rag/multi_query": {
+        "v1": [("system", MULTI_QUERY_PROMPT), ("human", MULTI_QUERY_HUMAN_PROMPT)],
+    },
+    "sql/query_check": {
+        "v1": [("system", QUERY_CHECK_SYSTEM), ("placeholder", "{messages}")],
+    },
+    "sql/generate_msg": {
+        "v1": [("system", GENERATE_MSG_SYSTEM), ("placeholder", "{messages}")],
+    },
+    "supervisor/route": {
+        "v1": [("system", SUPERVISOR_PROMPT_TEMPLATE + SUPERVISOR_TARGETS_PROMPT_TEMPLATE), ("placeholder", "{messages}")],
+    },
+    "supervisor/route_rag": {
+        "v1": [("system", RAGS_SUPERVISOR_PROMPT_TEMPLATE), ("placeholder", "{messages}")],
+    },
+    "supervisor/route_clickup": {
+        "v1": [("system", CLICKUP_SUPERVISOR_PROMPT_TEMPLATE), ("placeholder", "{messages}")],
+    },
+    "supervisor/help": {
+        "v1": [("system", EDWARDS_BASE_PROMPT), ("placeholder", "{messages}")],
+    },
+    "supervisor/summary": {
+        "v1": [("human", SUMMARY_PROMPT_TEMPLATE)],
+    },
+    "clickup/qms": {
+        "v1": [("system", QMS_ASSISTANT_PROMPT), ("placeholder", "{messages}")],
+    },
+    "clickup/hrm": {
+        "v1": [("system", HRM_ASSISTANT_PROMPT), ("placeholder", "{messages}")],
+    },
+}
+
+# Version used of each prompt
+PROMPT_VERSIONS = {
+    "rag/generate": "rlm/rag-prompt",
+    "rag/grade_documents": "v1",
+    "rag/grade_documents_batch": "v1",
+    "rag/grade_hallucinations": "v1",
+    "rag/grade_answer": "v1",
+    "rag/grade_generation": "v1",
+    "rag/transform_query": "v1",
+    "rag/multi_query": "v1",
+    "sql/query_check": "v1",
+    "sql/generate_msg": "v1",
+    "supervisor/route": "v1",
+    "supervisor/route_rag": "v1",
+    "supervisor/route_clickup": "v1",
+    "supervisor/help": "v1",
+    "supervisor/summary": "v1",
+    "clickup/qms": "v1",
+    "clickup/hrm": "v1",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_prompt(name: str, version: Optional[str] = None) -> ChatPromptTemplate:
+    """Return the compiled prompt ``name`` at ``version``, the pinned one by default."""
+    try:
+        versions = PROMPTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown prompt '{name}'.")
+    version = version or PROMPT_VERSIONS[name]
+    try:
+        messages = versions[version]
+    except KeyError:
+        raise ValueError(f"Unknown version '{version}' of prompt '{name}'.")
+    return ChatPromptTemplate.from_messages(messages)
+
+
+def load_prompts() -> dict[str, ChatPromptTemplate]:
+    """Compile every pinned prompt, e.g. at startup to fail fast on a broken template."""
+    return {name: get_prompt(name) for name in PROMPT_VERSIONS}
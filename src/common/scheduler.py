@@ -0,0 +1,341 @@
+"""Process-wide LLM scheduler shared by every agent.
+
+All chat models of the process draw from one token bucket per Azure OpenAI
+deployment (requests per minute and tokens per minute), so they are
+coordinated against the deployment quotas instead of competing blindly.
+
+Requests are served by priority class. Background classes must also leave
+part of the bucket free, so memory extraction or evaluation runs can't
+drain the quota that interactive turns need. When the service answers with
+a 429 the deployment is paused for everyone, with exponential backoff and
+jitter, and the request is retried. The SDK clients don't retry on their
+own (``max_retries=0``), so a request is retried at most ``MAX_RETRIES``
+times in total.
+"""
+
+import os
+import re
+import json
+import time
+import heapq
+import random
+import asyncio
+import logging
+import itertools
+import threading
+from typing import Any, Optional
+from dataclasses import dataclass
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.rate_limiters import BaseRateLimiter
+
+
+logger = logging.getLogger("scheduler")
+
+# Priority classes, lower runs first
+INTERACTIVE = 0
+BACKGROUND = 1
+BATCH = 2
+
+# Fraction of each bucket a priority class must leave free for the classes above it
+PRIORITY_RESERVE = {
+    INTERACTIVE: 0.0,
+    BACKGROUND: 0.25,
+    BATCH: 0.5,
+}
+
+
+@dataclass
+class Quota:
+    """Requests and tokens per minute allowed for a deployment."""
+    rpm: int
+    tpm: int
+
+
+DEFAULT_QUOTA = Quota(
+    rpm=int(os.getenv("LLM_DEFAULT_RPM", "300")),
+    tpm=int(os.getenv("LLM_DEFAULT_TPM", "50000")),
+)
+
+# Per-deployment quotas, can be overridden with LLM_QUOTAS='{"gpt-4.1": {"rpm": 60, "tpm": 30000}}'
+DEPLOYMENT_QUOTAS = {
+    "gpt-4.1": Quota(rpm=300, tpm=50000),
+    "gpt-4.1-mini": Quota(rpm=600, tpm=200000),
+    "embedding-test": Quota(rpm=600, tpm=350000),
+    **{
+        deployment: Quota(**quota)
+        for deployment, quota in json.loads(os.getenv("LLM_QUOTAS", "{}")).items()
+    },
+}
+
+POLL_INTERVAL = 0.05  # Seconds between admission checks of a waiting request
+MAX_RETRIES = 4
+# 429 plus the transient errors the OpenAI SDK would retry itself
+RETRY_STATUSES = (408, 409, 429, 500, 502, 503, 504)
+BACKOFF_BASE = 1.0  # Seconds
+BACKOFF_MAX = 30.0  # Seconds
+
+
+class TokenBucket:
+    """Token bucket refilled continuously; debits may leave it in debt."""
+
+    def __init__(self, capacity: float, per_minute: float):
+        self.capacity = capacity
+        self.rate = per_minute / 60
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def has(self, amount: float) -> bool:
+        self.refill()
+        return self.tokens >= amount
+
+    def debit(self, amount: float) -> None:
+        self.refill()
+        self.tokens -= amount
+
+
+class DeploymentLimiter:
+    """Admission control for one deployment: rpm and tpm buckets, priority queue and 429 cooldown."""
+
+    def __init__(self, deployment: str, quota: Quota):
+        self.deployment = deployment
+        self.quota = quota
+        self.requests = TokenBucket(quota.rpm, quota.rpm)
+        self.tokens = TokenBucket(quota.tpm, quota.tpm)
+        self.cooldown_until = 0.0
+        self._waiters: list[tuple[int, int]] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.stats = {"admitted": 0, "waited": 0, "rate_limited": 0}
+
+    def _enqueue(self, priority: int) -> tuple[int, int]:
+        ticket = (priority, next(self._counter))
+        with self._lock:
+            heapq.heappush(self._waiters, ticket)
+        return ticket
+
+    def _dequeue(self, ticket: tuple[int, int]) -> None:
+        with self._lock:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+
+    def _try_admit(self, ticket: tuple[int, int]) -> bool:
+        """Admit the request if it is first in line and the buckets allow its priority class."""
+        priority = ticket[0]
+        reserve = PRIORITY_RESERVE.get(priority, PRIORITY_RESERVE[BATCH])
+        with self._lock:
+            if self._waiters[0] != ticket or time.monotonic() < self.cooldown_until:
+                return False
+            if not self.requests.has(1 + reserve * self.requests.capacity):
+                return False
+            if not self.tokens.has(max(reserve * self.tokens.capacity, 1)):
+                return False
+            self.requests.debit(1)
+            heapq.heappop(self._waiters)
+            self.stats["admitted"] += 1
+            return True
+
+    async def aacquire(self, priority: int, blocking: bool = True) -> bool:
+        ticket = self._enqueue(priority)
+        try:
+            waited = False
+            while not self._try_admit(ticket):
+                if not blocking:
+                    return False
+                waited = True
+                await asyncio.sleep(POLL_INTERVAL)
+            self.stats["waited"] += waited
+            return True
+        finally:
+            self._dequeue(ticket)
+
+    def acquire(self, priority: int, blocking: bool = True) -> bool:
+        ticket = self._enqueue(priority)
+        try:
+            waited = False
+            while not self._try_admit(ticket):
+                if not blocking:
+                    return False
+                waited = True
+                time.sleep(POLL_INTERVAL)
+            self.stats["waited"] += waited
+            return True
+        finally:
+            self._dequeue(ticket)
+
+    def record_usage(self, tokens: int) -> None:
+        with self._lock:
+            self.tokens.debit(tokens)
+
+    def penalize(self, delay: float) -> None:
+        """Pause the deployment for ``delay`` seconds after a 429."""
+        with self._lock:
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + delay)
+            self.stats["rate_limited"] += 1
+
+
+class LLMScheduler:
+    """Registry of the deployment limiters of the process."""
+
+    def __init__(self):
+        self._limiters: dict[str, DeploymentLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get_limiter(self, deployment: str) -> DeploymentLimiter:
+        with self._lock:
+            if deployment not in self._limiters:
+                quota = DEPLOYMENT_QUOTAS.get(deployment, DEFAULT_QUOTA)
+                self._limiters[deployment] = DeploymentLimiter(deployment, quota)
+            return self._limiters[deployment]
+
+    def rate_limiter(self, deployment: str, priority: int = INTERACTIVE) -> "ScheduledRateLimiter":
+        return ScheduledRateLimiter(self.get_limiter(deployment), priority)
+
+    def usage_callback(self, deployment: str) -> "UsageCallbackHandler":
+        return UsageCallbackHandler(self.get_limiter(deployment))
+
+    def stats(self) -> dict[str, dict]:
+        """Admission counters and current bucket levels per deployment."""
+        stats = {}
+        for deployment, limiter in list(self._limiters.items()):
+            limiter.requests.refill()
+            limiter.tokens.refill()
+            stats[deployment] = {
+                **limiter.stats,
+                "requests_available": round(limiter.requests.tokens, 1),
+                "tokens_available": round(limiter.tokens.tokens),
+                "waiting": len(limiter._waiters),
+            }
+        return stats
+
+
+scheduler = LLMScheduler()
+
+
+class ScheduledRateLimiter(BaseRateLimiter):
+    """LangChain rate limiter that admits a model's requests through the scheduler."""
+
+    def __init__(self, limiter: DeploymentLimiter, priority: int):
+        self.limiter = limiter
+        self.priority = priority
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        return self.limiter.acquire(self.priority, blocking)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        return await self.limiter.aacquire(self.priority, blocking)
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Debits the tokens actually used by each response from the deployment's tpm bucket."""
+
+    def __init__(self, limiter: DeploymentLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        total_tokens = usage.get("total_tokens")
+        if total_tokens is None:
+            # Streamed responses report the usage on the message instead
+            message = getattr(response.generations[0][0], "message", None) if response.generations and response.generations[0] else None
+            total_tokens = ((getattr(message, "usage_metadata", None) or {}).get("total_tokens")) or 0
+        if total_tokens:
+            self.limiter.record_usage(total_tokens)
+
+
+def _deployment_from_url(url: httpx.URL) -> Optional[str]:
+    match = re.search(r"/deployments/([^/]+)/", url.path)
+    return match.group(1) if match else None
+
+
+def _backoff_delay(response: Optional[httpx.Response], attempt: int) -> float:
+    """Retry-After from the response if present, else exponential backoff; with jitter."""
+    retry_after = None
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1)):
+        try:
+            retry_after = float(response.headers[header]) * scale
+            break
+        except (AttributeError, KeyError, ValueError):
+            continue
+    delay = retry_after if retry_after is not None else min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX)
+    return delay * random.uniform(1, 1.5)
+
+
+def _on_retry(request: httpx.Request, response: Optional[httpx.Response], error: Optional[Exception], attempt: int) -> float:
+    """Log the failed attempt, pause the deployment on a 429 and return the delay before the next one."""
+    delay = _backoff_delay(response, attempt)
+    deployment = _deployment_from_url(request.url)
+    reason = response.status_code if response is not None else type(error).__name__
+    logger.warning("%s from %s, retrying in %.1fs", reason, deployment or request.url.host, delay)
+    if deployment and response is not None and response.status_code == 429:
+        scheduler.get_limiter(deployment).penalize(delay)
+    return delay
+
+
+class RateLimitRetryTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport that retries 429s (pausing the deployment), transient
+    server errors and connection errors.
+
+    The SDK clients using it are built with ``max_retries=0``, so requests
+    are only retried here and every attempt goes through the scheduler's
+    accounting once.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None, max_retries: int = MAX_RETRIES):
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.max_retries = max_retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(_on_retry(request, None, e, attempt))
+                continue
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            delay = _on_retry(request, response, None, attempt)
+            await response.aclose()
+            await asyncio.sleep(delay)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class SyncRateLimitRetryTransport(httpx.BaseTransport):
+    """Sync counterpart of ``RateLimitRetryTransport`` for models called with ``invoke``."""
+
+    def __init__(self, transport: Optional[httpx.BaseTransport] = None, max_retries: int = MAX_RETRIES):
+        self.transport = transport or httpx.HTTPTransport()
+        self.max_retries = max_retries
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(_on_retry(request, None, e, attempt))
+                continue
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            delay = _on_retry(request, response, None, attempt)
+            response.close()
+            time.sleep(delay)
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
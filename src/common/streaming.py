@@ -0,0 +1,89 @@
+"""Helpers to stream the agents' answers through the supervisor graph.
+
+LLM calls that produce the user-facing answer are tagged with ``ANSWER_TAG``;
+internal calls (routers, graders, rewriters, SQL generation) are tagged with
+``NOSTREAM_TAG`` so LangGraph leaves them out of the ``messages`` stream.
+Tokens from the sub-agents are nested graphs, so clients must stream with
+``stream_mode="messages"`` and ``subgraphs=True``.
+
+An answer can be rejected after its tokens were streamed (the RAG agent's
+hallucination grader, or a pipelined answer restarted because the graded
+context changed). A ``reset`` event on the ``custom`` stream then tells
+the client to drop the tokens received so far; the replacement follows.
+"""
+
+import time
+from typing import Any, Optional
+
+from langchain_core.callbacks import AsyncCallbackHandler, BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ensure_config, merge_configs
+from langgraph.config import get_stream_writer
+from langgraph.constants import TAG_NOSTREAM
+
+
+ANSWER_TAG = "answer"
+NOSTREAM_TAG = TAG_NOSTREAM
+
+
+def is_answer_run(tags: Optional[list[str]]) -> bool:
+    """Whether an LLM run with these tags produces answer tokens for the stream."""
+    tags = tags or []
+    return ANSWER_TAG in tags and NOSTREAM_TAG not in tags
+
+
+class FirstTokenTimer(AsyncCallbackHandler):
+    """Callback that records when the first answer token is produced.
+
+    When the model is not streaming no token events are emitted, so the end
+    of the answer generation is used instead.
+    """
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at or time.time()
+        self.first_token_at: Optional[float] = None
+
+    async def on_llm_new_token(self, token: str, *, tags: Optional[list[str]] = None, **kwargs: Any) -> None:
+        if self.first_token_at is None and token and is_answer_run(tags):
+            self.first_token_at = time.time()
+
+    async def on_llm_end(self, response: Any, *, tags: Optional[list[str]] = None, **kwargs: Any) -> None:
+        if self.first_token_at is None and is_answer_run(tags):
+            self.first_token_at = time.time()
+
+    @property
+    def ttft_ms(self) -> Optional[float]:
+        """Milliseconds from the start of the turn to the first answer token."""
+        if self.first_token_at is None:
+            return None
+        return round((self.first_token_at - self.started_at) * 1000, 1)
+
+
+def with_callback(handler: BaseCallbackHandler, config: Optional[dict] = None) -> RunnableConfig:
+    """
+    Add a callback handler to the current run config.
+
+    Passing ``callbacks`` straight to a nested ``ainvoke`` replaces the parent's
+    callback manager, which would also drop LangGraph's stream handlers.
+    """
+    return merge_configs(ensure_config(), config or {}, {"callbacks": [handler]})
+
+
+def emit_final_event(sources=None, links=None, ttft_ms=None) -> None:
+    """Send the sources, links and time-to-first-token on the ``custom`` stream."""
+    writer = get_stream_writer()
+    writer({
+        "event": "final",
+        "sources": sources,
+        "links": links,
+        "ttft_ms": ttft_ms,
+    })
+
+
+def emit_reset_event(reason: str) -> None:
+    """
+    Tell the client on the ``custom`` stream to discard the answer tokens
+    received so far, because the answer they belong to was rejected.
+    """
+    writer = get_stream_writer()
+    writer({"event": "reset", "reason": reason})
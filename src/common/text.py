@@ -0,0 +1,27 @@
+"""Text normalization shared by the local (non-LLM) scorers."""
+
+import re
+import unicodedata
+
+
+# Frequent Spanish and English words that carry no meaning for lexical matching
+STOPWORDS = frozenset("""
+a al algo como con cual cuales cuando de del donde el ella en entre es esta este esto
+hay la las le les lo los mas me mi mis muy no o para pero por que quien se si sin sobre
+su sus un una uno unos unas y ya yo
+an and are as at be by for from how in is it of on or that the this to what when where
+which who with
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase the text and strip accents so keyword rules stay simple."""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list[str]:
+    """Normalized word tokens of ``text`` without stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(normalize_text(text)) if token not in STOPWORDS]
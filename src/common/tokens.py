@@ -0,0 +1,34 @@
+"""Token counting shared by the RAG context assembly and the supervisor window.
+
+The tiktoken vocabulary is downloaded on first use. When it can't be loaded
+(no network, no cache) tokens are estimated from the characters, about four
+per token, instead of failing the request.
+"""
+
+import logging
+import functools
+
+
+logger = logging.getLogger("tokens")
+
+# Encoding of the gpt-4.1 and gpt-4o models
+TOKEN_ENCODING = "o200k_base"
+
+
+@functools.lru_cache(maxsize=1)
+def get_encoder():
+    """tiktoken encoder, or None when its vocabulary can't be loaded."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception as e:
+        logger.warning("Token encoding %s unavailable, estimating tokens from characters: %s", TOKEN_ENCODING, e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoder = get_encoder()
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text, disallowed_special=()))
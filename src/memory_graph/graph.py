@@ -13,6 +13,8 @@ from langgraph.graph import add_messages
 from langmem import create_memory_store_manager
 from typing_extensions import Annotated, TypedDict
 
+from common.models import get_chat_model
+from common.scheduler import BACKGROUND
 from memory_graph import configuration
 
 
@@ -45,8 +47,9 @@ def get_store_manager(function_name: str):
     if memory_config.system_prompt:
         kwargs["instructions"] = memory_config.system_prompt
 
+    # Extraction runs in the background and must not starve interactive turns
     return create_memory_store_manager(
-        configurable.model,
+        get_chat_model(configurable.model, priority=BACKGROUND),
         namespace=("memories", "{user_id}", function_name),
         **kwargs,
         schemas=[memory_config.schema]
@@ -12,6 +12,25 @@ class Configuration:
     provider: str = "pinecone"  # The vector store provider
     index_name: str = "edwards-sgc-testing"  # The name of the vector store index
     storage_service_type: str = "drive"
+    top_k: Optional[int] = None  # Chunks retrieved per query, the provider default if not set
+    semantic_configuration: str = ""  # Azure AI Search semantic configuration used to rerank the results, disabled if empty
+    retrieval_mode: str = "vector"  # "vector" or "hybrid" (vector results fused with the local BM25 index)
+    query_strategy: str = "rewrite_loop"  # "rewrite_loop" (rewrite and retry when nothing is relevant) or "multi_query" (rewrites retrieved up front)
+    multi_query_rewrites: int = 3  # Rewrites of the question retrieved along with it in multi_query
+    multi_query_fusion: str = "rrf"  # How multi_query merges the rankings: "rrf" or "round_robin"
+    context_token_budget: int = 6000  # Maximum tokens of retrieved chunks in the generation prompt
+    context_duplicate_threshold: float = 0.8  # Shingle overlap (Jaccard) from which a chunk is dropped as a near-duplicate
+    generation_mode: str = "serial"  # "serial" (generate once every document is graded) or "pipelined" (start on the best-ranked ones)
+    pipeline_early_chunks: int = 3  # Best-ranked documents graded first to start the generation in pipelined mode
+    pipeline_restart_threshold: float = 0.6  # Similarity of the early and final contexts below which the generation restarts
+    reflection_mode: str = "blocking"  # With reflection on: "blocking" (graded before answering) or "async" (graded in the background after answering)
+    reflection_grading: str = "concurrent"  # Reflection graders: "concurrent" (hallucination and answer graders at once) or "combined" (one call)
+    grading_mode: str = "concurrent"  # "concurrent" (one call per document), "batch" (one call for all) or "local" (scorer first, experimental)
+    grading_concurrency: int = 8  # Maximum grader calls in flight in concurrent mode
+    relevance_scorer: str = "hybrid"  # Local scorer of the "local" grading mode: "lexical", "hybrid" or "cross_encoder"
+    # Placeholders until benchmarks/calibrate_relevance.py is run against the indexes
+    relevance_low_threshold: float = 0.45  # Local scores below this are dropped without asking the LLM
+    relevance_high_threshold: float = 0.7  # Local scores from this up are kept without asking the LLM
 
     @classmethod
     def from_context(cls) -> "Configuration":
@@ -0,0 +1,79 @@
+"""Assembly of the retrieved chunks into the context of the generation prompt.
+
+Overlapping hits (the same passage indexed twice, sliding-window chunks of a
+document, several query rewrites finding the same text) inflate the prompt
+without adding facts. ``assemble_context``:
+
+1. Drops chunks whose word shingles are near-duplicates of a better-ranked chunk.
+2. Keeps the best-ranked chunks that fit in the token budget.
+3. Groups the kept chunks by source file, files ordered by their best chunk.
+4. Numbers every chunk with its file name as a citation, between separators.
+
+The generation and the hallucination grader get the same context, and only
+the documents used are cited as sources.
+"""
+
+from dataclasses import dataclass
+from typing import Sequence
+
+from rag_agent.document import Document
+from common.text import normalize_text
+from common.tokens import count_tokens
+
+
+SHINGLE_SIZE = 5  # Words
+CHUNK_SEPARATOR = "\n\n---\n\n"
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[tuple[str, ...]]:
+    words = normalize_text(text).split()
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    documents: list[Document]
+    tokens: int
+    duplicates: int  # Chunks dropped as near-duplicates
+    truncated: int  # Chunks dropped for the budget
+
+
+def format_chunk(number: int, document: Document) -> str:
+    return f"[{number}] {document.filename}\n{document.content.strip()}"
+
+
+def assemble_context(documents: Sequence[Document], token_budget: int = 6000, duplicate_threshold: float = 0.8) -> AssembledContext:
+    """Context from ``documents``, given best first, within ``token_budget`` tokens."""
+    kept, kept_shingles, duplicates = [], [], 0
+    for document in documents:
+        document_shingles = shingles(document.content)
+        if any(jaccard(document_shingles, other) >= duplicate_threshold for other in kept_shingles):
+            duplicates += 1
+            continue
+        kept.append(document)
+        kept_shingles.append(document_shingles)
+
+    selected, tokens, separator_tokens = [], 0, count_tokens(CHUNK_SEPARATOR)
+    for document in kept:
+        # The citation number takes a couple of tokens; 999 is an upper bound
+        cost = count_tokens(format_chunk(999, document)) + (separator_tokens if selected else 0)
+        if tokens + cost > token_budget:
+            continue
+        selected.append(document)
+        tokens += cost
+
+    # Chunks of the same file read better together; files keep the rank of their best chunk
+    by_source: dict[str, list[Document]] = {}
+    for document in selected:
+        by_source.setdefault(document.filename, []).append(document)
+    ordered = [document for group in by_source.values() for document in group]
+
+    text = CHUNK_SEPARATOR.join(format_chunk(number, document) for number, document in enumerate(ordered, start=1))
+    return AssembledContext(text, ordered, tokens, duplicates, len(kept) - len(selected))
@@ -0,0 +1,239 @@
+"""Cached, batched permission checks for Google Drive files.
+
+The permissions of each file are cached for ``DRIVE_ACL_CACHE_TTL`` seconds.
+The files missing from the cache are fetched with one Drive batch request
+(up to ``BATCH_LIMIT`` files per round trip) in a worker thread, so the event
+loop isn't blocked.
+
+A user can read a file shared with them, with anyone, with their email
+domain or with one of their groups. Group memberships are looked up with the
+Admin SDK Directory API, which needs a delegated admin (``GOOGLE_ADMIN_SUBJECT``),
+and cached for ``DRIVE_GROUPS_CACHE_TTL`` seconds. Without it, group
+permissions grant nothing. Only direct memberships are considered.
+"""
+
+import os
+import re
+import time
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from rag_agent.principals import principal, user_principals
+
+
+logger = logging.getLogger("rag")
+
+DRIVE_ACL_CACHE_TTL = float(os.getenv("DRIVE_ACL_CACHE_TTL", "300"))  # Seconds
+DRIVE_GROUPS_CACHE_TTL = float(os.getenv("DRIVE_GROUPS_CACHE_TTL", "900"))  # Seconds
+# Maximum calls in one Drive batch request
+BATCH_LIMIT = 100
+FILE_ID_PATTERN = re.compile(r"(?<=d/)(.*?)(?=/edit|/view)")
+PERMISSION_FIELDS = "nextPageToken, permissions(type, emailAddress, domain)"
+
+
+@dataclass(frozen=True)
+class Permission:
+    type: str  # "user", "group", "domain" or "anyone"
+    email: str = ""
+    domain: str = ""
+
+
+def file_id(source: str) -> Optional[str]:
+    """Drive ID of a document from its link, None if it isn't a Drive link."""
+    match = FILE_ID_PATTERN.search(source or "")
+    return match.group(0) if match else None
+
+
+def parse_permissions(response: dict) -> set[Permission]:
+    return {
+        Permission(p.get("type", ""), (p.get("emailAddress") or "").lower(), (p.get("domain") or "").lower())
+        for p in response.get("permissions", [])
+    }
+
+
+def is_allowed(permissions: frozenset[Permission], user_email: str, groups: frozenset[str]) -> bool:
+    domain = user_email.rsplit("@", 1)[-1]
+    for permission in permissions:
+        if (
+            permission.type == "anyone"
+            or (permission.type == "user" and permission.email == user_email)
+            or (permission.type == "group" and permission.email in groups)
+            or (permission.type == "domain" and permission.domain == domain)
+        ):
+            return True
+    return False
+
+
+def permission_principals(permissions: frozenset[Permission]) -> list[str]:
+    """Metadata principals equivalent to the permissions of a file (see ``rag_agent.principals``)."""
+    return sorted({
+        principal(p.type, p.domain if p.type == "domain" else p.email)
+        for p in permissions
+        if p.type in ("user", "group", "domain", "anyone")
+    })
+
+
+class TTLCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._items: dict[Any, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._next_prune = time.monotonic() + ttl
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] < time.monotonic():
+                self._items.pop(key, None)
+                return None
+            return item[1]
+
+    def put(self, key, value) -> None:
+        now = time.monotonic()
+        with self._lock:
+            # Keys that are never read again would stay forever, expired entries are dropped once per TTL
+            if now >= self._next_prune:
+                self._items = {k: item for k, item in self._items.items() if item[0] >= now}
+                self._next_prune = now + self.ttl
+            self._items[key] = (now + self.ttl, value)
+
+
+class DriveACL:
+    """Filters documents by the Drive permissions of a user."""
+
+    def __init__(self, drive_service, directory_service=None):
+        self.drive = drive_service
+        self.directory = directory_service
+        self._permissions = TTLCache(DRIVE_ACL_CACHE_TTL)
+        self._groups = TTLCache(DRIVE_GROUPS_CACHE_TTL)
+        # The HTTP objects of the API clients aren't thread-safe
+        self._drive_lock = threading.Lock()
+        self._directory_lock = threading.Lock()
+        self.stats = {"cache_hits": 0, "files_fetched": 0, "batches": 0, "group_lookups": 0}
+
+    def _list_request(self, file_id: str, page_token: Optional[str] = None):
+        return self.drive.permissions().list(
+            fileId=file_id, fields=PERMISSION_FIELDS, pageToken=page_token, supportsAllDrives=True
+        )
+
+    def _fetch_permissions(self, file_ids: list[str]) -> None:
+        """Fetch and cache the permissions of ``file_ids``; files that fail are denied."""
+        fetched: dict[str, set[Permission]] = {}
+        next_pages: dict[str, str] = {}
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                logger.warning("Could not read the permissions of Drive file %s: %s", request_id, exception)
+                # Files the service account can't see are denied until the entry expires, other errors are retried
+                if getattr(getattr(exception, "resp", None), "status", None) in (403, 404):
+                    fetched[request_id] = set()
+                return
+            fetched[request_id] = parse_permissions(response)
+            if response.get("nextPageToken"):
+                next_pages[request_id] = response["nextPageToken"]
+
+        with self._drive_lock:
+            for start in range(0, len(file_ids), BATCH_LIMIT):
+                batch = self.drive.new_batch_http_request(callback=callback)
+                for file_id in file_ids[start:start + BATCH_LIMIT]:
+                    batch.add(self._list_request(file_id), request_id=file_id)
+                batch.execute()
+                self.stats["batches"] += 1
+            # Files shared with more than a page of principals, rare
+            for file_id, page_token in next_pages.items():
+                try:
+                    while page_token:
+                        response = self._list_request(file_id, page_token).execute()
+                        fetched[file_id] |= parse_permissions(response)
+                        page_token = response.get("nextPageToken")
+                except Exception as e:
+                    # Partial permissions could deny a reader: leave the file uncached (denied) and retry next time
+                    logger.warning("Could not read all the permissions of Drive file %s: %s", file_id, e)
+                    del fetched[file_id]
+
+        self.stats["files_fetched"] += len(fetched)
+        for file_id, permissions in fetched.items():
+            self._permissions.put(file_id, frozenset(permissions))
+
+    def _fetch_groups(self, user_email: str) -> None:
+        groups, page_token = set(), None
+        try:
+            with self._directory_lock:
+                while True:
+                    response = self.directory.groups().list(
+                        userKey=user_email, pageToken=page_token, fields="nextPageToken, groups(email)"
+                    ).execute()
+                    groups.update(group["email"].lower() for group in response.get("groups", []))
+                    page_token = response.get("nextPageToken")
+                    if not page_token:
+                        break
+        except Exception as e:
+            logger.warning("Could not read the groups of %s: %s", user_email, e)
+            return
+        self.stats["group_lookups"] += 1
+        self._groups.put(user_email, frozenset(groups))
+
+    def _plan(self, documents: list, user_email: str) -> tuple[list[str], bool]:
+        """Files whose permissions must be fetched, and whether the user's groups must be."""
+        file_ids = {file_id(document.source) for document in documents} - {None}
+        cached = {i: self._permissions.get(i) for i in file_ids}
+        missing = [i for i, permissions in cached.items() if permissions is None]
+        self.stats["cache_hits"] += len(file_ids) - len(missing)
+        # Fetched along with the missing files, before knowing if any is shared with a group
+        needs_groups = (
+            self.directory is not None
+            and self._groups.get(user_email) is None
+            and (missing or any(p.type == "group" for permissions in cached.values() if permissions for p in permissions))
+        )
+        return missing, bool(needs_groups)
+
+    def _allowed(self, documents: list, user_email: str) -> list:
+        groups = self._groups.get(user_email) or frozenset()
+        allowed = []
+        for document in documents:
+            document_id = file_id(document.source)
+            permissions = self._permissions.get(document_id) if document_id else None
+            if permissions is not None and is_allowed(permissions, user_email, groups):
+                allowed.append(document)
+        return allowed
+
+    def file_principals(self, file_ids: list[str]) -> dict[str, list[str]]:
+        """Principals allowed to read each file, for the chunk metadata written at ingestion."""
+        file_ids = list(dict.fromkeys(file_ids))
+        missing = [i for i in file_ids if self._permissions.get(i) is None]
+        if missing:
+            self._fetch_permissions(missing)
+        permissions = {i: self._permissions.get(i) for i in file_ids}
+        return {i: permission_principals(p) for i, p in permissions.items() if p is not None}
+
+    async def aprincipals(self, user_email: str) -> tuple[str, ...]:
+        """Principals ``user_email`` acts as, for pre-filtered retrieval."""
+        user_email = user_email.lower()
+        if self.directory is not None and self._groups.get(user_email) is None:
+            await asyncio.to_thread(self._fetch_groups, user_email)
+        return user_principals(user_email, self._groups.get(user_email) or ())
+
+    def filter(self, documents: list, user_email: str) -> list:
+        """Documents ``user_email`` can read."""
+        user_email = user_email.lower()
+        missing, needs_groups = self._plan(documents, user_email)
+        if missing:
+            self._fetch_permissions(missing)
+        if needs_groups:
+            self._fetch_groups(user_email)
+        return self._allowed(documents, user_email)
+
+    async def afilter(self, documents: list, user_email: str) -> list:
+        """Async ``filter``: the Drive batch and the group lookup run concurrently in worker threads."""
+        user_email = user_email.lower()
+        missing, needs_groups = self._plan(documents, user_email)
+        lookups = []
+        if missing:
+            lookups.append(asyncio.to_thread(self._fetch_permissions, missing))
+        if needs_groups:
+            lookups.append(asyncio.to_thread(self._fetch_groups, user_email))
+        await asyncio.gather(*lookups)
+        return self._allowed(documents, user_email)
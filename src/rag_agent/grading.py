@@ -0,0 +1,193 @@
+"""Relevance grading of the retrieved documents.
+
+Three modes produce a filtered list of documents:
+
+- ``concurrent``: one grader call per document, fanned out with at most
+  ``max_concurrency`` calls in flight.
+- ``batch``: a single structured call that returns one verdict per document.
+  Documents the model left without a verdict are graded one by one.
+- ``local`` (experimental): a local relevance scorer (see
+  ``rag_agent.relevance``) keeps or drops the documents and only the
+  borderline ones go to the LLM grader. Its thresholds aren't calibrated yet.
+
+The latency of every grading and the number of documents sent to the LLM
+are recorded per index and mode. The ``grading_stats()`` numbers can be
+used to choose the mode of each index. A grading split in concurrent calls
+(pipelined generation) is recorded once, through a ``GradingRun``.
+"""
+
+import time
+import logging
+from collections import defaultdict
+from typing import Optional, Sequence
+
+from langchain_core.runnables import Runnable
+
+from rag_agent.document import Document
+from rag_agent.relevance import RelevanceScorer
+
+
+logger = logging.getLogger("rag")
+
+GRADING_MODES = ("concurrent", "batch", "local")
+
+# Latencies in ms by (index_name, mode), only the most recent ones are kept
+MAX_LATENCY_SAMPLES = 200
+_latencies: dict[tuple[str, str], list[float]] = defaultdict(list)
+# Documents graded and documents sent to the LLM by (index_name, mode)
+_graded: dict[tuple[str, str], list[int]] = defaultdict(lambda: [0, 0])
+
+
+def record_grading(index_name: str, mode: str, latency_ms: float, documents: int, llm_documents: int) -> None:
+    samples = _latencies[(index_name, mode)]
+    samples.append(latency_ms)
+    del samples[:-MAX_LATENCY_SAMPLES]
+    graded = _graded[(index_name, mode)]
+    graded[0] += documents
+    graded[1] += llm_documents
+    logger.info("Graded %d documents of '%s' in %s mode in %.0f ms", documents, index_name, mode, latency_ms)
+
+
+class GradingRun:
+    """Grading of one retrieval split in ``parts`` concurrent calls, recorded once the last one ends."""
+
+    def __init__(self, index_name: str, mode: str, parts: int):
+        self.index_name = index_name
+        self.mode = mode
+        self.parts = parts
+        self.documents = 0
+        self.llm_documents = 0
+        self.started_at = time.perf_counter()
+
+    def add(self, documents: int, llm_documents: int) -> None:
+        self.documents += documents
+        self.llm_documents += llm_documents
+        self.parts -= 1
+        if self.parts == 0:
+            latency_ms = (time.perf_counter() - self.started_at) * 1000
+            record_grading(self.index_name, self.mode, latency_ms, self.documents, self.llm_documents)
+
+
+def _is_relevant(score) -> bool:
+    return score.binary_score.strip().lower() == "yes"
+
+
+async def grade_concurrently(grader: Runnable, question: str, documents: Sequence[Document], max_concurrency: int) -> list[bool]:
+    """Grade every document with its own call, with at most ``max_concurrency`` calls in flight."""
+    if not documents:
+        return []
+    scores = await grader.abatch(
+        [{"question": question, "document": doc.content} for doc in documents],
+        config={"max_concurrency": max_concurrency},
+    )
+    return [_is_relevant(score) for score in scores]
+
+
+def format_numbered_documents(documents: Sequence[Document]) -> str:
+    return "\n\n".join(f"[{i}] {doc.content}" for i, doc in enumerate(documents))
+
+
+async def grade_in_batch(batch_grader: Runnable, grader: Runnable, question: str, documents: Sequence[Document], max_concurrency: int) -> list[bool]:
+    """Grade all documents in one call; documents without a verdict fall back to ``grader``."""
+    if not documents:
+        return []
+    result = await batch_grader.ainvoke(
+        {"question": question, "documents": format_numbered_documents(documents)}
+    )
+    verdicts: dict[int, bool] = {
+        grade.index: _is_relevant(grade)
+        for grade in result.grades
+        if 0 <= grade.index < len(documents)
+    }
+    missing = [i for i in range(len(documents)) if i not in verdicts]
+    if missing:
+        logger.warning("Batch grading returned no verdict for %d of %d documents", len(missing), len(documents))
+        retried = await grade_concurrently(grader, question, [documents[i] for i in missing], max_concurrency)
+        verdicts.update(zip(missing, retried))
+    return [verdicts[i] for i in range(len(documents))]
+
+
+async def grade_with_scorer(
+    scorer: RelevanceScorer,
+    grader: Runnable,
+    question: str,
+    documents: Sequence[Document],
+    low_threshold: float,
+    high_threshold: float,
+    max_concurrency: int,
+) -> tuple[list[bool], int]:
+    """
+    Grade with the local scorer, escalating scores in [low, high) to ``grader``.
+
+    Returns the verdicts and the number of documents sent to the LLM.
+    """
+    if not documents:
+        return [], 0
+    scores = await scorer.ascore(question, documents)
+    verdicts = [bool(score >= high_threshold) for score in scores]
+    borderline = [i for i, score in enumerate(scores) if low_threshold <= score < high_threshold]
+    if borderline:
+        escalated = await grade_concurrently(grader, question, [documents[i] for i in borderline], max_concurrency)
+        for i, relevant in zip(borderline, escalated):
+            verdicts[i] = relevant
+    return verdicts, len(borderline)
+
+
+async def filter_relevant_documents(
+    grader: Runnable,
+    batch_grader: Runnable,
+    question: str,
+    documents: Sequence[Document],
+    mode: str = "concurrent",
+    max_concurrency: int = 8,
+    index_name: str = "",
+    scorer: Optional[RelevanceScorer] = None,
+    low_threshold: float = 0.0,
+    high_threshold: float = 1.0,
+    run: Optional[GradingRun] = None,
+) -> list[Document]:
+    """
+    Return the documents graded as relevant to ``question``, in retrieval order.
+
+    The grading is recorded in ``grading_stats()``, or added to ``run`` if it's part of one.
+    """
+    if mode not in GRADING_MODES:
+        raise ValueError(f"Unknown grading mode '{mode}'. Expected one of {GRADING_MODES}.")
+    if mode == "local" and scorer is None:
+        raise ValueError("The local grading mode needs a relevance scorer.")
+
+    started_at = time.perf_counter()
+    if mode == "batch":
+        verdicts = await grade_in_batch(batch_grader, grader, question, documents, max_concurrency)
+        llm_documents = len(documents)
+    elif mode == "local":
+        verdicts, llm_documents = await grade_with_scorer(
+            scorer, grader, question, documents, low_threshold, high_threshold, max_concurrency
+        )
+    else:
+        verdicts = await grade_concurrently(grader, question, documents, max_concurrency)
+        llm_documents = len(documents)
+    if run is not None:
+        run.add(len(documents), llm_documents)
+    else:
+        record_grading(index_name, mode, (time.perf_counter() - started_at) * 1000, len(documents), llm_documents)
+
+    return [doc for doc, relevant in zip(documents, verdicts) if relevant]
+
+
+def grading_stats() -> dict[str, dict[str, float]]:
+    """
+    Grading count, mean/p95 latency in ms and share of documents graded by
+    the LLM, keyed by ``"<index_name>/<mode>"``.
+    """
+    stats = {}
+    for (index_name, mode), samples in list(_latencies.items()):
+        ordered = sorted(samples)
+        documents, llm_documents = _graded[(index_name, mode)]
+        stats[f"{index_name}/{mode}"] = {
+            "count": len(ordered),
+            "mean_ms": round(sum(ordered) / len(ordered), 1),
+            "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], 1),
+            "llm_ratio": round(llm_documents / documents, 3) if documents else 0.0,
+        }
+    return stats
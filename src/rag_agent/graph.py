@@ -1,29 +1,120 @@
-from typing import Literal
+import os
+import asyncio
+import logging
+import functools
+from typing import Literal, Optional
 
-from langchain import hub
-from langchain.embeddings import init_embeddings
-from langchain.chat_models import init_chat_model
 from langchain_core.runnables import RunnableConfig
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
-from langgraph.graph import StateGraph
+from langgraph.graph import StateGraph, END
 from langgraph.types import Command
+from langgraph_sdk import get_client
 
 from rag_agent.state import RagState
-from rag_agent.tools import GradeDocuments, GradeHallucinations, GradeAnswer
+from rag_agent.tools import GradeDocuments, GradeDocumentsBatch, GradeHallucinations, GradeAnswer, GradeGeneration, MultiQuery
 from rag_agent.errors import DECIDE_TO_GENERATE_ERROR, NO_DOCUMENTS_FOR_QUESTION_ERROR, HALLUCINATION_ERROR
-from rag_agent.storage_services import StorageServiceFactory
+from rag_agent.storage_services import StorageServiceFactory, auth_required
 from rag_agent.config import Configuration
+from rag_agent.grading import GradingRun, filter_relevant_documents
+from rag_agent.relevance import RelevanceScorerFactory
+from rag_agent.retrieval_cache import retrieval_cache
+from rag_agent.principals import acl_prefilter_enabled
+from rag_agent.multi_query import multi_query_retrieve
+from rag_agent.context import AssembledContext, assemble_context
+from rag_agent.pipelined_generation import GENERATION_MODES, pipelined_generate
 
-from rag_agent.prompts.adaptative_rag_agent_prompt import GRADE_DOCUMENTS_PROMPT, GRADE_HALLUCINATIONS_PROMPT, GRADE_ANSWER_PROMPT, TRANSFORM_QUERY_PROMPT
 from rag_agent.vector_stores.vectorial_db import VectorSearchFactory
+from common.models import get_chat_model, get_embeddings
+from common.prompts import get_prompt
+from common.streaming import ANSWER_TAG, NOSTREAM_TAG, emit_reset_event
 
 
-generation_llm = init_chat_model("azure_openai:gpt-4.1-mini", temperature=0)
-reflection_llm = init_chat_model("azure_openai:gpt-4.1-mini", temperature=0)
-#reflection_llm = init_chat_model("gemini:gemini-2.0-flash", temperature=0) #langchain_google_vertexai
-embedding_model = init_embeddings("azure_openai:embedding-test")
+logger = logging.getLogger("rag")
+
+# Assistant of the background reflection graph, see rag_agent/reflection_graph.py
+REFLECTION_ASSISTANT_ID = os.getenv("RAG_REFLECTION_ASSISTANT_ID", "rag_reflection")
+_reflection_tasks: set[asyncio.Task] = set()
+
+
+def get_generation_llm():
+    return get_chat_model("azure_openai:gpt-4.1-mini", tags=(ANSWER_TAG,))
+
+def get_reflection_llm():
+    return get_chat_model("azure_openai:gpt-4.1-mini", tags=(NOSTREAM_TAG,))
+    #return get_chat_model("gemini:gemini-2.0-flash", tags=(NOSTREAM_TAG,)) #langchain_google_vertexai
+
+def get_embedding_model():
+    return get_embeddings("azure_openai:embedding-test")
+
+@functools.lru_cache(maxsize=None)
+def get_retriever(provider: str, index_name: str, k: Optional[int] = None, semantic_configuration: str = "", retrieval_mode: str = "vector"):
+    return VectorSearchFactory.create_vectorial_instance(
+        provider, index_name, get_embedding_model(), k=k, semantic_configuration=semantic_configuration, retrieval_mode=retrieval_mode
+    )
+
+# Chains are built once and reused by every run
+
+@functools.lru_cache(maxsize=1)
+def get_retrieval_grader():
+    return get_prompt("rag/grade_documents") | get_reflection_llm().with_structured_output(GradeDocuments)
+
+@functools.lru_cache(maxsize=1)
+def get_batch_retrieval_grader():
+    return get_prompt("rag/grade_documents_batch") | get_reflection_llm().with_structured_output(GradeDocumentsBatch)
+
+@functools.lru_cache(maxsize=None)
+def get_relevance_scorer(scorer: str):
+    logger.warning("The local grading mode is experimental, its relevance thresholds aren't calibrated yet.")
+    return RelevanceScorerFactory.create_scorer_instance(scorer, get_embedding_model())
+
+@functools.lru_cache(maxsize=1)
+def get_rag_chain():
+    return get_prompt("rag/generate") | get_generation_llm() | StrOutputParser()
+
+@functools.lru_cache(maxsize=1)
+def get_hallucination_grader():
+    return get_prompt("rag/grade_hallucinations") | get_reflection_llm().with_structured_output(GradeHallucinations)
+
+@functools.lru_cache(maxsize=1)
+def get_answer_grader():
+    return get_prompt("rag/grade_answer") | get_reflection_llm().with_structured_output(GradeAnswer)
+
+@functools.lru_cache(maxsize=1)
+def get_generation_grader():
+    return get_prompt("rag/grade_generation") | get_reflection_llm().with_structured_output(GradeGeneration)
+
+@functools.lru_cache(maxsize=1)
+def get_question_rewriter():
+    return (get_prompt("rag/transform_query") | get_generation_llm() | StrOutputParser()).with_config(tags=[NOSTREAM_TAG])
+
+@functools.lru_cache(maxsize=1)
+def get_multi_query_rewriter():
+    return get_prompt("rag/multi_query") | get_reflection_llm().with_structured_output(MultiQuery)
+
+def build_context(documents) -> AssembledContext:
+    agent_config = Configuration.from_context()
+    return assemble_context(
+        documents,
+        token_budget=int(agent_config.context_token_budget),
+        duplicate_threshold=float(agent_config.context_duplicate_threshold),
+    )
+
+async def filter_relevant(question: str, documents, run: Optional[GradingRun] = None):
+    agent_config = Configuration.from_context()
+    return await filter_relevant_documents(
+        get_retrieval_grader(),
+        get_batch_retrieval_grader(),
+        question,
+        documents,
+        mode=agent_config.grading_mode,
+        max_concurrency=int(agent_config.grading_concurrency),
+        index_name=agent_config.index_name,
+        scorer=get_relevance_scorer(agent_config.relevance_scorer) if agent_config.grading_mode == "local" else None,
+        low_threshold=float(agent_config.relevance_low_threshold),
+        high_threshold=float(agent_config.relevance_high_threshold),
+        run=run,
+    )
 
 async def retrieve(state: RagState):
 
@@ -34,11 +125,40 @@ async def retrieve(state: RagState):
     storage_service_type = agent_config.storage_service_type
     query = state["messages"][-1].content
 
-    # TODO: Add auth and validation in retrieval stage
-    retriever = VectorSearchFactory.create_vectorial_instance(provider, index_name, embedding_model)
-    documents = await retriever.retrieve(query)  
-    #storage_service = StorageServiceFactory.create_storage_service_instance(storage_service_type)
-    #documents = storage_service.validate_permissions(documents, user_email)           
+    top_k = int(agent_config.top_k) if agent_config.top_k else None
+    settings = (top_k, agent_config.semantic_configuration, agent_config.retrieval_mode)
+    retriever = get_retriever(provider, index_name, *settings)
+
+    # With ACL metadata on the chunks the vector store only returns what the user could read when it was written
+    principals = None
+    if auth_required():
+        storage_service = StorageServiceFactory.create_storage_service_instance(storage_service_type)
+        if acl_prefilter_enabled() and retriever.supports_acl_filter:
+            principals = await storage_service.aprincipals(user_email)
+    retrieve_kwargs = {"principals": principals} if principals is not None else {}
+    # Pre-filtered results depend on the user
+    cache_settings = (*settings, principals)
+
+    async def retrieve_query(question: str):
+        documents = retrieval_cache.get(provider, index_name, cache_settings, question)
+        if documents is None:
+            documents = await retriever.retrieve(question, **retrieve_kwargs)
+            retrieval_cache.put(provider, index_name, cache_settings, question, documents)
+        return documents
+
+    if agent_config.query_strategy == "multi_query":
+        documents, _ = await multi_query_retrieve(
+            retrieve_query,
+            get_multi_query_rewriter(),
+            query,
+            rewrites=int(agent_config.multi_query_rewrites),
+            strategy=agent_config.multi_query_fusion,
+        )
+    else:
+        documents = await retrieve_query(query)
+    if auth_required():
+        # The metadata principals may be stale, the live permissions are cached so this is cheap
+        documents = await storage_service.avalidate_permissions(documents, user_email)
     return {"documents": documents, "question": query}
 
 async def grade_documents(state: RagState):
@@ -52,33 +172,48 @@ async def grade_documents(state: RagState):
         state (dict): Updates documents key with only filtered relevant documents
     """
     question = state["question"]
-    documents = state["documents"]
+    filtered_docs = await filter_relevant(question, state["documents"])
+    return {"documents": filtered_docs, "question": question}
 
-    filtered_docs = []
-    
-    structured_llm_grader = reflection_llm.with_structured_output(GradeDocuments)
+async def grade_and_generate(state: RagState):
+    """
+    Grades the retrieved documents and generates the answer from the best-ranked
+    relevant ones while the rest are still being graded (pipelined generation mode).
 
-    grade_prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", GRADE_DOCUMENTS_PROMPT),
-            ("human", "Retrieved document: \n\n {document} \n\n User question: {question}"),
-        ]   
-    )
-    retrieval_grader = grade_prompt | structured_llm_grader
+    Args:
+        state (dict): The current graph state
 
-    for doc in documents:
-        score = await retrieval_grader.ainvoke(
-            {"question": question, "document": doc.content}
-        )
-        grade = score.binary_score
-        if grade == "yes":
-            filtered_docs.append(doc)
-        else:
-            continue
+    Returns:
+        state (dict): Updates documents with the documents of the answer, and generation
+    """
+    agent_config = Configuration.from_context()
+    question = state["question"]
 
-    return {"documents": filtered_docs, "question": question}
+    async def generate_answer(context: AssembledContext) -> str:
+        return await get_rag_chain().ainvoke({"context": context.text, "question": question})
+
+    # The early chunks and the rest are graded concurrently, they count as one grading
+    run = GradingRun(agent_config.index_name, agent_config.grading_mode, parts=2)
+    result = await pipelined_generate(
+        lambda documents: filter_relevant(question, documents, run),
+        build_context,
+        generate_answer,
+        state["documents"],
+        early_chunks=int(agent_config.pipeline_early_chunks),
+        restart_threshold=float(agent_config.pipeline_restart_threshold),
+        on_restart=lambda: emit_reset_event("restart"),
+    )
+    # Only the chunks that made it into the context are cited as sources
+    documents = result.context.documents if result.context is not None else []
+    return {"documents": documents, "question": question, "generation": result.generation}
+
+async def grading_router(state: RagState):
+    generation_mode = Configuration.from_context().generation_mode
+    if generation_mode not in GENERATION_MODES:
+        raise ValueError(f"Unknown generation mode '{generation_mode}'. Expected one of {GENERATION_MODES}.")
+    return "grade_and_generate" if generation_mode == "pipelined" else "grade_documents"
 
-async def decide_to_generate(state: RagState) -> Command[Literal["printer", "transform_query", "generate"]]:
+async def decide_to_generate(state: RagState) -> Command[Literal["printer", "transform_query", "generate", "grade_generation_v_documents_and_question"]]:
     """
     Determines whether to generate an answer, or re-generate a question.
 
@@ -95,13 +230,19 @@ async def decide_to_generate(state: RagState) -> Command[Literal["printer", "tra
     retry_count_grade_documents = state["retry_count_grade_documents"]
     error = False
     error_message = None
-    if retry_count_grade_documents == 0:
+    # multi_query already retrieved the rewrites, another round would find the same documents
+    if retry_count_grade_documents == 0 or (
+        not filtered_documents and Configuration.from_context().query_strategy == "multi_query"
+    ):
         goto = "printer",
         error = True
         error_message = DECIDE_TO_GENERATE_ERROR
     elif not filtered_documents:
         retry_count_grade_documents = retry_count_grade_documents - 1
         goto = "transform_query"
+    elif Configuration.from_context().generation_mode == "pipelined":
+        # The answer was generated along with the grading
+        goto = await reflection_validator(state)
     else:
         goto = "generate"
     return Command(
@@ -125,19 +266,39 @@ async def generate(state: RagState) -> Command[Literal["printer", "generate"]]:
     """
     question = state["question"]
     documents = state["documents"]
-    prompt = hub.pull("rlm/rag-prompt")
-    rag_chain = prompt | generation_llm | StrOutputParser()
-
-    generation = await rag_chain.ainvoke({"context": " ".join([doc.content for doc in documents]), "question": question})
-    return {"documents": documents, "question": question, "generation": generation}
+    context = build_context(documents)
+    generation = await get_rag_chain().ainvoke({"context": context.text, "question": question})
+    # Only the chunks that made it into the context are cited as sources
+    return {"documents": context.documents, "question": question, "generation": generation}
 
 async def reflection_validator(state: RagState):
-    if state["reflection"]:
+    if state["reflection"] and Configuration.from_context().reflection_mode != "async":
         return "grade_generation_v_documents_and_question"
     else:
         return "printer"
 
-async def grade_generation_v_documents_and_question(state: RagState):
+async def reflection_scheduler(state: RagState):
+    if state["reflection"] and not state["error"] and Configuration.from_context().reflection_mode == "async":
+        return "schedule_reflection"
+    else:
+        return END
+
+async def grade_generation(question: str, context: str, generation: str, mode: str) -> tuple[str, str]:
+    """Hallucination ("yes" if grounded) and answer ("yes" if it resolves the question) verdicts."""
+    if mode == "combined":
+        score = await get_generation_grader().ainvoke({"documents": context, "question": question, "generation": generation})
+        return score.grounded, score.answers_question
+    if mode != "concurrent":
+        raise ValueError(f"Unknown reflection grading mode '{mode}'.")
+    # The answer verdict is only used when the generation is grounded, but asking both at once
+    # costs one LLM latency instead of two
+    hallucination_score, answer_score = await asyncio.gather(
+        get_hallucination_grader().ainvoke({"documents": context, "generation": generation}),
+        get_answer_grader().ainvoke({"question": question, "generation": generation}),
+    )
+    return hallucination_score.binary_score, answer_score.binary_score
+
+async def grade_generation_v_documents_and_question(state: RagState) -> Command[Literal["printer", "generate"]]:
     """
     Determines whether the generation is grounded in the document and answers question.
 
@@ -151,39 +312,16 @@ async def grade_generation_v_documents_and_question(state: RagState):
     documents = state["documents"]
     generation = state["generation"]
 
-    hallucination_prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", GRADE_HALLUCINATIONS_PROMPT),
-            ("human", f"Set of facts: \n\n {' '.join([doc.content for doc in documents])} \n\n LLM generation: {generation}"),
-        ]
+    grade, answer_grade = await grade_generation(
+        question, build_context(documents).text, generation, Configuration.from_context().reflection_grading
     )
 
-    structured_llm_grader = reflection_llm.with_structured_output(GradeHallucinations)
-    hallucination_grader = hallucination_prompt | structured_llm_grader
-    score = await hallucination_grader.ainvoke(
-        {"documents": documents, "generation": generation}
-    )
-    grade = score.binary_score
-
     error = False
     error_message = None
     retry_count_hallucinations = state["retry_count_hallucinations"]
 
     if grade == "yes": # not an hallucination
-        structured_llm_grader = reflection_llm.with_structured_output(GradeAnswer)
-
-        answer_prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", GRADE_ANSWER_PROMPT),
-                ("human", "User question: \n\n {question} \n\n LLM generation: {generation}"),
-            ]
-        )
-
-        answer_grader = answer_prompt | structured_llm_grader
-        score = await answer_grader.ainvoke({"question": question, "generation": generation})
-        grade = score.binary_score
-
-        if grade == "yes":
+        if answer_grade == "yes":
             goto = "printer"
         else:
             error = True
@@ -192,11 +330,14 @@ async def grade_generation_v_documents_and_question(state: RagState):
     else: # hallucination
         if retry_count_hallucinations == 0:
             error_message = HALLUCINATION_ERROR
-            goto = "printer",
+            goto = "printer"
             error = True
         else:
             retry_count_hallucinations = retry_count_hallucinations - 1
             goto = "generate"
+    if error or goto == "generate":
+        # The streamed generation is replaced by an error message or a new generation
+        emit_reset_event("hallucination" if grade != "yes" else "not_answered")
     return Command(
         goto=goto,
         update={
@@ -219,18 +360,7 @@ async def transform_query(state: RagState):
     question = state["question"]
     documents = state["documents"]
 
-    re_write_prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", TRANSFORM_QUERY_PROMPT),
-            (
-                "human",
-                "Here is the initial question: \n\n {question} \n Formulate an improved question.",
-            ),
-        ]
-    )
-
-    question_rewriter = re_write_prompt | generation_llm | StrOutputParser()
-    better_question = await question_rewriter.ainvoke({"question": question})
+    better_question = await get_question_rewriter().ainvoke({"question": question})
 
     return {"documents": documents, "question": better_question}
     
@@ -249,19 +379,59 @@ async def printer(state: RagState):
             "links": links
         }
 
+async def _reflect_locally(reflection_input: dict) -> None:
+    from rag_agent.reflection_graph import graph as reflection_graph
+
+    try:
+        result = await reflection_graph.ainvoke(reflection_input)
+        logger.info("Reflection verdict: %s", result["reflection_verdicts"][-1])
+    except Exception as e:
+        logger.warning("Background reflection failed: %s", e)
+
+async def schedule_reflection(state: RagState, config: RunnableConfig) -> None:
+    """Grade the delivered answer in the background, on the same thread."""
+    reflection_input = {
+        "question": state["question"],
+        "context": build_context(state["documents"]).text,
+        "generation": state["generation"],
+    }
+    thread_id = config.get("configurable", {}).get("thread_id")
+    if thread_id is not None:
+        try:
+            await get_client().runs.create(
+                # Enqueued after the current run, so the warning (if any) follows the answer
+                thread_id=thread_id,
+                multitask_strategy="enqueue",
+                assistant_id=REFLECTION_ASSISTANT_ID,
+                input=reflection_input,
+                config={"configurable": {"reflection_grading": Configuration.from_context().reflection_grading}},
+            )
+            return
+        except Exception as e:
+            # The answer is already delivered, a failed enqueue mustn't fail the run
+            logger.warning("Could not enqueue the reflection run on thread %s, reflecting locally: %s", thread_id, e)
+    # No LangGraph server thread to record the verdict on: grade in this process and log it
+    task = asyncio.create_task(_reflect_locally(reflection_input))
+    _reflection_tasks.add(task)
+    task.add_done_callback(_reflection_tasks.discard)
+
 workflow = StateGraph(RagState, config_schema=Configuration)
 workflow.add_node("retrieve", retrieve)  
 workflow.add_node("grade_documents", grade_documents)  
+workflow.add_node("grade_and_generate", grade_and_generate)
 workflow.add_node("decide_to_generate", decide_to_generate)
 workflow.add_node("generate", generate)
-#workflow.add_node("grade_generation_v_documents_and_question", grade_generation_v_documents_and_question)
+workflow.add_node("grade_generation_v_documents_and_question", grade_generation_v_documents_and_question)
 workflow.add_node("transform_query", transform_query)  
 workflow.add_node("printer", printer)
+workflow.add_node("schedule_reflection", schedule_reflection)
 
 workflow.set_entry_point("retrieve")
-workflow.add_edge("retrieve", "grade_documents")
+workflow.add_conditional_edges("retrieve", grading_router)
 workflow.add_edge("transform_query", "retrieve")
 workflow.add_edge("grade_documents", "decide_to_generate")
+workflow.add_edge("grade_and_generate", "decide_to_generate")
 workflow.add_conditional_edges("generate", reflection_validator)
+workflow.add_conditional_edges("printer", reflection_scheduler)
 
 graph = workflow.compile(checkpointer=None)
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""Multi-query retrieval, an alternative to the ``transform_query`` retry loop.
+
+Instead of retrieving, grading and only then rewriting the question when
+nothing was relevant, several rewrites are generated up front and every
+version of the question is retrieved concurrently. The rankings are fused
+into one deduplicated list that is graded once, so the worst case costs one
+retrieval round instead of one per retry.
+
+The original question is retrieved while the rewrites are being generated.
+If the rewriter fails, its results are used alone.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Sequence
+
+from langchain_core.runnables import Runnable
+
+from rag_agent.document import Document
+from rag_agent.retrieval_cache import normalize_question
+from rag_agent.vector_stores.hybrid_vector_search import document_key, reciprocal_rank_fusion
+
+
+logger = logging.getLogger("rag")
+
+FUSION_STRATEGIES = ("rrf", "round_robin")
+
+
+def round_robin_fusion(rankings: Sequence[Sequence[Document]]) -> list[Document]:
+    """First document of every ranking, then the second ones... skipping repeats."""
+    fused, seen = [], set()
+    for rank in range(max((len(ranking) for ranking in rankings), default=0)):
+        for ranking in rankings:
+            if rank < len(ranking) and document_key(ranking[rank]) not in seen:
+                seen.add(document_key(ranking[rank]))
+                fused.append(ranking[rank])
+    return fused
+
+
+def fuse_rankings(rankings: Sequence[Sequence[Document]], strategy: str = "rrf") -> list[Document]:
+    """All the distinct documents of the rankings, best first."""
+    if strategy == "rrf":
+        return reciprocal_rank_fusion(rankings, k=sum(len(ranking) for ranking in rankings))
+    if strategy == "round_robin":
+        return round_robin_fusion(rankings)
+    raise ValueError(f"Unknown fusion strategy '{strategy}'. Expected one of {FUSION_STRATEGIES}.")
+
+
+async def multi_query_retrieve(
+    retrieve_query: Callable[[str], Awaitable[list[Document]]],
+    rewriter: Runnable,
+    question: str,
+    rewrites: int = 3,
+    strategy: str = "rrf",
+) -> tuple[list[Document], list[str]]:
+    """Fused documents of ``question`` and its rewrites, and the rewrites used."""
+    if strategy not in FUSION_STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy '{strategy}'. Expected one of {FUSION_STRATEGIES}.")
+
+    async def rewrite() -> list[str]:
+        try:
+            return (await rewriter.ainvoke({"question": question, "count": rewrites})).queries
+        except Exception as e:
+            logger.warning("Multi-query rewriting failed, retrieving the original question only: %s", e)
+            return []
+
+    original, generated = await asyncio.gather(retrieve_query(question), rewrite())
+    # Rewrites equal to the question or to each other would retrieve the same documents
+    distinct = {normalize_question(question): question}
+    for query in generated:
+        distinct.setdefault(normalize_question(query), query)
+    queries = list(distinct.values())[1:rewrites + 1]
+
+    rankings = [original, *await asyncio.gather(*(retrieve_query(query) for query in queries))]
+    return fuse_rankings(rankings, strategy), queries
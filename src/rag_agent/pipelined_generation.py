@@ -0,0 +1,113 @@
+"""Generation started while the retrieved documents are still being graded.
+
+In the serial mode the answer is generated once every document is graded.
+With ``generation_mode="pipelined"`` the ``early_chunks`` best-ranked
+documents are graded on their own, alongside the rest, and the answer is
+generated from the ones that pass while the others are still being graded:
+
+- If the final context is close enough to the early one (the Jaccard
+  similarity of their chunks is at least ``restart_threshold``), the early
+  answer is kept and grading and generation overlap.
+- Otherwise the early answer is cancelled and the answer is generated again
+  from the final context.
+- If nothing passes grading, no answer is generated.
+
+Both answers are streamed, so the first tokens arrive while grading is still
+running. Before a restart ``on_restart`` is called, which in the RAG graph
+emits a reset event so the client discards the tokens of the early answer.
+"""
+
+import asyncio
+import logging
+import contextlib
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Sequence
+
+from rag_agent.context import AssembledContext, jaccard
+from rag_agent.document import Document
+from rag_agent.vector_stores.hybrid_vector_search import document_key
+
+
+logger = logging.getLogger("rag")
+
+GENERATION_MODES = ("serial", "pipelined")
+
+# Pipelined generations, early answers started, kept and restarted
+_counts = {"runs": 0, "early": 0, "kept": 0, "restarted": 0}
+
+
+@dataclass
+class PipelinedGeneration:
+    relevant: list[Document]  # Documents graded as relevant, in retrieval order
+    context: Optional[AssembledContext]  # Context of the generation, None if nothing is relevant
+    generation: str
+    restarted: bool
+
+
+def context_similarity(a: AssembledContext, b: AssembledContext) -> float:
+    return jaccard({document_key(doc) for doc in a.documents}, {document_key(doc) for doc in b.documents})
+
+
+async def _cancel(task: Optional[asyncio.Task]) -> None:
+    if task is not None and not task.done():
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
+async def pipelined_generate(
+    grade: Callable[[Sequence[Document]], Awaitable[list[Document]]],
+    build_context: Callable[[list[Document]], AssembledContext],
+    generate: Callable[[AssembledContext], Awaitable[str]],
+    documents: Sequence[Document],
+    early_chunks: int = 3,
+    restart_threshold: float = 0.6,
+    on_restart: Callable[[], None] = lambda: None,
+) -> PipelinedGeneration:
+    """
+    Grade ``documents`` (best first) and generate the answer from the relevant ones.
+
+    ``grade`` returns the relevant documents of a list, it's called once for
+    the early chunks and once for the rest. ``generate`` returns the answer
+    from a context.
+    """
+    _counts["runs"] += 1
+    head, tail = list(documents[:early_chunks]), list(documents[early_chunks:])
+    tail_grading = asyncio.create_task(grade(tail))
+    early_generation: Optional[asyncio.Task] = None
+    try:
+        early_relevant = await grade(head)
+        early_context = build_context(early_relevant) if early_relevant else None
+        if early_context is not None and early_context.documents:
+            early_generation = asyncio.create_task(generate(early_context))
+            _counts["early"] += 1
+        relevant = early_relevant + await tail_grading
+    except BaseException:
+        await _cancel(tail_grading)
+        await _cancel(early_generation)
+        raise
+
+    if not relevant:
+        return PipelinedGeneration(relevant, None, "", False)
+
+    context = build_context(relevant)
+    if early_generation is not None:
+        similarity = context_similarity(early_context, context)
+        if similarity >= restart_threshold:
+            _counts["kept"] += 1
+            return PipelinedGeneration(relevant, early_context, await early_generation, False)
+        logger.info("Restarting the generation, the graded context changed (similarity %.2f)", similarity)
+        await _cancel(early_generation)
+        _counts["restarted"] += 1
+        on_restart()
+    return PipelinedGeneration(relevant, context, await generate(context), early_generation is not None)
+
+
+def pipeline_stats() -> dict[str, float]:
+    """Pipelined generations, and the share of them whose early answer was kept or restarted."""
+    runs, early = _counts["runs"], _counts["early"]
+    return {
+        **_counts,
+        "kept_ratio": round(_counts["kept"] / runs, 3) if runs else 0.0,
+        "restart_ratio": round(_counts["restarted"] / early, 3) if early else 0.0,
+    }
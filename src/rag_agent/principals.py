@@ -0,0 +1,105 @@
+"""Principals allowed to read a chunk, stored as metadata for pre-filtered retrieval.
+
+Every chunk can carry the list of principals that may read its source file,
+in the ``ACL_METADATA_FIELD`` metadata field:
+
+    "anyone", "user:<email>", "group:<email>", "domain:<domain>"
+
+With ``RAG_ACL_PREFILTER=true``, the Pinecone and Azure AI Search providers
+only return chunks shared with one of the user's principals, or without the
+field, so restricted users don't run retries on results they can't see.
+
+The principals are a snapshot of the Drive permissions taken when they were
+written, so the retrieved chunks are still checked against the live
+permissions (``DriveACL``, cached for ``DRIVE_ACL_CACHE_TTL`` seconds):
+
+- A chunk whose file was unshared after the snapshot is dropped by that check.
+- A chunk whose file was shared after the snapshot isn't retrieved for the
+  new readers until its principals are written again.
+- Chunks ingested without the field pass the pre-filter and are checked
+  like any other, so they stay visible to the users allowed to read them.
+
+Write the principals of an index again after an ingestion or a permission
+change. For Pinecone, run from the ``src`` directory:
+
+    python -m rag_agent.principals <index_name>
+
+The Azure index needs a filterable ``Collection(Edm.String)`` field with
+that name.
+"""
+
+import os
+import argparse
+import logging
+from typing import Iterable, Optional
+
+
+logger = logging.getLogger("rag")
+
+ACL_METADATA_FIELD = os.getenv("ACL_METADATA_FIELD", "allowed_principals")
+ANYONE = "anyone"
+
+
+def acl_prefilter_enabled() -> bool:
+    return os.environ.get("RAG_ACL_PREFILTER") == "true"
+
+
+def principal(kind: str, value: str = "") -> str:
+    return ANYONE if kind == "anyone" else f"{kind}:{value.lower()}"
+
+
+def user_principals(user_email: str, groups: Iterable[str] = ()) -> tuple[str, ...]:
+    """Principals a user acts as, sorted so they can be part of a cache key."""
+    user_email = (user_email or "").lower()
+    if not user_email:
+        return (ANYONE,)
+    return tuple(sorted({
+        ANYONE,
+        principal("user", user_email),
+        principal("domain", user_email.rsplit("@", 1)[-1]),
+        *(principal("group", group) for group in groups),
+    }))
+
+
+def pinecone_filter(principals: Iterable[str]) -> dict:
+    # $in matches list fields holding any of the values, chunks without the field are checked after retrieval
+    return {"$or": [
+        {ACL_METADATA_FIELD: {"$in": list(principals)}},
+        {ACL_METADATA_FIELD: {"$exists": False}},
+    ]}
+
+
+def azure_filter(principals: Iterable[str]) -> str:
+    values = ",".join(principals).replace("'", "''")
+    # any() without a lambda is false for empty and null collections
+    return f"({ACL_METADATA_FIELD}/any(p: search.in(p, '{values}', ',')) or not {ACL_METADATA_FIELD}/any())"
+
+
+def backfill_pinecone(index_name: str, batch_size: int = 100, source_key: str = "source") -> None:
+    """Set the principals of every chunk of a Pinecone index from the Drive permissions of its source."""
+    from rag_agent.drive_acl import file_id
+    from rag_agent.storage_services import StorageServiceFactory
+    from rag_agent.vector_stores.pinecone_pool import get_client, get_index_host
+
+    acl = StorageServiceFactory.create_storage_service_instance("drive").acl
+    index = get_client().Index(host=get_index_host(index_name))
+    updated = skipped = 0
+    for ids in index.list(limit=batch_size):
+        vectors = index.fetch(ids=ids).vectors
+        sources = {i: file_id((vector.metadata or {}).get(source_key, "")) for i, vector in vectors.items()}
+        principals = acl.file_principals([source for source in sources.values() if source])
+        for chunk_id, source in sources.items():
+            allowed: Optional[list[str]] = principals.get(source)
+            if allowed is None:
+                skipped += 1
+                continue
+            index.update(id=chunk_id, set_metadata={ACL_METADATA_FIELD: allowed})
+            updated += 1
+    logger.info("Pinecone index %s: principals set on %d chunks, %d without a readable Drive source", index_name, updated, skipped)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the allowed principals of the chunks of a Pinecone index")
+    parser.add_argument("index_name")
+    logging.basicConfig(level=logging.INFO)
+    backfill_pinecone(parser.parse_args().index_name)
@@ -10,4 +10,38 @@ GRADE_ANSWER_PROMPT = """You are a grader assessing whether an answer addresses
             Give a binary score 'yes' or 'no'. Yes' means that the answer resolves the question."""
 
 TRANSFORM_QUERY_PROMPT = """You a question re-writer that converts an input question to a better version that is optimized \n 
-     for vectorstore retrieval. Look at the input and try to reason about the underlying semantic intent / meaning."""
\ No newline at end of file
+     for vectorstore retrieval. Look at the input and try to reason about the underlying semantic intent / meaning."""
+
+# Vendored copy of the "rlm/rag-prompt" LangChain Hub prompt
+RAG_GENERATION_PROMPT = """You are an assistant for question-answering tasks. Use the following pieces of retrieved context to answer the question. If you don't know the answer, just say that you don't know. Use three sentences maximum and keep the answer concise.
+Question: {question} 
+Context: {context} 
+Answer:"""
+
+GRADE_DOCUMENTS_HUMAN_PROMPT = "Retrieved document: \n\n {document} \n\n User question: {question}"
+
+GRADE_HALLUCINATIONS_HUMAN_PROMPT = "Set of facts: \n\n {documents} \n\n LLM generation: {generation}"
+
+GRADE_ANSWER_HUMAN_PROMPT = "User question: \n\n {question} \n\n LLM generation: {generation}"
+
+TRANSFORM_QUERY_HUMAN_PROMPT = "Here is the initial question: \n\n {question} \n Formulate an improved question."
+
+GRADE_DOCUMENTS_BATCH_PROMPT = """You are a grader assessing relevance of a set of numbered retrieved documents to a user question. \n
+        Grade every document on its own. If a document contains keyword(s) or semantic meaning related to the user question, grade it as relevant. \n
+        It does not need to be a stringent test. The goal is to filter out erroneous retrievals. \n
+        Return one binary score 'yes' or 'no' per document, with the number of the document it refers to."""
+
+GRADE_DOCUMENTS_BATCH_HUMAN_PROMPT = "Retrieved documents: \n\n {documents} \n\n User question: {question}"
+
+MULTI_QUERY_PROMPT = """You are a question re-writer that generates alternative versions of a user question to retrieve relevant documents from a vectorstore. \n
+        Write {count} different versions of the question, each one looking at it from another angle or with other words. \n
+        Keep the language of the question, and keep codes, names and numbers exactly as written."""
+
+MULTI_QUERY_HUMAN_PROMPT = "Here is the initial question: \n\n {question} \n Formulate {count} alternative questions."
+
+GRADE_GENERATION_PROMPT = """You are a grader assessing an LLM generation against a set of retrieved facts and the user question. \n
+     Give two binary scores 'yes' or 'no'. \n
+     'grounded': 'yes' means that the answer is grounded in / supported by the set of facts. \n
+     'answers_question': 'yes' means that the answer resolves the question."""
+
+GRADE_GENERATION_HUMAN_PROMPT = "Set of facts: \n\n {documents} \n\n User question: {question} \n\n LLM generation: {generation}"
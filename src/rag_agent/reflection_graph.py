@@ -0,0 +1,52 @@
+"""Post-hoc reflection of RAG answers, run in the background.
+
+With ``reflection_mode="async"`` the RAG agent answers without waiting for
+the graders and enqueues this graph on the conversation thread. It grades
+the answer, records the verdict in ``reflection_verdicts`` on the thread and,
+if the answer isn't grounded in the retrieved documents, appends a warning
+to the conversation.
+"""
+
+import datetime
+from operator import add
+
+from langchain_core.messages import AIMessage, AnyMessage
+from langgraph.graph import StateGraph, add_messages
+from typing_extensions import Annotated, TypedDict
+
+from rag_agent.config import Configuration
+from rag_agent.errors import HALLUCINATION_WARNING
+
+
+class ReflectionState(TypedDict):
+    messages: Annotated[list[AnyMessage], add_messages]
+    question: str
+    context: str  # The context the answer was generated from
+    generation: str
+    reflection_verdicts: Annotated[list[dict], add]
+
+
+async def reflect(state: ReflectionState) -> dict:
+    # Imported here so the graders are only built by the processes that run reflections
+    from rag_agent.graph import grade_generation
+
+    grounded, answers_question = await grade_generation(
+        state["question"], state["context"], state["generation"], Configuration.from_context().reflection_grading
+    )
+    verdict = {
+        "question": state["question"],
+        "grounded": grounded,
+        "answers_question": answers_question,
+        "graded_at": datetime.datetime.now(datetime.UTC).isoformat(),
+    }
+    update = {"reflection_verdicts": [verdict]}
+    if grounded != "yes":
+        update["messages"] = [AIMessage(HALLUCINATION_WARNING)]
+    return update
+
+
+workflow = StateGraph(ReflectionState, config_schema=Configuration)
+workflow.add_node("reflect", reflect)
+workflow.set_entry_point("reflect")
+
+graph = workflow.compile()
@@ -0,0 +1,127 @@
+"""Local relevance scorers used to grade retrieved documents without the LLM.
+
+A scorer rates every (question, document) pair in one vectorized batch with
+a score in [0, 1]. In the ``local`` grading mode, documents above the high
+threshold are kept and documents below the low one are dropped. Only the
+borderline ones go to the LLM grader (see ``rag_agent.grading``).
+
+- ``lexical``: weighted coverage of the question terms by the document, on CPU.
+- ``hybrid``: lexical score blended with the cosine similarity of the
+  question and document embeddings (one embedding request for all documents).
+- ``cross_encoder``: a small multilingual cross-encoder run on CPU, needs the
+  optional ``sentence-transformers`` package.
+
+The ``local`` mode is experimental and off by default: the default
+thresholds (0.45 and 0.7) are placeholders that haven't been calibrated yet.
+Calibrate them with ``python -m benchmarks.calibrate_relevance`` before
+enabling it on an index.
+"""
+
+import asyncio
+import functools
+from abc import ABC, abstractmethod
+from typing import Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from common.text import tokenize
+from rag_agent.document import Document
+
+
+# Spanish words are inflected, so terms are compared by their first letters
+STEM_LENGTH = 6
+# Weight of the embedding similarity in the hybrid score
+HYBRID_SEMANTIC_WEIGHT = 0.7
+CROSS_ENCODER_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+
+def _stems(text: str) -> set[str]:
+    return {token[:STEM_LENGTH] for token in tokenize(text)}
+
+
+class RelevanceScorer(ABC):
+
+    @abstractmethod
+    async def ascore(self, question: str, documents: Sequence[Document]) -> np.ndarray:
+        """Relevance of each document to ``question``, in [0, 1]."""
+
+
+class LexicalScorer(RelevanceScorer):
+
+    def score(self, question: str, documents: Sequence[Document]) -> np.ndarray:
+        terms = sorted(_stems(question))
+        if not terms or not documents:
+            return np.zeros(len(documents))
+        document_stems = [_stems(doc.content) for doc in documents]
+        # (documents x question terms) presence matrix
+        presence = np.array([[term in stems for term in terms] for stems in document_stems], dtype=np.float32)
+        # Terms found in fewer of the retrieved documents are more discriminative
+        document_frequency = presence.sum(axis=0)
+        weights = np.log1p(len(documents) / (1 + document_frequency)) + 1
+        return presence @ weights / weights.sum()
+
+    async def ascore(self, question: str, documents: Sequence[Document]) -> np.ndarray:
+        return self.score(question, documents)
+
+
+class HybridScorer(RelevanceScorer):
+
+    def __init__(self, embedding_model: Embeddings, semantic_weight: float = HYBRID_SEMANTIC_WEIGHT):
+        self.embedding_model = embedding_model
+        self.semantic_weight = semantic_weight
+        self.lexical = LexicalScorer()
+
+    async def ascore(self, question: str, documents: Sequence[Document]) -> np.ndarray:
+        if not documents:
+            return np.zeros(0)
+        question_vector, document_vectors = await asyncio.gather(
+            self.embedding_model.aembed_query(question),
+            self.embedding_model.aembed_documents([doc.content for doc in documents]),
+        )
+        question_vector = np.asarray(question_vector, dtype=np.float32)
+        document_vectors = np.asarray(document_vectors, dtype=np.float32)
+        similarity = document_vectors @ question_vector / (
+            np.linalg.norm(document_vectors, axis=1) * np.linalg.norm(question_vector) + 1e-9
+        )
+        semantic = np.clip(similarity, 0, 1)
+        return self.semantic_weight * semantic + (1 - self.semantic_weight) * self.lexical.score(question, documents)
+
+
+@functools.lru_cache(maxsize=1)
+def load_cross_encoder(model_name: str):
+    try:
+        from sentence_transformers import CrossEncoder
+    except ImportError:
+        raise ValueError("The cross_encoder relevance scorer needs the sentence-transformers package.")
+    return CrossEncoder(model_name, device="cpu")
+
+
+class CrossEncoderScorer(RelevanceScorer):
+
+    def __init__(self, model_name: str = CROSS_ENCODER_MODEL):
+        self.model_name = model_name
+
+    def score(self, question: str, documents: Sequence[Document]) -> np.ndarray:
+        if not documents:
+            return np.zeros(0)
+        model = load_cross_encoder(self.model_name)
+        # Single-label cross-encoders return sigmoid scores in [0, 1]
+        return np.asarray(model.predict([(question, doc.content) for doc in documents]), dtype=np.float32)
+
+    async def ascore(self, question: str, documents: Sequence[Document]) -> np.ndarray:
+        return await asyncio.to_thread(self.score, question, documents)
+
+
+class RelevanceScorerFactory:
+
+    @staticmethod
+    def create_scorer_instance(scorer: str, embedding_model: Embeddings) -> RelevanceScorer:
+        if scorer == "lexical":
+            return LexicalScorer()
+        elif scorer == "hybrid":
+            return HybridScorer(embedding_model)
+        elif scorer == "cross_encoder":
+            return CrossEncoderScorer()
+        else:
+            raise ValueError(f"Unknown relevance scorer '{scorer}'.")
@@ -0,0 +1,175 @@
+"""TTL cache of retrieval results.
+
+Many users ask the same procedural questions. ``retrieve`` looks the
+documents up by provider, index, retrieval settings and normalized question
+before going to the vector store, and keeps them for
+``RETRIEVAL_CACHE_TTL`` seconds (0 disables the cache).
+
+Cached results are also tied to the version of the index they came from.
+Ingestion jobs call ``mark_index_ingested``, which writes a new version
+stamp under ``INDEX_VERSIONS_DIR``. For ``faiss_local`` the published
+version is used. Stamps are read at most every ``INDEX_VERSION_CHECK_INTERVAL``
+seconds, so a result can still be served for that long after a
+re-ingestion. ``retrieval_cache_stats()`` counts those stale serves,
+along with the hit rate and the memory held.
+"""
+
+import os
+import sys
+import time
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+from rag_agent.document import Document
+from common.text import normalize_text
+
+
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "600"))  # Seconds
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "2048"))
+INDEX_VERSIONS_DIR = Path(os.getenv("INDEX_VERSIONS_DIR", "data/index_versions"))
+INDEX_VERSION_CHECK_INTERVAL = float(os.getenv("INDEX_VERSION_CHECK_INTERVAL", "10"))  # Seconds
+# Results of in-process stores are cheap and change without a stamp
+UNCACHED_PROVIDERS = ("in_memory",)
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, accent-free, single-spaced question without the surrounding punctuation."""
+    return " ".join(normalize_text(question).split()).strip("¿?¡!.,;: ")
+
+
+def _stamp_path(provider: str, index_name: str) -> Path:
+    return INDEX_VERSIONS_DIR / provider / index_name
+
+
+def mark_index_ingested(provider: str, index_name: str) -> str:
+    """Give ``index_name`` a new version stamp, invalidating its cached results in every process."""
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    path = _stamp_path(provider, index_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(version)
+    os.replace(tmp, path)
+    return version
+
+
+def _read_version(provider: str, index_name: str) -> tuple[str, float]:
+    """Current version of the index and when it was published (epoch seconds, 0 if unknown)."""
+    if provider == "faiss_local":
+        from rag_agent.vector_stores.faiss_local_vector_search import FAISS_LOCAL_DIR, POINTER_FILE
+
+        path = FAISS_LOCAL_DIR / index_name / POINTER_FILE
+    else:
+        path = _stamp_path(provider, index_name)
+    try:
+        return path.read_text().strip(), path.stat().st_mtime
+    except FileNotFoundError:
+        return "", 0.0
+
+
+class _IndexVersion:
+    def __init__(self, version: str):
+        self.version = version
+        self.checked_at = time.monotonic()
+        # When each hit since the last check was served, to count the stale ones
+        self.served_at: list[float] = []
+
+
+class _Entry:
+    def __init__(self, documents: list[Document], version: str, size: int):
+        self.documents = documents
+        self.version = version
+        self.size = size
+        self.expires_at = time.monotonic() + RETRIEVAL_CACHE_TTL
+
+
+def _size_of(documents: list[Document]) -> int:
+    return sys.getsizeof(documents) + sum(
+        sys.getsizeof(document) + sum(sys.getsizeof(value) for value in vars(document).values())
+        for document in documents
+    )
+
+
+class RetrievalCache:
+    """LRU of retrieval results with a TTL and an index version per entry."""
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._versions: dict[tuple[str, str], _IndexVersion] = {}
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "invalidated": 0, "stale_serves": 0}
+
+    def _version(self, provider: str, index_name: str) -> str:
+        index = (provider, index_name)
+        current = self._versions.get(index)
+        if current is not None and time.monotonic() - current.checked_at < INDEX_VERSION_CHECK_INTERVAL:
+            return current.version
+        version, published_at = _read_version(provider, index_name)
+        with self._lock:
+            if current is not None and version != current.version:
+                # Hits served after the new version was published returned old results
+                self.stats["stale_serves"] += sum(1 for served in current.served_at if served >= published_at)
+                outdated = [key for key in self._entries if key[:2] == index]
+                for key in outdated:
+                    self._remove(key)
+                self.stats["invalidated"] += len(outdated)
+            self._versions[index] = _IndexVersion(version)
+        return version
+
+    def _remove(self, key: tuple) -> None:
+        self.memory_bytes -= self._entries.pop(key).size
+
+    def get(self, provider: str, index_name: str, settings: tuple, question: str) -> Optional[list[Document]]:
+        if RETRIEVAL_CACHE_TTL <= 0 or provider in UNCACHED_PROVIDERS:
+            return None
+        version = self._version(provider, index_name)
+        key = (provider, index_name, settings, normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if entry.version != version or entry.expires_at < time.monotonic():
+                self.stats["invalidated" if entry.version != version else "expired"] += 1
+                self.stats["misses"] += 1
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            self._versions[(provider, index_name)].served_at.append(time.time())
+            return list(entry.documents)
+
+    def put(self, provider: str, index_name: str, settings: tuple, question: str, documents: list[Document]) -> None:
+        if RETRIEVAL_CACHE_TTL <= 0 or provider in UNCACHED_PROVIDERS:
+            return
+        version = self._version(provider, index_name)
+        key = (provider, index_name, settings, normalize_question(question))
+        entry = _Entry(list(documents), version, _size_of(documents))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.memory_bytes += entry.size
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def cache_stats(self) -> dict[str, float]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "memory_bytes": self.memory_bytes,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+retrieval_cache = RetrievalCache()
+
+
+def retrieval_cache_stats() -> dict[str, float]:
+    """Hits, misses, expired and invalidated entries, stale serves, memory held and hit rate."""
+    return retrieval_cache.cache_stats()
@@ -1,12 +1,25 @@
 import os
-import re
+import asyncio
+import functools
+from typing import Optional
 from abc import ABC, abstractmethod
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 
+from rag_agent.drive_acl import DriveACL
+
+
+DIRECTORY_SCOPE = "https://www.googleapis.com/auth/admin.directory.group.readonly"
+
+
+def auth_required() -> bool:
+    return os.environ.get('RAG_AUTH_REQUIRED') == 'true'
+
 class StorageServiceFactory:
     
+    # Services are built once per process, their API clients and permission caches are reused
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def create_storage_service_instance(type: str):
         if(type == "drive"):
             return DriveService()
@@ -20,6 +33,13 @@ class StorageService(ABC):
     def validate_permissions(self, documents, user_email) -> list:
         pass
 
+    async def avalidate_permissions(self, documents, user_email) -> list:
+        return await asyncio.to_thread(self.validate_permissions, documents, user_email)
+
+    async def aprincipals(self, user_email) -> Optional[tuple[str, ...]]:
+        """Principals to pre-filter the retrieval with, None if the service can't express its permissions that way."""
+        return None
+
 
 class DriveService(StorageService):
     def __init__(self):
@@ -31,53 +51,59 @@ class DriveService(StorageService):
             self.credentials_path, scopes=self.scopes
         )
         self.service = build("drive", "v3", credentials=self.creds)
+        self.acl = DriveACL(self.service, self._build_directory_service())
+
+    def _build_directory_service(self):
+        """Directory API client used to expand group permissions, None if no admin to impersonate is set."""
+        subject = os.getenv("GOOGLE_ADMIN_SUBJECT")
+        if not subject:
+            return None
+        creds = service_account.Credentials.from_service_account_file(
+            self.credentials_path, scopes=[DIRECTORY_SCOPE], subject=subject
+        )
+        return build("admin", "directory_v1", credentials=creds)
 
     def validate_permissions(self, documents, user_email):
         """
-        Validates user permissions for a list of documents by checking if the user's email matches
-        any user-level permission for each document's Google Drive ID.
+        Validates user permissions for a list of documents against the Drive permissions of each
+        document's Google Drive ID.
 
-        For each document, extracts the Google Drive document ID from its source URL, then queries
-        the Drive API to retrieve the document's permissions. If the user's email (local part only)
-        matches any user permission, the document is added to the allowed list.
+        For each document, extracts the Google Drive document ID from its source URL. A document is
+        allowed if it's shared with the user's email, their domain, one of their groups or anyone.
+        Permissions come from the ``DriveACL`` cache, misses are fetched in one batch request.
 
         Args:
             documents (list): A list of document objects, each containing a 'source' attribute.
             user_email (str): The email address of the user whose permissions are to be validated.
 
         Returns:
-            list: A list of document objects for which the user has user-level permission.
+            list: A list of document objects the user has permission to read.
         """
 
         if not documents:
             return []
-        
-        auth_required = os.environ.get('RAG_AUTH_REQUIRED') == 'true' 
 
-        if not auth_required:
+        if not auth_required():
             return documents
-        allowed_documents = []
-
-        for document in documents:
-            source = document.source
-            pattern = r"(?<=d/)(.*?)(?=/edit|view)"
-            document_id_match = re.findall(pattern, source)
-            
-            if document_id_match:
-                document_id = document_id_match[0]
-                permissions = self.service.permissions().list(
-                    fileId=document_id, fields='permissions(type, emailAddress)'
-                ).execute()
-
-                for perm in permissions.get("permissions", []):
-                    if perm.get("type") == "user":
-                        email = perm["emailAddress"]
-                        if email == user_email:
-                            allowed_documents.append(document)
-                            break 
-
-        return allowed_documents
+
+        return self.acl.filter(documents, user_email)
+
+    async def avalidate_permissions(self, documents, user_email):
+        """Async ``validate_permissions``, the Drive requests run in worker threads."""
+        if not documents:
+            return []
+
+        if not auth_required():
+            return documents
+
+        return await self.acl.afilter(documents, user_email)
+
+    async def aprincipals(self, user_email):
+        return await self.acl.aprincipals(user_email)
 
 class AzureService(StorageService):
     def validate_permissions(self, documents, user_email):
         return documents
+
+    async def avalidate_permissions(self, documents, user_email):
+        return documents
@@ -19,4 +19,36 @@ class GradeAnswer(BaseModel):
 
     binary_score: str = Field(
         description="Answer addresses the question, 'yes' or 'no'"
-    )
\ No newline at end of file
+    )
+
+class DocumentGrade(BaseModel):
+    """Relevance verdict for one of the numbered documents."""
+
+    index: int = Field(description="Number of the document, as given in the input")
+    binary_score: str = Field(
+        description="Document is relevant to the question, 'yes' or 'no'"
+    )
+
+class GradeDocumentsBatch(BaseModel):
+    """Binary relevance scores for all the retrieved documents."""
+
+    grades: list[DocumentGrade] = Field(
+        description="One verdict per retrieved document"
+    )
+
+class MultiQuery(BaseModel):
+    """Alternative versions of the user question for retrieval."""
+
+    queries: list[str] = Field(
+        description="Rewritten versions of the question"
+    )
+
+class GradeGeneration(BaseModel):
+    """Binary scores for grounding and usefulness of the generation, graded at once."""
+
+    grounded: str = Field(
+        description="Answer is grounded in the facts, 'yes' or 'no'"
+    )
+    answers_question: str = Field(
+        description="Answer addresses the question, 'yes' or 'no'"
+    )
@@ -1,41 +1,92 @@
 import os
+import asyncio
+import weakref
+from typing import Optional
 
-os.environ["AZURESEARCH_FIELDS_CONTENT_VECTOR"] = "embedding"
-
-from langchain_community.vectorstores.azuresearch import AzureSearch
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents.aio import SearchClient
+from azure.search.documents.models import VectorizedQuery
 from langchain_openai import AzureOpenAIEmbeddings
 
 from rag_agent.document import Document
+from rag_agent.principals import azure_filter
 from rag_agent.vector_stores.vector_search_service import VectorSearch
 
 
+VECTOR_FIELD = os.getenv("AZURESEARCH_FIELDS_CONTENT_VECTOR", "embedding")
+CONTENT_FIELD = os.getenv("AZURESEARCH_FIELDS_CONTENT", "content")
+# Only the fields used to build the documents are returned, never the vectors
+DEFAULT_SELECT_FIELDS = (CONTENT_FIELD, "sourcefile")
+CONTAINER_PATH = "https://st7u7cm3u3wwcww.blob.core.windows.net/content/"
+
+
 class AzureVectorSearch(VectorSearch):
+    """
+    Hybrid (text + vector) search on an Azure AI Search index, fully async.
+
+    The question is embedded with ``aembed_query`` and one async
+    ``SearchClient`` (with its connection pool) is reused per event loop.
+    With a ``semantic_configuration_name`` the results are reranked by the
+    semantic ranker of the index.
+    """
+    supports_acl_filter = True
 
-    def __init__(self, api_key, endpoint, index_name, embedding_model: AzureOpenAIEmbeddings):
-        
-        self._vector_store = AzureSearch(
-            azure_search_key=api_key,
-            embedding_function=embedding_model.embed_query,
-            index_name=index_name,
-            azure_search_endpoint=endpoint,
-            semantic_configuration_name="default",
+    def __init__(
+        self,
+        api_key,
+        endpoint,
+        index_name,
+        embedding_model: AzureOpenAIEmbeddings,
+        k: int = 5,
+        select_fields: tuple[str, ...] = DEFAULT_SELECT_FIELDS,
+        semantic_configuration_name: Optional[str] = None,
+    ):
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.index_name = index_name
+        self.embedding_model = embedding_model
+        self.k = k
+        self.select_fields = list(select_fields)
+        self.semantic_configuration_name = semantic_configuration_name
+        # The async client is bound to the event loop that opened its session
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SearchClient]" = weakref.WeakKeyDictionary()
+
+    def get_search_client(self) -> SearchClient:
+        loop = asyncio.get_running_loop()
+        if loop not in self._clients:
+            self._clients[loop] = SearchClient(
+                endpoint=self.endpoint,
+                index_name=self.index_name,
+                credential=AzureKeyCredential(self.api_key),
+            )
+        return self._clients[loop]
+
+    async def retrieve(self, question, principals=None):
+        vector = await self.embedding_model.aembed_query(question)
+
+        search_kwargs = {}
+        if self.semantic_configuration_name:
+            search_kwargs = {
+                "query_type": "semantic",
+                "semantic_configuration_name": self.semantic_configuration_name,
+            }
+        if principals is not None:
+            # Applied before the vector search too, so the k nearest hits all pass it
+            search_kwargs["filter"] = azure_filter(principals)
+        results = await self.get_search_client().search(
+            search_text=question,
+            vector_queries=[VectorizedQuery(vector=vector, k_nearest_neighbors=self.k, fields=VECTOR_FIELD)],
+            select=self.select_fields,
+            top=self.k,
+            **search_kwargs,
         )
 
-    def get_vector_store(self):
-        return self._vector_store
-    
-    async def retrieve(self, question):
-       
-        response = await self._vector_store.asimilarity_search(question, k=5)
-        
-        container_path = "https://st7u7cm3u3wwcww.blob.core.windows.net/content/"
         documents = []
-        
-        for doc in response:
-            title = doc.metadata['sourcefile']
-            text = doc.page_content
-            link = container_path + title
+        async for result in results:
+            title = result['sourcefile']
+            text = result[CONTENT_FIELD]
+            link = CONTAINER_PATH + title
             new_document = Document(text, title, link)
             documents.append(new_document)
-        
+
         return documents
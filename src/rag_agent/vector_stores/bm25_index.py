@@ -0,0 +1,229 @@
+"""Local BM25 keyword index over the chunks of a vector index.
+
+Dense search misses exact identifiers such as document codes ("HZ-5678"),
+which are rare tokens that BM25 ranks first. The chunks of each index are
+kept in a SQLite file, ``BM25_INDEX_DIR/<index_name>.sqlite3``, and every
+process holds an in-memory inverted index built from it.
+
+Chunks are added and removed by id. Each change is also written to a change
+log, so readers apply only the new changes instead of rebuilding their index.
+They check the log every ``BM25_REFRESH_INTERVAL`` seconds.
+
+To load the chunks of a Pinecone index, or to sync them again after an ingestion, run from the ``src`` directory:
+
+    python -m rag_agent.vector_stores.bm25_index <index_name>
+"""
+
+import os
+import re
+import math
+import time
+import heapq
+import sqlite3
+import logging
+import argparse
+import functools
+import threading
+from pathlib import Path
+from collections import Counter, defaultdict
+from typing import Iterable
+
+from rag_agent.document import Document
+from common.text import normalize_text, tokenize
+
+
+logger = logging.getLogger("rag")
+
+BM25_INDEX_DIR = Path(os.getenv("BM25_INDEX_DIR", "data/bm25"))
+REFRESH_INTERVAL = float(os.getenv("BM25_REFRESH_INTERVAL", "5"))  # Seconds
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Changes kept in the log, readers further behind reload the whole index
+CHANGES_KEPT = 10000
+
+# Codes like "HZ-5678" or "QMS.04/2" are also indexed as one token
+CODE_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)+")
+
+
+def bm25_tokens(text: str) -> list[str]:
+    codes = [re.sub(r"[-_./]", "", code) for code in CODE_PATTERN.findall(normalize_text(text))]
+    return tokenize(text) + codes
+
+
+class BM25Index:
+    """Inverted index of chunks with incremental adds and removes."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, content TEXT, filename TEXT, source TEXT)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL, removed INTEGER NOT NULL)"
+            )
+        self._reload()
+
+    def _reset(self) -> None:
+        self.postings: dict[str, dict[str, int]] = defaultdict(dict)
+        self.lengths: dict[str, int] = {}
+        self.documents: dict[str, Document] = {}
+        self.total_length = 0
+
+    def _reload(self) -> None:
+        with self._lock:
+            self._reset()
+            # One transaction, so the chunks and the log position are consistent
+            self._connection.execute("BEGIN")
+            try:
+                self.last_seq = self._connection.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+                for chunk_id, content, filename, source in self._connection.execute("SELECT * FROM chunks"):
+                    self._index(chunk_id, Document(content, filename, source))
+            finally:
+                self._connection.execute("COMMIT")
+            self.refreshed_at = time.monotonic()
+
+    def _index(self, chunk_id: str, document: Document) -> None:
+        self._unindex(chunk_id)
+        counts = Counter(bm25_tokens(document.content))
+        for term, count in counts.items():
+            self.postings[term][chunk_id] = count
+        length = sum(counts.values())
+        self.lengths[chunk_id] = length
+        self.total_length += length
+        self.documents[chunk_id] = document
+
+    def _unindex(self, chunk_id: str) -> None:
+        document = self.documents.pop(chunk_id, None)
+        if document is None:
+            return
+        for term in set(bm25_tokens(document.content)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.lengths.pop(chunk_id)
+
+    def _log(self, ids: Iterable[str], removed: bool) -> None:
+        self._connection.executemany("INSERT INTO changes (id, removed) VALUES (?, ?)", [(i, int(removed)) for i in ids])
+        self._connection.execute(
+            "DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?", (CHANGES_KEPT,)
+        )
+
+    def add_documents(self, documents: dict[str, Document]) -> None:
+        """Add or replace chunks by id."""
+        if not documents:
+            return
+        with self._lock:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)",
+                    [(i, doc.content, doc.filename, doc.source) for i, doc in documents.items()],
+                )
+                self._log(documents, removed=False)
+            for chunk_id, document in documents.items():
+                self._index(chunk_id, document)
+
+    def remove_documents(self, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        if not ids:
+            return
+        with self._lock:
+            with self._connection:
+                self._connection.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i in ids])
+                self._log(ids, removed=True)
+            for chunk_id in ids:
+                self._unindex(chunk_id)
+
+    def refresh(self) -> None:
+        """Apply the changes written by other processes since the last refresh."""
+        with self._lock:
+            self.refreshed_at = time.monotonic()
+            oldest = self._connection.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+            behind = oldest is not None and oldest > self.last_seq + 1
+            if not behind:
+                changes = self._connection.execute(
+                    "SELECT seq, id, removed FROM changes WHERE seq > ? ORDER BY seq", (self.last_seq,)
+                ).fetchall()
+                if not changes:
+                    return
+                # Only the last change of each chunk matters
+                latest = {chunk_id: removed for _, chunk_id, removed in changes}
+                added = [chunk_id for chunk_id, removed in latest.items() if not removed]
+                rows = []
+                for start in range(0, len(added), 500):
+                    chunk = added[start:start + 500]
+                    rows += self._connection.execute(
+                        f"SELECT * FROM chunks WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                for chunk_id in latest:
+                    self._unindex(chunk_id)
+                for chunk_id, content, filename, source in rows:
+                    self._index(chunk_id, Document(content, filename, source))
+                self.last_seq = changes[-1][0]
+                return
+        logger.info("BM25 index %s is behind the change log, reloading", self.path.name)
+        self._reload()
+
+    def search(self, query: str, k: int) -> list[tuple[Document, float]]:
+        if time.monotonic() - self.refreshed_at > REFRESH_INTERVAL:
+            self.refresh()
+        with self._lock:
+            if not self.documents:
+                return []
+            count = len(self.documents)
+            average_length = self.total_length / count
+            scores: dict[str, float] = defaultdict(float)
+            for term in set(bm25_tokens(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, frequency in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[chunk_id] / average_length)
+                    scores[chunk_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(self.documents[chunk_id], score) for chunk_id, score in top]
+
+
+@functools.lru_cache(maxsize=None)
+def get_bm25_index(index_name: str) -> BM25Index:
+    return BM25Index(BM25_INDEX_DIR / f"{index_name}.sqlite3")
+
+
+def sync_from_pinecone(index_name: str, text_key: str = "content", batch_size: int = 100) -> None:
+    """Make the BM25 index of ``index_name`` match the chunks stored in the Pinecone index."""
+    from rag_agent.vector_stores.pinecone_pool import get_client, get_index_host
+    from rag_agent.retrieval_cache import mark_index_ingested
+
+    index = get_client().Index(host=get_index_host(index_name))
+    bm25_index = get_bm25_index(index_name)
+    seen = set()
+    for ids in index.list(limit=batch_size):
+        vectors = index.fetch(ids=ids).vectors
+        documents = {}
+        for chunk_id, vector in vectors.items():
+            metadata = vector.metadata or {}
+            if text_key in metadata:
+                documents[chunk_id] = Document(metadata[text_key], metadata.get("filename"), metadata.get("source"))
+        bm25_index.add_documents(documents)
+        seen.update(documents)
+    removed = set(bm25_index.documents) - seen
+    bm25_index.remove_documents(removed)
+    logger.info("BM25 index %s synced: %d chunks, %d removed", index_name, len(seen), len(removed))
+    # Cached retrievals of the index may predate the ingestion this sync follows
+    mark_index_ingested("pinecone", index_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the BM25 index of a Pinecone index")
+    parser.add_argument("index_name")
+    parser.add_argument("--text-key", default="content")
+    logging.basicConfig(level=logging.INFO)
+    args = parser.parse_args()
+    sync_from_pinecone(args.index_name, args.text_key)
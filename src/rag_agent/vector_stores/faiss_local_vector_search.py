@@ -0,0 +1,242 @@
+"""Local FAISS provider that serves retrievals without a network round trip.
+
+Each index lives under ``FAISS_LOCAL_DIR/<index_name>/``:
+
+    CURRENT                  name of the published version
+    <version>/index.faiss    FAISS index (HNSW, IVF or flat, inner product)
+    <version>/documents.db   SQLite sidecar with the content, filename and source of each vector
+
+Indexes are opened memory-mapped when their type allows it, so the pages are
+shared by the processes of the host and loaded on demand. ``publish_index``
+writes a new version and switches ``CURRENT`` atomically. Running searchers
+notice the switch and load the new version in a worker thread while they
+keep serving from the old one, then swap. Only the published version and the
+one before it are kept on disk.
+"""
+
+import os
+import time
+import shutil
+import asyncio
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Optional, Sequence
+
+import faiss
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag_agent.document import Document
+from rag_agent.vector_stores.vector_search_service import VectorSearch
+
+
+logger = logging.getLogger("rag")
+
+FAISS_LOCAL_DIR = Path(os.getenv("FAISS_LOCAL_DIR", "data/faiss"))
+POINTER_FILE = "CURRENT"
+INDEX_FILE = "index.faiss"
+SIDECAR_FILE = "documents.db"
+# Seconds between checks of the pointer file for a new version
+RELOAD_CHECK_INTERVAL = float(os.getenv("FAISS_RELOAD_CHECK_INTERVAL", "5"))
+IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "16"))
+HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Unit-length rows, so inner product is cosine similarity."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+class _IndexVersion:
+    """An opened version of an index: the FAISS index and its sidecar."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        try:
+            self.index = faiss.read_index(str(path / INDEX_FILE), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # Not every index type can be memory-mapped
+            self.index = faiss.read_index(str(path / INDEX_FILE), faiss.IO_FLAG_READ_ONLY)
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            ivf.nprobe = IVF_NPROBE
+        if hasattr(self.index, "hnsw"):
+            self.index.hnsw.efSearch = HNSW_EF_SEARCH
+        self._sidecar = sqlite3.connect(f"file:{path / SIDECAR_FILE}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def search(self, vector: Sequence[float], k: int) -> list[tuple[Document, float]]:
+        scores, ids = self.index.search(_normalize(np.asarray([vector])), k)
+        hits = [(int(i), float(score)) for i, score in zip(ids[0], scores[0]) if i != -1]
+        if not hits:
+            return []
+        with self._lock:
+            rows = self._sidecar.execute(
+                f"SELECT id, content, filename, source FROM documents WHERE id IN ({','.join('?' * len(hits))})",
+                [i for i, _ in hits],
+            ).fetchall()
+        by_id = {row[0]: Document(row[1], row[2], row[3]) for row in rows}
+        return [(by_id[i], score) for i, score in hits if i in by_id]
+
+    def close(self) -> None:
+        with self._lock:
+            self._sidecar.close()
+
+
+class _LoadedIndex:
+    """The current version of an index, swapped when a new one is published."""
+
+    def __init__(self, index_dir: Path):
+        self.index_dir = index_dir
+        self.version: Optional[_IndexVersion] = None
+        self.version_name: Optional[str] = None
+        self.checked_at = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+
+    def published_version(self) -> str:
+        return (self.index_dir / POINTER_FILE).read_text().strip()
+
+    def _load(self, version_name: str) -> None:
+        self.version = _IndexVersion(self.index_dir / version_name)
+        self.version_name = version_name
+        self.checked_at = time.monotonic()
+        logger.info("Loaded FAISS index %s version %s (%d vectors)", self.index_dir.name, version_name, self.version.index.ntotal)
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if self.version is None:
+                self._load(self.published_version())
+
+    def _swap(self, version_name: str) -> None:
+        try:
+            with self._lock:
+                previous = self.version
+                self._load(version_name)
+            # Searches in flight hold their own reference, the old sidecar is closed once they are done
+            threading.Timer(RELOAD_CHECK_INTERVAL, previous.close).start()
+        except Exception as e:
+            logger.error("Could not load FAISS index %s version %s: %s", self.index_dir.name, version_name, e)
+
+    def _check_published(self) -> None:
+        try:
+            published = self.published_version()
+            if published != self.version_name:
+                self._swap(published)
+        finally:
+            self._reloading = False
+
+    async def get(self) -> _IndexVersion:
+        if self.version is None:
+            await asyncio.to_thread(self._ensure_loaded)
+        elif time.monotonic() - self.checked_at > RELOAD_CHECK_INTERVAL and not self._reloading:
+            # Keep serving the current version while the pointer is checked and a new version loads
+            self.checked_at = time.monotonic()
+            self._reloading = True
+            asyncio.get_running_loop().run_in_executor(None, self._check_published)
+        return self.version
+
+
+_loaded: dict[str, _LoadedIndex] = {}
+
+
+class FaissLocalVectorSearch(VectorSearch):
+
+    def __init__(self, index_name: str, embedding_model: Embeddings, k: int = 4, base_dir: Path = FAISS_LOCAL_DIR):
+        self.index_name = index_name
+        self.embedding_model = embedding_model
+        self.k = k
+        index_dir = Path(base_dir) / index_name
+        if not (index_dir / POINTER_FILE).exists():
+            raise ValueError(f"FAISS index '{index_name}' has no published version in {index_dir}.")
+        self._index = _loaded.setdefault(str(index_dir), _LoadedIndex(index_dir))
+
+    async def retrieve(self, question):
+        vector = await self.embedding_model.aembed_query(question)
+        version = await self._index.get()
+        return [document for document, _ in version.search(vector, self.k)]
+
+
+def publish_index(
+    index_name: str,
+    documents: Sequence[Document],
+    vectors: np.ndarray,
+    index_type: str = "hnsw",
+    base_dir: Path = FAISS_LOCAL_DIR,
+) -> str:
+    """
+    Build a new version of ``index_name`` from documents and their embeddings and publish it.
+
+    ``index_type`` is ``"hnsw"`` (default, no training), ``"ivf"`` (needs a
+    few thousand vectors, memory-mappable) or ``"flat"`` (exact search).
+    Returns the name of the published version.
+    """
+    vectors = _normalize(vectors)
+    if len(documents) != len(vectors):
+        raise ValueError("There must be one vector per document.")
+    dimension = vectors.shape[1]
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, 32, faiss.METRIC_INNER_PRODUCT)
+    elif index_type == "ivf":
+        nlist = max(1, int(np.sqrt(len(vectors))))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dimension), dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+    elif index_type == "flat":
+        index = faiss.IndexFlatIP(dimension)
+    else:
+        raise ValueError(f"Unknown FAISS index type '{index_type}'.")
+    index.add(vectors)
+
+    index_dir = Path(base_dir) / index_name
+    version_name = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    version_dir = index_dir / version_name
+    version_dir.mkdir(parents=True)
+    faiss.write_index(index, str(version_dir / INDEX_FILE))
+    with sqlite3.connect(version_dir / SIDECAR_FILE) as sidecar:
+        sidecar.execute("CREATE TABLE documents (id INTEGER PRIMARY KEY, content TEXT, filename TEXT, source TEXT)")
+        sidecar.executemany(
+            "INSERT INTO documents VALUES (?, ?, ?, ?)",
+            [(i, doc.content, doc.filename, doc.source) for i, doc in enumerate(documents)],
+        )
+    sidecar.close()
+
+    # Atomic switch: searchers either read the old or the new pointer
+    pointer = index_dir / POINTER_FILE
+    previous = pointer.read_text().strip() if pointer.exists() else version_name
+    pointer_tmp = index_dir / f"{POINTER_FILE}.tmp"
+    pointer_tmp.write_text(version_name)
+    os.replace(pointer_tmp, pointer)
+    _prune_versions(index_dir, older_than=previous)
+    return version_name
+
+
+def _prune_versions(index_dir: Path, older_than: str) -> None:
+    """
+    Delete the versions published before ``older_than``.
+
+    The previous version is kept for searchers that haven't swapped yet;
+    version names are UTC timestamps, so they sort by publication time.
+    """
+    for version_dir in index_dir.iterdir():
+        if version_dir.is_dir() and version_dir.name < older_than:
+            try:
+                shutil.rmtree(version_dir)
+            except OSError as e:
+                logger.warning("Could not delete FAISS index %s version %s: %s", index_dir.name, version_dir.name, e)
+
+
+async def apublish_from_texts(
+    index_name: str,
+    documents: Sequence[Document],
+    embedding_model: Embeddings,
+    index_type: str = "hnsw",
+    base_dir: Path = FAISS_LOCAL_DIR,
+) -> str:
+    """Embed the documents with ``embedding_model`` and publish them as a new version."""
+    vectors = np.asarray(await embedding_model.aembed_documents([doc.content for doc in documents]), dtype=np.float32)
+    return await asyncio.to_thread(publish_index, index_name, documents, vectors, index_type, base_dir)
@@ -0,0 +1,51 @@
+"""Hybrid retrieval: vector search fused with the local BM25 index.
+
+Both searches run concurrently and their rankings are merged with
+reciprocal-rank fusion (RRF): each document scores ``1 / (rrf_k + rank)`` in
+every list it appears in. RRF only uses ranks, so the scales of the cosine
+and BM25 scores don't need to be calibrated against each other.
+"""
+
+import asyncio
+from typing import Sequence
+
+from rag_agent.document import Document
+from rag_agent.vector_stores.vector_search_service import VectorSearch
+from rag_agent.vector_stores.bm25_index import BM25Index
+
+
+# Smoothing constant of the original RRF paper, damps the weight of the top ranks
+RRF_K = 60
+
+
+def document_key(document: Document) -> tuple:
+    """Identity of a chunk across retrievers, which don't share ids."""
+    return (document.filename, document.content)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Document]], k: int, rrf_k: int = RRF_K) -> list[Document]:
+    """Top ``k`` documents of the fused rankings, each document once."""
+    scores: dict[tuple, float] = {}
+    documents: dict[tuple, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, start=1):
+            key = document_key(document)
+            scores[key] = scores.get(key, 0.0) + 1 / (rrf_k + rank)
+            documents.setdefault(key, document)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+
+class HybridVectorSearch(VectorSearch):
+
+    def __init__(self, vector_search: VectorSearch, bm25_index: BM25Index, k: int = 4, rrf_k: int = RRF_K):
+        self.vector_search = vector_search
+        self.bm25_index = bm25_index
+        self.k = k
+        self.rrf_k = rrf_k
+
+    async def retrieve(self, question):
+        dense, lexical = await asyncio.gather(
+            self.vector_search.retrieve(question),
+            asyncio.to_thread(self.bm25_index.search, question, self.k),
+        )
+        return reciprocal_rank_fusion([dense, [document for document, _ in lexical]], self.k, self.rrf_k)
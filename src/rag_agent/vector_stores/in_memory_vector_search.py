@@ -0,0 +1,138 @@
+"""In-process vector provider for small indexes and offline tests.
+
+Embeddings are kept in one contiguous NumPy matrix and the top-k of a query
+is computed in a single vectorized operation. The matrix can be quantized:
+
+- ``none``: float32, exact cosine similarity.
+- ``int8``: 4x smaller, each vector scaled so its largest component is 127.
+- ``binary``: 32x smaller, one sign bit per component, ranked by Hamming distance.
+
+Indexes are registered by name for the whole process, so documents added
+once are visible to every ``InMemoryVectorSearch`` of that index.
+``benchmarks/in_memory_quantization.py`` reports the footprint, latency and
+recall of each level.
+"""
+
+import os
+import threading
+from typing import Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag_agent.document import Document
+from rag_agent.vector_stores.vector_search_service import VectorSearch
+
+
+QUANTIZATIONS = ("none", "int8", "binary")
+DEFAULT_QUANTIZATION = os.getenv("IN_MEMORY_QUANTIZATION", "none")
+# int8 rows are converted back to float32 this many at a time when scoring
+INT8_SCORING_BLOCK = 2048
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class InMemoryIndex:
+    """Quantized embedding matrix and its documents."""
+
+    def __init__(self, quantization: str = DEFAULT_QUANTIZATION):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}'. Expected one of {QUANTIZATIONS}.")
+        self.quantization = quantization
+        self.dimension = None
+        self.matrix = None
+        # Per-row dequantization factor of the int8 matrix
+        self.scales = None
+        self.documents: list[Document] = []
+        self._lock = threading.Lock()
+
+    def _encode(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray | None]:
+        vectors = _unit(vectors)
+        if self.quantization == "int8":
+            scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        if self.quantization == "binary":
+            return np.packbits(vectors > 0, axis=-1), None
+        return vectors, None
+
+    def add(self, documents: Sequence[Document], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(documents) != len(vectors):
+            raise ValueError("There must be one vector per document.")
+        if not len(documents):
+            return
+        encoded, scales = self._encode(vectors)
+        with self._lock:
+            if self.dimension is not None and vectors.shape[1] != self.dimension:
+                raise ValueError(f"Expected vectors of dimension {self.dimension}, got {vectors.shape[1]}.")
+            self.dimension = vectors.shape[1]
+            # Rebuilt as one contiguous block so searches stay a single matrix operation
+            self.matrix = encoded if self.matrix is None else np.concatenate([self.matrix, encoded])
+            if scales is not None:
+                self.scales = scales if self.scales is None else np.concatenate([self.scales, scales])
+            self.documents = self.documents + list(documents)
+
+    def scores(self, vector: Sequence[float]) -> np.ndarray:
+        """Similarity of every stored vector to ``vector``, higher is closer."""
+        if self.quantization == "binary":
+            query = self._encode(np.asarray([vector]))[0][0]
+            hamming = np.bitwise_count(np.bitwise_xor(self.matrix, query)).sum(axis=1, dtype=np.int32)
+            return self.dimension - 2 * hamming
+        query = _unit(np.asarray(vector))
+        if self.quantization == "int8":
+            # Blocks keep the float32 temporary small and in cache
+            return np.concatenate([
+                self.matrix[start:start + INT8_SCORING_BLOCK].astype(np.float32) @ query
+                for start in range(0, len(self.matrix), INT8_SCORING_BLOCK)
+            ]) * self.scales
+        return self.matrix @ query
+
+    def search(self, vector: Sequence[float], k: int) -> list[tuple[Document, float]]:
+        if self.matrix is None:
+            return []
+        scores = self.scores(vector)
+        # Read after scoring: documents are only appended, so every scored row has its document
+        documents = self.documents
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(documents[i], float(scores[i])) for i in top]
+
+    def memory_footprint(self) -> int:
+        """Bytes held by the embedding matrix and its scales."""
+        if self.matrix is None:
+            return 0
+        return self.matrix.nbytes + (0 if self.scales is None else self.scales.nbytes)
+
+
+_indexes: dict[str, InMemoryIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(index_name: str, quantization: str = DEFAULT_QUANTIZATION) -> InMemoryIndex:
+    """Return the process-wide index ``index_name``, created empty on first use."""
+    with _indexes_lock:
+        if index_name not in _indexes:
+            _indexes[index_name] = InMemoryIndex(quantization)
+        return _indexes[index_name]
+
+
+class InMemoryVectorSearch(VectorSearch):
+
+    def __init__(self, index_name: str, embedding_model: Embeddings, k: int = 4, quantization: str = DEFAULT_QUANTIZATION):
+        self.index_name = index_name
+        self.embedding_model = embedding_model
+        self.k = k
+        self.index = get_index(index_name, quantization)
+
+    async def add_documents(self, documents: Sequence[Document]) -> None:
+        vectors = await self.embedding_model.aembed_documents([doc.content for doc in documents])
+        self.index.add(documents, np.asarray(vectors, dtype=np.float32))
+
+    async def retrieve(self, question):
+        vector = await self.embedding_model.aembed_query(question)
+        return [document for document, _ in self.index.search(vector, self.k)]
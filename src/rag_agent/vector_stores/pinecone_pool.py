@@ -0,0 +1,141 @@
+"""Process-wide pool of Pinecone clients and index handles.
+
+The index host is resolved once per index and one async index handle (with
+its HTTP connection pool) is kept per index and event loop, so repeated
+queries skip the client construction, the ``describe_index`` call and the
+TLS handshake. Idle handles are health-checked before reuse and rebuilt if
+the check or a query fails.
+
+``pinecone_stats()`` reports how often handles are reused.
+"""
+
+import os
+import time
+import asyncio
+import functools
+import logging
+import weakref
+from collections import defaultdict
+
+import aiohttp
+from pinecone import Pinecone, PineconeAsyncio
+
+
+logger = logging.getLogger("rag")
+
+# Parallel HTTP connections of each async index handle
+CONNECTION_POOL_MAXSIZE = int(os.getenv("PINECONE_POOL_MAXSIZE", "20"))
+# Handles idle for longer than this are health-checked before being reused
+HEALTH_CHECK_INTERVAL = float(os.getenv("PINECONE_HEALTH_CHECK_INTERVAL", "300"))  # Seconds
+
+
+def get_api_key() -> str:
+    api_key = os.getenv("PINECONE_API_KEY")
+    if not api_key:
+        raise ValueError("PINECONE_API_KEY environment variables must be set.")
+    return api_key
+
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> Pinecone:
+    """Sync control plane client, only used to resolve index hosts."""
+    return Pinecone(api_key=get_api_key())
+
+
+@functools.lru_cache(maxsize=None)
+def get_index_host(index_name: str) -> str:
+    return get_client().describe_index(index_name).host
+
+
+class _Handle:
+    def __init__(self, index):
+        self.index = index
+        self.last_used = time.monotonic()
+
+
+# Async handles are bound to the event loop that created their HTTP session
+_handles: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, _Handle]]" = weakref.WeakKeyDictionary()
+_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+_stats: dict[str, dict[str, int]] = defaultdict(lambda: {
+    "handles_created": 0,
+    "handles_reused": 0,
+    "health_checks": 0,
+    "health_check_failures": 0,
+    "query_failures": 0,
+})
+
+
+async def _create_handle(index_name: str) -> _Handle:
+    host = await asyncio.to_thread(get_index_host, index_name)
+    async with PineconeAsyncio(api_key=get_api_key()) as client:
+        index = client.IndexAsyncio(host=host, connection_pool_maxsize=CONNECTION_POOL_MAXSIZE)
+    _stats[index_name]["handles_created"] += 1
+    return _Handle(index)
+
+
+async def _is_healthy(index_name: str, handle: _Handle) -> bool:
+    _stats[index_name]["health_checks"] += 1
+    try:
+        await handle.index.describe_index_stats()
+        return True
+    except Exception as e:
+        _stats[index_name]["health_check_failures"] += 1
+        logger.warning("Pinecone index '%s' failed its health check, reconnecting: %s", index_name, e)
+        return False
+
+
+async def get_async_index(index_name: str):
+    """Return the pooled async index handle of ``index_name`` for the running loop."""
+    loop = asyncio.get_running_loop()
+    handles = _handles.setdefault(loop, {})
+    handle = handles.get(index_name)
+    if handle is not None and time.monotonic() - handle.last_used < HEALTH_CHECK_INTERVAL:
+        _stats[index_name]["handles_reused"] += 1
+        handle.last_used = time.monotonic()
+        return handle.index
+
+    # Only one task creates or checks the handle, the others wait and reuse it
+    async with _locks.setdefault(loop, asyncio.Lock()):
+        handle = handles.get(index_name)
+        if handle is not None:
+            if time.monotonic() - handle.last_used < HEALTH_CHECK_INTERVAL or await _is_healthy(index_name, handle):
+                _stats[index_name]["handles_reused"] += 1
+                handle.last_used = time.monotonic()
+                return handle.index
+            await discard_async_index(index_name)
+        handle = handles[index_name] = await _create_handle(index_name)
+        return handle.index
+
+
+async def discard_async_index(index_name: str) -> None:
+    """Close and forget the handle of ``index_name``, e.g. after a failed query."""
+    handle = _handles.get(asyncio.get_running_loop(), {}).pop(index_name, None)
+    if handle is not None:
+        try:
+            await handle.index.close()
+        except Exception:
+            pass
+
+
+async def query(index_name: str, **kwargs):
+    """Query ``index_name`` on the pooled handle, reconnecting once if the connection is broken."""
+    index = await get_async_index(index_name)
+    try:
+        return await index.query(**kwargs)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        _stats[index_name]["query_failures"] += 1
+        await discard_async_index(index_name)
+        index = await get_async_index(index_name)
+        return await index.query(**kwargs)
+
+
+def pinecone_stats() -> dict[str, dict[str, float]]:
+    """Handle creation/reuse and health counters per index, with the reuse ratio."""
+    stats = {}
+    for index_name, counters in list(_stats.items()):
+        requests = counters["handles_created"] + counters["handles_reused"]
+        stats[index_name] = {
+            **counters,
+            "reuse_ratio": round(counters["handles_reused"] / requests, 3) if requests else 0.0,
+        }
+    return stats
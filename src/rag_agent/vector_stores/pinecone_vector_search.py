@@ -1,44 +1,45 @@
-import os
-import asyncio
-
-from pinecone import Pinecone as pi
-from langchain_pinecone import PineconeVectorStore
 from langchain_openai import AzureOpenAIEmbeddings
 from rag_agent.vector_stores.vector_search_service import VectorSearch
+from rag_agent.vector_stores import pinecone_pool
 from rag_agent.document import Document
+from rag_agent.principals import pinecone_filter
 
 
 
 class PineconeVectorSearch(VectorSearch):
+    supports_acl_filter = True
    
-    def __init__(self, index_name: str, embedding_model: AzureOpenAIEmbeddings):
+    def __init__(self, index_name: str, embedding_model: AzureOpenAIEmbeddings, k: int = 4, text_key: str = "content"):
         self.index_name = index_name
         self.embedding_model = embedding_model
-
-
-    async def retrieve(self, question):
-        api_key = os.getenv("PINECONE_API_KEY")
-        if not api_key:
-            raise ValueError("PINECONE_API_KEY environment variables must be set.")
-        pc = pi(api_key=api_key)
-        #index = await asyncio.to_thread(pc.Index(self.index_name))
-        index = pc.Index(self.index_name)
-        self._vector_store = PineconeVectorStore(
-            index=index,
-            embedding=self.embedding_model,
-            text_key='content'
+        self.k = k
+        self.text_key = text_key
+
+
+    async def retrieve(self, question, principals=None):
+        # Queries go through the pooled index handle instead of a PineconeVectorStore,
+        # which opens (and closes) a new async client on every search
+        vector = await self.embedding_model.aembed_query(question)
+        query_kwargs = {}
+        if principals is not None:
+            query_kwargs["filter"] = pinecone_filter(principals)
+        response = await pinecone_pool.query(
+            self.index_name,
+            vector=vector,
+            top_k=self.k,
+            include_metadata=True,
+            **query_kwargs,
         )
-
-        response = await self._vector_store.asimilarity_search(question)
         documents = []
 
-        for doc in response:
-            filename = doc.metadata['filename']
-            content = doc.page_content
-            source = doc.metadata['source']
+        for match in response["matches"]:
+            metadata = match["metadata"] or {}
+            if self.text_key not in metadata:
+                continue
+            filename = metadata['filename']
+            content = metadata[self.text_key]
+            source = metadata['source']
             new_document = Document(content, filename, source)
             documents.append(new_document)
 
         return documents
-
-
@@ -2,6 +2,8 @@ from abc import ABC, abstractmethod
 
 
 class VectorSearch(ABC):
+    # Whether retrieve accepts the principals of the user and only returns chunks they can read
+    supports_acl_filter = False
     
     @abstractmethod
     def __init__(self, config):
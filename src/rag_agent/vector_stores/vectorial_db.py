@@ -1,15 +1,24 @@
 from langchain_openai import AzureOpenAIEmbeddings
-from langchain_community.vectorstores.inmemory import InMemoryVectorStore
-
-from rag_agent.vector_stores.azure_vector_search import AzureVectorSearch
-from rag_agent.vector_stores.pinecone_vector_search import PineconeVectorSearch
 
 import os
+from typing import Optional
 class VectorSearchFactory:
     
     @staticmethod
-    def create_vectorial_instance(provider: str, index_name, embedding_model: AzureOpenAIEmbeddings):
+    def create_vectorial_instance(provider: str, index_name, embedding_model: AzureOpenAIEmbeddings, k: Optional[int] = None, semantic_configuration: str = "", retrieval_mode: str = "vector"):
+        if retrieval_mode == "hybrid":
+            from rag_agent.vector_stores.bm25_index import get_bm25_index
+            from rag_agent.vector_stores.hybrid_vector_search import HybridVectorSearch
+
+            vector_search = VectorSearchFactory.create_vectorial_instance(provider, index_name, embedding_model, k, semantic_configuration)
+            return HybridVectorSearch(vector_search, get_bm25_index(index_name), k=vector_search.k)
+        elif retrieval_mode != "vector":
+            raise ValueError(f"Unknown retrieval mode '{retrieval_mode}'.")
+
+        # Provider SDKs are imported on first use to keep the agent cheap to import
         if(provider == "azure_search_service"):
+            from rag_agent.vector_stores.azure_vector_search import AzureVectorSearch
+
             api_key = os.getenv("AZURE_SEARCH_API_KEY")
             endpoint = os.getenv("AZURE_SEARCH_ENDPOINT")
             if not api_key or not endpoint:
@@ -18,12 +27,22 @@ class VectorSearchFactory:
                 api_key=api_key,
                 endpoint=endpoint,
                 index_name=index_name,
-                embedding_model=embedding_model
+                embedding_model=embedding_model,
+                k=k or 5,
+                semantic_configuration_name=semantic_configuration or None,
             )
         elif(provider == "pinecone"):
-            return PineconeVectorSearch(index_name=index_name, embedding_model=embedding_model)
+            from rag_agent.vector_stores.pinecone_vector_search import PineconeVectorSearch
+
+            return PineconeVectorSearch(index_name=index_name, embedding_model=embedding_model, k=k or 4)
+        elif(provider == "faiss_local"):
+            from rag_agent.vector_stores.faiss_local_vector_search import FaissLocalVectorSearch
+
+            return FaissLocalVectorSearch(index_name=index_name, embedding_model=embedding_model, k=k or 4)
         elif(provider == "in_memory"):
-            return InMemoryVectorStore(embedding_model)
+            from rag_agent.vector_stores.in_memory_vector_search import InMemoryVectorSearch
+
+            return InMemoryVectorSearch(index_name=index_name, embedding_model=embedding_model, k=k or 4)
         else:
             raise ValueError(f"Unknown provider '{provider}'.")
                 
\ No newline at end of file
@@ -4,28 +4,37 @@ from langgraph.graph import StateGraph
 
 from langchain_community.vectorstores import FAISS
 from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, SystemMessagePromptTemplate, FewShotPromptTemplate, PromptTemplate
 from langchain_core.example_selectors import SemanticSimilarityExampleSelector
 
 from sql_agent.sql_db import get_sqlalchemy_engine
 from sql_agent.state import SQLAgentState, SQLOutputState
-from sql_agent.tools import SubmitFinalAnswer, GenerateQuery, create_tool_node_with_fallback, setup_tools
+from sql_agent.tools import GenerateQuery, create_tool_node_with_fallback, setup_tools
 
 from sql_agent.prompts.sql_agent_few_shot import examples
-from sql_agent.prompts.sql_agent_prompt import QUERY_CHECK_SYSTEM, GENERATE_MSG_SYSTEM, QUERY_GEN_SYSTEM, MODEL_GET_SCHEMA_SYSTEM
+from sql_agent.prompts.sql_agent_prompt import QUERY_GEN_SYSTEM, MODEL_GET_SCHEMA_SYSTEM
 
 
 from langchain_core.runnables import RunnableConfig
 from sql_agent.config import Configuration
+from common.streaming import ANSWER_TAG, NOSTREAM_TAG
 from langgraph.graph import StateGraph
 from langgraph_sdk import get_client
-from langchain.chat_models import init_chat_model
-from langchain.embeddings import init_embeddings
+from common.models import get_chat_model, get_embeddings
+from common.prompts import get_prompt
 
 RETRY_LIMIT = 3
 
-llm = init_chat_model("azure_openai:gpt-4.1", temperature=0)
-embeddings_model = init_embeddings("azure_openai:embedding-test")
+def get_llm():
+    return get_chat_model("azure_openai:gpt-4.1", tags=(NOSTREAM_TAG,))
+
+def get_answer_llm():
+    # The final answer is plain text so its tokens can be streamed to the user
+    return get_chat_model("azure_openai:gpt-4.1", tags=(ANSWER_TAG,))
+
+def get_embeddings_model():
+    return get_embeddings("azure_openai:embedding-test")
 
 async def retry_limit_node(state: SQLAgentState) -> SQLOutputState:
 
@@ -39,7 +48,7 @@ async def init_db_and_tools_node(state: SQLAgentState):
     configurable = Configuration.from_context()
     db_type = configurable.domain
     db = await asyncio.to_thread(get_sqlalchemy_engine, db_type)
-    list_tables_tool, get_schema_tool, db_query_tool = setup_tools(db, llm)
+    list_tables_tool, get_schema_tool, db_query_tool = setup_tools(db, get_llm())
     state["list_tables_tool"] = list_tables_tool
     state["get_schema_tool"] = get_schema_tool
     state["db_query_tool"] = db_query_tool
@@ -66,7 +75,7 @@ async def get_schema(state: SQLAgentState):
     """
     # Force a model to create a tool call
     get_schema_tool = state["get_schema_tool"]
-    model = llm.bind_tools([get_schema_tool])
+    model = get_llm().bind_tools([get_schema_tool])
     messages = [SystemMessage(MODEL_GET_SCHEMA_SYSTEM)] + state["messages"]
     llm_response = await model.ainvoke(messages)
 
@@ -84,7 +93,7 @@ async def get_schema(state: SQLAgentState):
 async def query_gen(state: SQLAgentState):
     example_selector = await SemanticSimilarityExampleSelector.afrom_examples(
         examples,
-        embeddings_model,
+        get_embeddings_model(),
         FAISS,
         k=3,
         input_keys=["input"],
@@ -107,7 +116,7 @@ async def query_gen(state: SQLAgentState):
             MessagesPlaceholder("messages"),
         ]
     )
-    query_gen = query_gen_prompt | llm.with_structured_output(GenerateQuery)
+    query_gen = query_gen_prompt | get_llm().with_structured_output(GenerateQuery)
     message = await query_gen.ainvoke(state)
 
     return {
@@ -118,11 +127,9 @@ async def check_query(state: SQLAgentState):
     """
     Use this tool to double-check if your query is correct before executing it.
     """
-    query_check_prompt = ChatPromptTemplate.from_messages(
-        [("system", QUERY_CHECK_SYSTEM), ("placeholder", "{messages}")]
-    )
+    query_check_prompt = get_prompt("sql/query_check")
     db_query_tool = state["db_query_tool"]
-    query_check = query_check_prompt | llm.bind_tools([db_query_tool], tool_choice="required")
+    query_check = query_check_prompt | get_llm().bind_tools([db_query_tool], tool_choice="required")
     # Check only the last message in the state, wich contains the generated query
     response = await query_check.ainvoke({"messages": [state["messages"][-1]]})
     return {
@@ -137,17 +144,14 @@ async def execute_query(state: SQLAgentState):
 
 async def generate_msg_node(state: SQLAgentState) -> SQLOutputState:
 
-    generate_msg_prompt = ChatPromptTemplate.from_messages(
-        [("system", GENERATE_MSG_SYSTEM), ("placeholder", "{messages}")]
-    )
-    generate_msg = generate_msg_prompt | llm.with_structured_output(SubmitFinalAnswer)
-    message = await generate_msg.ainvoke(state)
+    generate_msg = get_prompt("sql/generate_msg") | get_answer_llm() | StrOutputParser()
+    final_answer = await generate_msg.ainvoke(state)
 
-    print(f"Final answer: {message.final_answer}")
+    print(f"Final answer: {final_answer}")
     print("***"*10)
     return {
-        #"messages": [AIMessage(content=message.final_answer)]
-        "answer": message.final_answer
+        #"messages": [AIMessage(content=final_answer)]
+        "answer": final_answer
     }
 
 async def should_continue(state: SQLAgentState) -> Literal["query_gen", "retry_limit", "final_answer"]:
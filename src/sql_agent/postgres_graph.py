@@ -1,33 +1,47 @@
 import asyncio
+import functools
 from typing import Literal
 from langgraph.graph import StateGraph
 
 from langchain_community.vectorstores import FAISS
 from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, SystemMessagePromptTemplate, FewShotPromptTemplate, PromptTemplate
 from langchain_core.example_selectors import SemanticSimilarityExampleSelector
 
 from sql_agent.sql_db import get_sqlalchemy_engine
 from sql_agent.state import SQLAgentState, SQLOutputState
-from sql_agent.tools import SubmitFinalAnswer, GenerateQuery, create_tool_node_with_fallback, setup_tools
+from sql_agent.tools import GenerateQuery, create_tool_node_with_fallback, setup_tools
 
 from sql_agent.prompts.sql_agent_few_shot import examples
-from sql_agent.prompts.sql_agent_prompt import QUERY_CHECK_SYSTEM, GENERATE_MSG_SYSTEM, QUERY_GEN_SYSTEM, MODEL_GET_SCHEMA_SYSTEM
+from sql_agent.prompts.sql_agent_prompt import QUERY_GEN_SYSTEM, MODEL_GET_SCHEMA_SYSTEM
 
 
 from langchain_core.runnables import RunnableConfig
 from sql_agent.config import Configuration
+from common.streaming import ANSWER_TAG, NOSTREAM_TAG
 from langgraph.graph import StateGraph
 from langgraph_sdk import get_client
-from langchain.chat_models import init_chat_model
-from langchain.embeddings import init_embeddings
+from common.models import get_chat_model, get_embeddings
+from common.prompts import get_prompt
 
 RETRY_LIMIT = 3
 
-llm = init_chat_model("azure_openai:gpt-4.1", temperature=0)
-embeddings_model = init_embeddings("azure_openai:embedding-test")
-db = get_sqlalchemy_engine("postgres")
-list_tables_tool, get_schema_tool, db_query_tool = setup_tools(db, llm)
+def get_llm():
+    return get_chat_model("azure_openai:gpt-4.1", tags=(NOSTREAM_TAG,))
+
+def get_answer_llm():
+    # The final answer is plain text so its tokens can be streamed to the user
+    return get_chat_model("azure_openai:gpt-4.1", tags=(ANSWER_TAG,))
+
+def get_embeddings_model():
+    return get_embeddings("azure_openai:embedding-test")
+
+@functools.lru_cache(maxsize=None)
+def get_tools():
+    """Connect to the database and build the SQL tools on first use."""
+    db = get_sqlalchemy_engine("postgres")
+    return setup_tools(db, get_llm())
 
 async def retry_limit_node(state: SQLAgentState) -> SQLOutputState:
 
@@ -43,6 +57,7 @@ async def list_tables(state: SQLAgentState):
         "id": "abc123",
         "type": "tool_call",
     }
+    list_tables_tool, _, _ = await asyncio.to_thread(get_tools)
     tool_message = list_tables_tool.invoke(tool_call)
     response = AIMessage(f"Available tables: {tool_message.content}")
 
@@ -53,7 +68,8 @@ async def get_schema(state: SQLAgentState):
     Calls the get_schema tool using the LLM and returns the database schema as an AIMessage.
     """
     # Force a model to create a tool call
-    model = llm.bind_tools([get_schema_tool])
+    _, get_schema_tool, _ = get_tools()
+    model = get_llm().bind_tools([get_schema_tool])
     messages = [SystemMessage(MODEL_GET_SCHEMA_SYSTEM)] + state["messages"]
     llm_response = await model.ainvoke(messages)
 
@@ -71,7 +87,7 @@ async def get_schema(state: SQLAgentState):
 async def query_gen(state: SQLAgentState):
     example_selector = await SemanticSimilarityExampleSelector.afrom_examples(
         examples,
-        embeddings_model,
+        get_embeddings_model(),
         FAISS,
         k=3,
         input_keys=["input"],
@@ -94,7 +110,7 @@ async def query_gen(state: SQLAgentState):
             MessagesPlaceholder("messages"),
         ]
     )
-    query_gen = query_gen_prompt | llm.with_structured_output(GenerateQuery)
+    query_gen = query_gen_prompt | get_llm().with_structured_output(GenerateQuery)
     message = await query_gen.ainvoke(state)
 
     return {
@@ -105,10 +121,9 @@ async def check_query(state: SQLAgentState):
     """
     Use this tool to double-check if your query is correct before executing it.
     """
-    query_check_prompt = ChatPromptTemplate.from_messages(
-        [("system", QUERY_CHECK_SYSTEM), ("placeholder", "{messages}")]
-    )
-    query_check = query_check_prompt | llm.bind_tools([db_query_tool], tool_choice="required")
+    query_check_prompt = get_prompt("sql/query_check")
+    _, _, db_query_tool = get_tools()
+    query_check = query_check_prompt | get_llm().bind_tools([db_query_tool], tool_choice="required")
     # Check only the last message in the state, wich contains the generated query
     response = await query_check.ainvoke({"messages": [state["messages"][-1]]})
     return {
@@ -118,21 +133,19 @@ async def check_query(state: SQLAgentState):
 
     
 async def execute_query(state: SQLAgentState):
+    _, _, db_query_tool = get_tools()
     return create_tool_node_with_fallback([db_query_tool])
 
 async def generate_msg_node(state: SQLAgentState) -> SQLOutputState:
 
-    generate_msg_prompt = ChatPromptTemplate.from_messages(
-        [("system", GENERATE_MSG_SYSTEM), ("placeholder", "{messages}")]
-    )
-    generate_msg = generate_msg_prompt | llm.with_structured_output(SubmitFinalAnswer)
-    message = await generate_msg.ainvoke(state)
+    generate_msg = get_prompt("sql/generate_msg") | get_answer_llm() | StrOutputParser()
+    final_answer = await generate_msg.ainvoke(state)
 
-    print(f"Final answer: {message.final_answer}")
+    print(f"Final answer: {final_answer}")
     print("***"*10)
     return {
-        #"messages": [AIMessage(content=message.final_answer)]
-        "answer": message.final_answer
+        #"messages": [AIMessage(content=final_answer)]
+        "answer": final_answer
     }
 
 async def should_continue(state: SQLAgentState) -> Literal["query_gen", "retry_limit", "final_answer"]:
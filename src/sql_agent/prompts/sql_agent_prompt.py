@@ -42,4 +42,5 @@ If there are any of the above mistakes, rewrite the query. If there are no mista
 
 You will call the appropriate tool to execute the query after running this check."""
 
-GENERATE_MSG_SYSTEM = """Submit the final answer to the user based on the query results."""
+GENERATE_MSG_SYSTEM = """Submit the final answer to the user based on the query results.
+Include the SQL query that got such answer."""
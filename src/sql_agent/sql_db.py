@@ -65,6 +65,4 @@ def get_sqlalchemy_engine(db_type):
     else:
         raise ValueError(f"Unsupported db_type: {db_type}")
 
-    return SQLDatabase(engine)
-
-engine = get_sqlalchemy_engine("bigquery")  # Default to PostgreSQL
\ No newline at end of file
+    return SQLDatabase(engine)
\ No newline at end of file
@@ -9,11 +9,6 @@ from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
 
 
 
-class SubmitFinalAnswer(BaseModel):
-    """Submit the final answer to the user based on the query results."""
-    final_answer: str = Field(..., description="The final answer to the user, including the sql query that got such answer.")
-
-
 class GenerateQuery(BaseModel):
     """Generate the BigQuery query."""
 
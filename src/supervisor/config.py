@@ -7,6 +7,16 @@ from langgraph.store.base import Item
 
 from langgraph.config import get_config
 
+TRUE_VALUES = ("true", "1", "yes", "on")
+
+
+def parse_bool(value: Any) -> bool:
+    """Boolean of a configurable or environment value, which may be a string."""
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return bool(value)
+
+
 def format_memories(memories: Optional[list[Item]]) -> str:
     """Format the user's memories."""
     if not memories:
@@ -36,6 +46,20 @@ class ChatConfigurable:
     delay_seconds: int = 30  # For debouncing memory creation
     memory_types: Optional[list[dict]] = None
     """The memory_types for the memory assistant."""
+    local_router: bool = True
+    """Whether to try the local keyword/embedding router before the LLM router."""
+    router_confidence_threshold: float = 0.8
+    """Minimum local router confidence needed to skip the LLM router."""
+    context_max_tokens: int = 4000
+    """Token budget of the conversation window sent to the LLMs."""
+    context_keep_turns: int = 6
+    """Number of recent turns left verbatim when older turns are folded into the summary."""
+    transaction_max_turns: int = 5
+    """Turns after which an open ClickUp transaction stops keeping the thread."""
+    transaction_override_threshold: float = 0.9
+    """Local router confidence needed to leave an open ClickUp transaction for another agent."""
+    rag_reflection: bool = False
+    """Whether the RAG agent grades its answers (blocking or in the background, see its reflection_mode)."""
 
     @classmethod
     def from_context(cls) -> "ChatConfigurable":
@@ -48,10 +72,13 @@ class ChatConfigurable:
         except RuntimeError:
             configurable = {}
 
-        values: dict[str, Any] = {
-            f.name: os.environ.get(f.name.upper(), configurable.get(f.name))
-            for f in fields(cls)
-            if f.init
-        }
-        _fields = {f.name for f in fields(cls) if f.init}
-        return cls(**{k: v for k, v in values.items() if v})
\ No newline at end of file
+        values: dict[str, Any] = {}
+        for f in fields(cls):
+            if not f.init:
+                continue
+            value = os.environ.get(f.name.upper(), configurable.get(f.name))
+            # Unset values keep the default; explicit False and 0 don't
+            if value is None or value == "":
+                continue
+            values[f.name] = parse_bool(value) if f.type is bool else value
+        return cls(**values)
\ No newline at end of file
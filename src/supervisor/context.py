@@ -0,0 +1,127 @@
+"""Token-budgeted conversation window for the supervisor graph.
+
+Nodes don't send the whole thread to the LLM. They get the turns not yet
+summarized verbatim, preceded by a rolling summary of the older turns. The
+summary lives in ``State.summary`` and ``summary_cursor`` marks how many
+messages it already covers. At the end of each turn the turns that the next
+window can't hold (too many of them, or over the token budget) are folded
+into the summary, so every turn is either in the window or in the summary.
+"""
+
+import logging
+from typing import Sequence
+
+from langchain_core.messages import BaseMessage, SystemMessage
+
+from common import tokens
+
+
+logger = logging.getLogger("supervisor")
+
+# Approximate per-message overhead of the chat format
+MESSAGE_TOKEN_OVERHEAD = 4
+# Fold older turns into the summary only once this many extra turns piled up,
+# so the summary isn't regenerated on every turn
+SUMMARY_FOLD_TURNS = 2
+# Room left in the window for the summary (the prompt asks for under 300 words)
+# and for the next user message when deciding what to fold
+SUMMARY_TOKENS = 600
+NEXT_TURN_TOKENS = 500
+
+
+def count_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Count the tokens of a list of messages, including tool calls."""
+    total = 0
+    for message in messages:
+        total += MESSAGE_TOKEN_OVERHEAD + tokens.count_tokens(str(message.content))
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            total += tokens.count_tokens(str(tool_calls))
+    return total
+
+
+def split_turns(messages: Sequence[BaseMessage]) -> list[list[BaseMessage]]:
+    """
+    Group messages in turns, each starting with a human message.
+
+    Keeping whole turns together means tool calls are never separated from
+    their tool results when the window is trimmed.
+    """
+    turns = []
+    for message in messages:
+        if message.type == "human" or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+def summary_message(summary: str) -> SystemMessage:
+    return SystemMessage(content=f"Summary of the earlier conversation with the user:\n{summary}")
+
+
+def _trim_to_budget(turns: list[list[BaseMessage]], budget: int) -> int:
+    """Number of oldest turns to drop so the rest fit in ``budget``; the last turn is always kept."""
+    turn_tokens = [count_tokens(turn) for turn in turns]
+    dropped, total = 0, sum(turn_tokens)
+    while dropped < len(turns) - 1 and total > budget:
+        total -= turn_tokens[dropped]
+        dropped += 1
+    return dropped
+
+
+def window_messages(state: dict, max_tokens: int) -> list[BaseMessage]:
+    """
+    Return the messages to send to the LLM for the current state.
+
+    Every turn not covered by the summary is kept verbatim, so no turn leaves
+    the window before it's folded into the summary. ``messages_to_fold``
+    folds turns early enough for the window to fit in ``max_tokens``; if a
+    turn still has to be dropped (a single message larger than
+    ``NEXT_TURN_TOKENS``), the oldest are dropped and a warning is logged.
+    The current turn is always kept.
+    """
+    summary = state.get("summary") or ""
+    turns = split_turns(state["messages"][state.get("summary_cursor") or 0:])
+
+    prefix = [summary_message(summary)] if summary else []
+    dropped = _trim_to_budget(turns, max_tokens - count_tokens(prefix))
+    if dropped:
+        logger.warning("%d turns left the conversation window before being summarized", dropped)
+
+    return prefix + [message for turn in turns[dropped:] for message in turn]
+
+
+def messages_to_fold(state: dict, keep_turns: int, max_tokens: int) -> tuple[list[BaseMessage], int]:
+    """
+    Messages that should be folded into the summary and the new summary cursor.
+
+    Called at the end of a turn, it folds the turns the next window couldn't
+    hold:
+
+    - once more than ``keep_turns + SUMMARY_FOLD_TURNS`` turns are pending,
+      everything but the last ``keep_turns`` turns;
+    - the oldest turns while the rest, the summary and the next message
+      (``SUMMARY_TOKENS + NEXT_TURN_TOKENS``) exceed ``max_tokens``.
+    """
+    keep_turns = max(int(keep_turns), 1)
+    cursor = state.get("summary_cursor") or 0
+    turns = split_turns(state["messages"][cursor:])
+    fold_turns = len(turns) - keep_turns if len(turns) > keep_turns + SUMMARY_FOLD_TURNS else 0
+    fold_turns += _trim_to_budget(turns[fold_turns:], max_tokens - SUMMARY_TOKENS - NEXT_TURN_TOKENS)
+    # The last turn is kept even if it doesn't fit, the window keeps it anyway
+    fold_turns = min(fold_turns, len(turns) - 1)
+    if fold_turns <= 0:
+        return [], cursor
+    fold = [message for turn in turns[:fold_turns] for message in turn]
+    return fold, cursor + len(fold)
+
+
+def format_transcript(messages: Sequence[BaseMessage]) -> str:
+    """Render messages as plain text for the summarizer, skipping tool plumbing."""
+    lines = []
+    for message in messages:
+        if message.type in ("human", "ai") and message.content:
+            role = "User" if message.type == "human" else "Assistant"
+            lines.append(f"{role}: {message.content}")
+    return "\n".join(lines)
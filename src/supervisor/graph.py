@@ -1,6 +1,8 @@
 import json
+import time
+import functools
 import datetime
-from typing import Literal, TypedDict
+from typing import Literal, Optional, TypedDict
 
 from langgraph_sdk import get_client
 from langgraph.config import get_store
@@ -11,30 +13,59 @@ from langgraph.constants import START, END
 from langgraph.graph import StateGraph
 from langgraph.types import RetryPolicy
 
-from langchain.chat_models import init_chat_model
-from langchain_core.prompts import PromptTemplate
-
-from supervisor.prompts.edwards_prompt import EDWARDS_BASE_PROMPT
-from supervisor.prompts.supervisor_prompt import SUPERVISOR_PROMPT_TEMPLATE
-from supervisor.prompts.rags_supervisor_prompt import RAGS_SUPERVISOR_PROMPT_TEMPLATE
-from supervisor.prompts.clickup_supervisor_prompt import CLICKUP_SUPERVISOR_PROMPT_TEMPLATE
-
 from supervisor.state import State
-from rag_agent.graph import graph as rag_agent
-#from sql_agent.postgres_graph import graph as sql_agent
-from sql_agent.bigquery_graph import graph as sql_agent
-from transaction_agent.graph import make_graph as create_transaction_agent_graph
+from supervisor.router import LocalRouter
+from supervisor.transactions import cancels_transaction, transaction_update
+from supervisor.context import window_messages, messages_to_fold, format_transcript
+from supervisor.registry import aget_agent
 
 from supervisor.config import ChatConfigurable, format_memories
+from common.models import get_chat_model, get_embeddings
+from common.prompts import get_prompt
+from common.streaming import ANSWER_TAG, NOSTREAM_TAG, FirstTokenTimer, emit_final_event, with_callback
 
 
 
-supervisor_llm = init_chat_model("azure_openai:gpt-4.1-mini", temperature=0)
-edwards_llm = init_chat_model("azure_openai:gpt-4.1-mini", temperature=0)
 MEMBERS = ["SQL_AGENT", "CLICKUP_AGENT", "RAG_AGENT", "HELP_AGENT"]
+RAG_TARGETS = ["QMS_Document_Retriever", "Freshwork_Document_Retriever"]
+CLICKUP_TARGETS = ["QMS_AGENT", "HRM_AGENT"]
+TARGETS = {
+    "RAG_AGENT": RAG_TARGETS,
+    "CLICKUP_AGENT": CLICKUP_TARGETS,
+}
+
+
+def get_supervisor_llm():
+    return get_chat_model("azure_openai:gpt-4.1-mini", tags=(NOSTREAM_TAG,))
+
+def get_edwards_llm():
+    return get_chat_model("azure_openai:gpt-4.1-mini", tags=(ANSWER_TAG,))
+
+@functools.lru_cache(maxsize=None)
+def get_local_router() -> LocalRouter:
+    return LocalRouter(MEMBERS, get_embeddings("azure_openai:embedding-test"))
 
 class Router(TypedDict):
+    """Route the request to a node and, when the node has them, to one of its targets."""
     next: Literal[tuple(MEMBERS)]
+    target: Optional[Literal[tuple(RAG_TARGETS + CLICKUP_TARGETS)]]
+
+class RagRouter(TypedDict):
+    next: Literal[tuple(RAG_TARGETS)]
+
+class ClickUpRouter(TypedDict):
+    next: Literal[tuple(CLICKUP_TARGETS)]
+
+
+def conversation_window(state: State) -> list:
+    """The budget-compliant message list to send to the LLMs for this turn."""
+    configurable = ChatConfigurable.from_context()
+    return window_messages(state, int(configurable.context_max_tokens))
+
+
+def _valid_target(next_: str, target: Optional[str]) -> Optional[str]:
+    """Return the target only if it belongs to the chosen node."""
+    return target if target in TARGETS.get(next_, []) else None
 
 
 async def supervisor_node(state: State) -> State:
@@ -45,6 +76,17 @@ async def supervisor_node(state: State) -> State:
     the message and for deleting the messages that are not needed
     anymore.
 
+    While a ClickUp transaction is open the thread stays with the
+    CLICKUP_AGENT (see ``supervisor.transactions``), unless the user
+    cancels it, it has been open for too many turns or the local router
+    is very confident the message is for another agent. Otherwise the
+    local router is tried first and the LLM router only runs when its
+    confidence is below the configured threshold. The decision source
+    is stored in ``route_source``.
+
+    The same decision also picks the target inside the RAG and ClickUp
+    agents (``target``), so those nodes don't need a second router call.
+
     Parameters
     ----------
     state : State
@@ -55,21 +97,82 @@ async def supervisor_node(state: State) -> State:
     State
         The updated state of the graph
     """
+    started_at = time.time()
+    configurable = ChatConfigurable.from_context()
+    text = state["messages"][-1].content
+    local_router = get_local_router() if configurable.local_router else None
+
+    if state.get("transaction_open"):
+        if cancels_transaction(text):
+            # The agent acknowledges the cancellation; the transaction is closed
+            return {
+                "turn_started_at": started_at,
+                "next": "CLICKUP_AGENT",
+                "target": state.get("target"),
+                "route_source": "cancel",
+                "route_confidence": 1.0,
+                "transaction_open": False,
+                "sources": None,
+                "links": None,
+            }
+        if int(state.get("transaction_turns") or 0) < int(configurable.transaction_max_turns):
+            decision = None
+            if local_router is not None:
+                decision = await local_router.route(text, float(configurable.transaction_override_threshold))
+            if decision is not None and decision.next not in (None, "CLICKUP_AGENT"):
+                return {
+                    "turn_started_at": started_at,
+                    "next": decision.next,
+                    "target": local_router.route_target(decision.next, text),
+                    "route_source": decision.source,
+                    "route_confidence": decision.confidence,
+                    "transaction_open": False,
+                    "sources": None,
+                    "links": None,
+                }
+            return {
+                "turn_started_at": started_at,
+                "next": "CLICKUP_AGENT",
+                "target": state.get("target"),
+                "route_source": "sticky",
+                "route_confidence": 1.0,
+                "sources": None,
+                "links": None,
+            }
+
+    confidence = None
+    if local_router is not None:
+        decision = await local_router.route(text, float(configurable.router_confidence_threshold))
+        if decision.next is not None:
+            return {
+                "turn_started_at": started_at,
+                "next": decision.next,
+                "target": local_router.route_target(decision.next, text),
+                "route_source": decision.source,
+                "route_confidence": decision.confidence,
+                "transaction_open": False,
+                "sources": None,
+                "links": None,
+            }
+        confidence = decision.confidence
 
     # Get the list of messages. The first message is the
     # system prompt, the rest are the messages from the user
-    messages = [
-        {"role": "system", "content": SUPERVISOR_PROMPT_TEMPLATE.format(MEMBERS=", ".join(MEMBERS))},
-    ] + state["messages"]
+    messages = get_prompt("supervisor/route").format_messages(messages=conversation_window(state))
 
 
-    response = await supervisor_llm.with_structured_output(Router).ainvoke(messages)
+    response = await get_supervisor_llm().with_structured_output(Router).ainvoke(messages)
     next_ = response.get("next") or response.get("properties", {}).get("next")
+    target = response.get("target") or response.get("properties", {}).get("target")
 
     return {
-        "summary": "",
+        "turn_started_at": started_at,
         #"messages": delete_messages,
         "next": next_,
+        "target": _valid_target(next_, target),
+        "route_source": "llm",
+        "route_confidence": confidence,
+        "transaction_open": False,
         "sources": None,
         "links": None,
     }
@@ -85,6 +188,7 @@ async def bigquery_node(state: State) -> State:
         "counter": 0,
         "input": state["messages"][-1].content,
     }
+    sql_agent = await aget_agent("SQL_AGENT")
     result = await sql_agent.ainvoke(input, config=config)
 
     return {
@@ -103,6 +207,7 @@ async def postgres_node(state: State) -> State:
         "counter": 0,
         "input": state["messages"][-1].content,
     }
+    sql_agent = await aget_agent("SQL_AGENT")
     result = await sql_agent.ainvoke(input, config=config)
     print(f"Result: {result}")
     return {
@@ -116,54 +221,56 @@ async def sql_node(state: State) -> State:
         "counter": 0,
         "input": state["messages"][-1].content,
     }
-    result = await sql_agent.ainvoke(input)
+    timer = FirstTokenTimer(state.get("turn_started_at"))
+    sql_agent = await aget_agent("SQL_AGENT")
+    result = await sql_agent.ainvoke(input, config=with_callback(timer))
     print(f"Result: {result}")
+    emit_final_event(ttft_ms=timer.ttft_ms)
     return {
         "messages": result["answer"],
         "sources": None,
-        "links": None
+        "links": None,
+        "ttft_ms": timer.ttft_ms,
     }
 
-async def clickup_mcp_node(state: State) -> State:
+async def route_clickup_target(state: State) -> str:
+    """Fallback router used when the supervisor didn't choose a ClickUp target."""
+    messages = get_prompt("supervisor/route_clickup").format_messages(messages=conversation_window(state))
 
-    MEMBERS = ["QMS_AGENT", "HRM_AGENT"]
-    prompt = CLICKUP_SUPERVISOR_PROMPT_TEMPLATE.format(MEMBERS=", ".join(MEMBERS))
+    response = await get_supervisor_llm().with_structured_output(ClickUpRouter).ainvoke(messages)
+    return response.get("next") or response.get("properties", {}).get("next")
 
-    messages = [
-        {"role": "system", "content": prompt},
-    ] + state["messages"]
+async def clickup_mcp_node(state: State) -> State:
 
-    class ClickUpRouter(TypedDict):
-        next: Literal["QMS_AGENT", "HRM_AGENT"]
-    
-    response = await supervisor_llm.with_structured_output(ClickUpRouter).ainvoke(messages)
-    next_ = response.get("next") or response.get("properties", {}).get("next")
+    next_ = _valid_target("CLICKUP_AGENT", state.get("target")) or await route_clickup_target(state)
+    create_transaction_agent_graph = await aget_agent("CLICKUP_AGENT")
     if next_ == "QMS_AGENT":
         graph = await create_transaction_agent_graph("qms", mcp_host="http://localhost:10000/mcp/")
     else:
         graph = await create_transaction_agent_graph("hrm", mcp_host="http://localhost:10000/mcp/")
 
-    response = await graph.ainvoke({"messages": state["messages"]})
+    window = conversation_window(state)
+    response = await graph.ainvoke({"messages": window})
 
-    return{
-            "messages": response["messages"]
-        }
+    new_messages = response["messages"][len(window):]
 
-async def rag_node(state: State) -> State:
-    """Invoke the RAGS supervisor agent with the user's message as input."""
-    user_email = state["user_email"]
-    MEMBERS = ["QMS_Document_Retriever", "Freshwork_Document_Retriever"]
-    prompt = RAGS_SUPERVISOR_PROMPT_TEMPLATE.format(MEMBERS=", ".join(MEMBERS))
+    return {
+        "messages": new_messages,
+        "target": next_,
+        **transaction_update(state, new_messages),
+    }
 
-    class Router(TypedDict):
-        next: Literal["QMS_Document_Retriever", "Freshwork_Document_Retriever"]
+async def route_rag_target(state: State) -> str:
+    """Fallback router used when the supervisor didn't choose a document retriever."""
+    messages = get_prompt("supervisor/route_rag").format_messages(messages=conversation_window(state))
 
-    messages = [
-                {"role": "system", "content": prompt},
-            ] + state["messages"]
+    response = await get_supervisor_llm().with_structured_output(RagRouter).ainvoke(messages)
+    return response.get("next") or response.get("properties", {}).get("next")
 
-    response = await supervisor_llm.with_structured_output(Router).ainvoke(messages)
-    next_ = response.get("next") or response.get("properties", {}).get("next")
+async def rag_node(state: State) -> State:
+    """Invoke the RAGS supervisor agent with the user's message as input."""
+    user_email = state["user_email"]
+    next_ = _valid_target("RAG_AGENT", state.get("target")) or await route_rag_target(state)
     if next_ == "QMS_Document_Retriever":
             config = {
                 "user_email": user_email,
@@ -180,25 +287,28 @@ async def rag_node(state: State) -> State:
         }
 
     input = {
-        "messages": state["messages"],
+        "messages": conversation_window(state),
         "retry_count_grade_documents": 1,
         "retry_count_hallucinations": 3,
         "error": False,
-        "reflection": False,
+        "reflection": ChatConfigurable.from_context().rag_reflection,
         "current_user": user_email
     }
-    result = await rag_agent.ainvoke(input, config=config)
+    rag_agent = await aget_agent("RAG_AGENT")
+    timer = FirstTokenTimer(state.get("turn_started_at"))
+    result = await rag_agent.ainvoke(input, config=with_callback(timer, config))
+    emit_final_event(result.get("sources"), result.get("links"), timer.ttft_ms)
     return {
         "messages": result["messages"][-1].content,
         "sources": result.get("sources"),
         "links": result.get("links"),
         "next": result.get("next"),
+        "ttft_ms": timer.ttft_ms,
     }
     
 async def help_node(state: State) -> State:
     """Generate answer about assistant capabilities."""
 
-    help_prompt = PromptTemplate.from_template(EDWARDS_BASE_PROMPT)
     with open('src/supervisor/agents_discovery.json', 'r') as agents_discovery_file:
         data = json.load(agents_discovery_file)
         capabilities = ""
@@ -213,29 +323,51 @@ async def help_node(state: State) -> State:
     store = get_store()
     # This lists ALL user memories in the provided namespace (up to the `limit`)
     # you can also filter by content.
-    query = "\n".join(str(message.content) for message in state["messages"])
+    window = conversation_window(state)
+    query = "\n".join(str(message.content) for message in window)
     items = await store.asearch(namespace, query=query, limit=10)
 
-    system_message = help_prompt.format(
+    conversation_messages = [
+        message
+        for message in window
+        if message.type in ("human", "system") or (message.type == "ai" and not message.tool_calls)
+    ]
+    prompt = get_prompt("supervisor/help").format_messages(
         capabilities=capabilities,
         howto=how_to,
         user_memories=format_memories(items),
         time=datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%d %H:%M:%S"),
+        messages=conversation_messages,
     )
 
-    conversation_messages = [
-        message
-        for message in state["messages"]
-        if message.type in ("human", "system") or (message.type == "ai" and not message.tool_calls)
-    ]
-    prompt = [system_message] + conversation_messages
-
-    result = await edwards_llm.ainvoke(prompt)
+    timer = FirstTokenTimer(state.get("turn_started_at"))
+    result = await get_edwards_llm().ainvoke(prompt, config=with_callback(timer))
+    emit_final_event(ttft_ms=timer.ttft_ms)
 
     return {
         "messages": result.content,
         "sources": None,
-        "links": None
+        "links": None,
+        "ttft_ms": timer.ttft_ms,
+    }
+
+async def summarize_conversation(state: State) -> State:
+    """Fold the turns that left the conversation window into the rolling summary."""
+    configurable = ChatConfigurable.from_context()
+    fold, cursor = messages_to_fold(
+        state, int(configurable.context_keep_turns), int(configurable.context_max_tokens)
+    )
+    if not fold:
+        return {}
+
+    prompt = get_prompt("supervisor/summary").format_messages(
+        summary=state.get("summary") or "(empty)",
+        conversation=format_transcript(fold),
+    )
+    response = await get_supervisor_llm().ainvoke(prompt)
+    return {
+        "summary": response.content,
+        "summary_cursor": cursor,
     }
 
 async def next_agent(state: State) -> Literal["SQL_AGENT", "CLICKUP_AGENT", "RAG_AGENT", "HELP_AGENT"]:
@@ -280,6 +412,7 @@ workflow.add_node("CLICKUP_AGENT", clickup_mcp_node)
 workflow.add_node("RAG_AGENT", rag_node)   
 workflow.add_node("HELP_AGENT", help_node)
 workflow.add_node("MEMORY_AGENT", schedule_memories)
+workflow.add_node("SUMMARIZER", summarize_conversation)
 
 workflow.add_edge(START, "Supervisor")
 workflow.add_conditional_edges("Supervisor", next_agent)
@@ -289,4 +422,7 @@ workflow.add_edge("CLICKUP_AGENT", "MEMORY_AGENT")
 workflow.add_edge("RAG_AGENT", "MEMORY_AGENT")
 workflow.add_edge("HELP_AGENT", "MEMORY_AGENT")
 
+for agent in MEMBERS:
+    workflow.add_edge(agent, "SUMMARIZER")
+
 graph = workflow.compile()
\ No newline at end of file
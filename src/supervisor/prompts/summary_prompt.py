@@ -0,0 +1,13 @@
+SUMMARY_PROMPT_TEMPLATE = """
+You maintain a running summary of a conversation between a user and an assistant of the company's Quality Management System (SGC).
+
+Update the current summary with the new part of the conversation. Keep the facts the assistant may need later: what the user asked, the answers given, names, task or finding IDs, dates and any open request or transaction with its pending fields. Drop greetings and repetitions.
+
+Write the summary in the language of the conversation and keep it under 300 words.
+
+Current summary:
+{summary}
+
+New part of the conversation:
+{conversation}
+"""
@@ -58,3 +58,12 @@ You need to follow the next rules:
     4. If the request contains terms related to tasks, procedures, company data, or processes (e.g., "hallazgo", "oportunidad de mejora", "auditoría", "cierre de proyecto", "proceso", "política", "documentación"), route it to the appropriate node (**CLICKUP_AGENT**, **RAG_AGENT**, **BIGQUERY_AGENT**).
 
 """
+
+SUPERVISOR_TARGETS_PROMPT_TEMPLATE = """
+Besides the node, choose the target inside it in the same answer:
+
+- When the node is **RAG_AGENT**, the target is **QMS_Document_Retriever** for questions about company policies and quality procedures, or **Freshwork_Document_Retriever** for questions about Freshwork.
+- When the node is **CLICKUP_AGENT**, the target is **QMS_AGENT** to create and update tasks related to Quality Management Systems (findings, improvement opportunities, issues), or **HRM_AGENT** to create and update tasks related to Human Resources Management (profiles and job offers).
+- For **SQL_AGENT** and **HELP_AGENT** leave the target empty.
+
+"""
@@ -0,0 +1,43 @@
+"""Lazy registry of the sub-agents used by the supervisor.
+
+Importing an agent module builds its graph and pulls in its dependencies
+(vector store SDKs, SQLAlchemy dialects, MCP adapters...), so the modules are
+only imported the first time the supervisor routes a request to them.
+"""
+
+import asyncio
+import importlib
+from typing import Any
+
+
+AGENTS = {
+    "RAG_AGENT": "rag_agent.graph:graph",
+    #"SQL_AGENT": "sql_agent.postgres_graph:graph",
+    "SQL_AGENT": "sql_agent.bigquery_graph:graph",
+    "CLICKUP_AGENT": "transaction_agent.graph:make_graph",
+}
+
+
+# Graphs already imported, by agent name
+_agents: dict[str, Any] = {}
+
+
+def get_agent(name: str):
+    """Import and return the graph (or graph factory) registered for ``name``."""
+    agent = _agents.get(name)
+    if agent is not None:
+        return agent
+    try:
+        path = AGENTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown agent '{name}'.")
+    module_name, attribute = path.split(":")
+    return _agents.setdefault(name, getattr(importlib.import_module(module_name), attribute))
+
+
+async def aget_agent(name: str):
+    """Like ``get_agent`` but the first import runs in a worker thread, off the event loop."""
+    agent = _agents.get(name)
+    if agent is not None:
+        return agent
+    return await asyncio.to_thread(get_agent, name)
@@ -0,0 +1,220 @@
+"""Local fast-path router for the supervisor node.
+
+Scores the user's message against keyword rules and against embeddings of
+labelled examples (the supervisor test cases and the examples published in
+``agents_discovery.json``). Confident decisions skip the supervisor LLM call.
+"""
+
+import re
+import csv
+import json
+import asyncio
+import logging
+from pathlib import Path
+from typing import Optional
+from dataclasses import dataclass
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from common.text import normalize_text
+
+
+logger = logging.getLogger("supervisor")
+
+SUPERVISOR_DIR = Path(__file__).resolve().parent
+AGENTS_DISCOVERY_PATH = SUPERVISOR_DIR / "agents_discovery.json"
+SUPERVISOR_TEST_CASES_PATH = SUPERVISOR_DIR.parent / "evaluators" / "llm" / "test_cases" / "supervisor_test_cases.csv"
+
+# Labels used by the evaluators and agents_discovery.json mapped to supervisor members
+LABEL_ALIASES = {
+    "RAG_Document_Retriever": "RAG_AGENT",
+    "Freshwork_Document_Retriever": "RAG_AGENT",
+    "BIGQUERY_AGENT": "SQL_AGENT",
+    "FORMS_AGENT": "CLICKUP_AGENT",
+    "bigquery-agent": "SQL_AGENT",
+    "rag-agent": "RAG_AGENT",
+    "clickup-agent": "CLICKUP_AGENT",
+}
+
+# Patterns are matched against the normalized message (lowercase, no accents)
+KEYWORD_RULES = {
+    "CLICKUP_AGENT": [
+        r"\b(crea|crear|creame|cargar|carga|cargame|registrar|registra|dar de alta)\b",
+        r"\b(actualizar|actualiza|modificar|modifica)\b.*\b(tarea|hallazgo|perfil)\b",
+        r"\b(nuevo|nueva) (hallazgo|oportunidad de mejora|perfil|tarea)\b",
+    ],
+    "SQL_AGENT": [
+        r"\bcuant[oa]s\b",
+        r"\bhz-?\d+\b",
+        r"\b(estado|responsable|fecha de cierre|fecha de alta)\b.*\b(hallazgo|tarea|oportunidad)",
+        r"\b(listar?|mostrar?|muestrame|decime)\b.*\b(hallazgos|tareas|oportunidades)\b",
+        r"\b(mas antiguo|mas reciente|sin cerrar|abiertos|cerrados|pendientes)\b",
+    ],
+    "RAG_AGENT": [
+        r"\bque es (un|una|el|la)\b",
+        r"\b(procedimiento|procedimientos|politica|politicas|proceso|instructivo)\b",
+        r"\b(rol|roles|responsabilidades)\b",
+        r"\bfreshworks?\b",
+        r"\b(criterios|auditoria interna|induccion)\b",
+    ],
+    "HELP_AGENT": [
+        r"\bque (puedes|podes|sabes) hacer\b",
+        r"\b(funcionalidades|capacidades)\b",
+        r"\bcomo funciona (este|el) (sistema|asistente)\b",
+        r"\b(ayuda general|tu proposito|en que (areas )?(puedes|podes) (asistir|ayudar))\b",
+        r"\bcomo puedo\b",
+    ],
+}
+
+# Targets inside an agent, checked in order; a target without pattern is the default
+TARGET_RULES = {
+    "RAG_AGENT": [
+        ("Freshwork_Document_Retriever", r"\bfreshworks?\b"),
+        ("QMS_Document_Retriever", None),
+    ],
+    "CLICKUP_AGENT": [
+        ("HRM_AGENT", r"\b(perfil|perfiles|busqueda laboral|oferta laboral|ofertas laborales|candidat[oa]s?|vacantes?|rrhh|recursos humanos)\b"),
+        ("QMS_AGENT", r"\b(hallazgos?|oportunidad(es)? de mejora|no conformidad|auditoria|calidad)\b"),
+    ],
+}
+
+KEYWORD_WEIGHT = 0.1
+SOFTMAX_TEMPERATURE = 0.05
+
+
+@dataclass
+class RouteDecision:
+    """A routing decision and where it came from."""
+    next: Optional[str]
+    confidence: float
+    source: str
+
+
+def load_training_examples(
+    test_cases_path: Path = SUPERVISOR_TEST_CASES_PATH,
+    discovery_path: Path = AGENTS_DISCOVERY_PATH,
+) -> list[tuple[str, str]]:
+    """
+    Build (text, member) pairs from the supervisor test cases and agents_discovery.json.
+
+    The examples quoted in each agent description are labelled with the agent,
+    while the ``how-to-use`` queries are questions about the assistant itself and
+    are labelled as HELP_AGENT.
+    """
+    examples = []
+
+    if test_cases_path.exists():
+        with open(test_cases_path, newline="", encoding="utf-8") as test_cases_file:
+            for row in csv.DictReader(test_cases_file):
+                question, label = row.get("Pregunta"), row.get("Respuesta")
+                if question and label:
+                    examples.append((question, LABEL_ALIASES.get(label, label)))
+
+    if discovery_path.exists():
+        with open(discovery_path, encoding="utf-8") as agents_discovery_file:
+            for agent in json.load(agents_discovery_file):
+                member = LABEL_ALIASES.get(agent["name"])
+                if member:
+                    for example in re.findall(r"\*\*'(.+?)'\*\*", agent["description"]):
+                        examples.append((example, member))
+                for use_case in agent.get("how-to-use", []):
+                    examples.append((use_case["query"], "HELP_AGENT"))
+
+    return examples
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    exp = np.exp((scores - scores.max()) / SOFTMAX_TEMPERATURE)
+    return exp / exp.sum()
+
+
+class LocalRouter:
+    """
+    Nearest-example classifier over query embeddings, boosted by keyword rules.
+
+    The example embeddings are computed once, on first use, and kept in a
+    normalized matrix so each query costs one embedding call and one matrix
+    product.
+    """
+
+    def __init__(self, members: list[str], embedding_model: Embeddings, examples: Optional[list[tuple[str, str]]] = None):
+        self.members = list(members)
+        self.embedding_model = embedding_model
+        self.examples = [
+            (text, label) for text, label in (examples if examples is not None else load_training_examples())
+            if label in self.members
+        ]
+        self._rules = {
+            member: [re.compile(pattern) for pattern in KEYWORD_RULES.get(member, [])]
+            for member in self.members
+        }
+        self._matrix: Optional[np.ndarray] = None
+        self._labels: Optional[np.ndarray] = None
+        self._lock = asyncio.Lock()
+
+    def keyword_scores(self, text: str) -> np.ndarray:
+        """Number of keyword rules matched per member, capped at 2."""
+        normalized = normalize_text(text)
+        hits = [sum(1 for rule in self._rules[member] if rule.search(normalized)) for member in self.members]
+        return np.minimum(np.array(hits, dtype=np.float32), 2)
+
+    def route_target(self, member: str, text: str) -> Optional[str]:
+        """Pick the target inside ``member`` from keyword rules, or None if undecided."""
+        normalized = normalize_text(text)
+        for target, pattern in TARGET_RULES.get(member, []):
+            if pattern is None or re.search(pattern, normalized):
+                return target
+        return None
+
+    async def _ensure_index(self) -> None:
+        if self._matrix is not None:
+            return
+        async with self._lock:
+            if self._matrix is not None:
+                return
+            vectors = np.array(
+                await self.embedding_model.aembed_documents([text for text, _ in self.examples]),
+                dtype=np.float32,
+            )
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            self._labels = np.array([self.members.index(label) for _, label in self.examples])
+            self._matrix = vectors
+
+    async def embedding_scores(self, text: str) -> np.ndarray:
+        """Best cosine similarity between the query and the examples of each member."""
+        await self._ensure_index()
+        query = np.array(await self.embedding_model.aembed_query(text), dtype=np.float32)
+        similarities = self._matrix @ (query / np.linalg.norm(query))
+        scores = np.full(len(self.members), -1.0, dtype=np.float32)
+        np.maximum.at(scores, self._labels, similarities)
+        return scores
+
+    async def route(self, text: str, threshold: float) -> RouteDecision:
+        """
+        Classify the message locally.
+
+        Keyword rules are tried first since they cost nothing; the embedding
+        classifier only runs when they are not conclusive. ``next`` is None
+        when neither stage reaches the confidence threshold.
+        """
+        keywords = self.keyword_scores(text)
+        if keywords.any():
+            probabilities = _softmax(KEYWORD_WEIGHT * keywords)
+            best = int(probabilities.argmax())
+            if probabilities[best] >= threshold:
+                return RouteDecision(self.members[best], float(probabilities[best]), "keywords")
+
+        if not self.examples:
+            return RouteDecision(None, 0.0, "llm")
+        try:
+            scores = await self.embedding_scores(text)
+        except Exception as e:
+            logger.warning("Local router embedding stage failed, falling back to the LLM: %s", e)
+            return RouteDecision(None, 0.0, "llm")
+
+        probabilities = _softmax(scores + KEYWORD_WEIGHT * keywords)
+        best = int(probabilities.argmax())
+        if probabilities[best] >= threshold:
+            return RouteDecision(self.members[best], float(probabilities[best]), "embeddings")
+        return RouteDecision(None, float(probabilities[best]), "llm")
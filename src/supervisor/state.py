@@ -5,6 +5,15 @@ from typing import List
 class State(MessagesState):
     """Simple state."""
     next: List[str]
+    target: str  # Sub-agent chosen together with next, if any
     sources: str
     links: str
-    user_email: str
\ No newline at end of file
+    user_email: str
+    summary: str  # Rolling summary of the turns that left the conversation window
+    summary_cursor: int  # Number of messages already folded into the summary
+    route_source: str  # "sticky", "cancel", "keywords", "embeddings" or "llm"
+    route_confidence: float
+    transaction_open: bool
+    transaction_turns: int  # Consecutive turns the ClickUp transaction has been open
+    turn_started_at: float  # Epoch seconds when the supervisor received the turn
+    ttft_ms: float  # Time to the first answer token of the turn
@@ -0,0 +1,64 @@
+"""ClickUp transactions that keep a thread with the CLICKUP_AGENT.
+
+A transaction opens when the user asks to create or update a task and the
+agent answers with a question (missing fields, confirmation). The following
+turns then skip the routers and go straight back to the agent, until:
+
+- the agent creates or updates the task, or stops asking,
+- the user cancels (``cancels_transaction``),
+- the transaction stays open for ``transaction_max_turns`` turns, or
+- the local router sends a message elsewhere with a confidence of at least
+  ``transaction_override_threshold``.
+"""
+
+import re
+from typing import Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from common.text import normalize_text
+from supervisor.router import KEYWORD_RULES
+
+
+# ClickUp tools that complete an open transaction
+TRANSACTION_CLOSING_TOOLS = ("create_task", "update_task")
+# The CLICKUP_AGENT keyword rules are create/update requests
+TRANSACTION_START_RULES = [re.compile(pattern) for pattern in KEYWORD_RULES["CLICKUP_AGENT"]]
+# Matched against the normalized message (lowercase, no accents). Only explicit cancel
+# phrasings at the start of the message: "deja la prioridad en alta" answers the agent
+CANCEL_PATTERN = re.compile(
+    r"^\W*(?:no\W+)?(?:cancel|cancelar|cancela|cancelalo|cancelala|olvidalo|olvidate|dejalo)\b"
+    r"|^\W*salir\W*$"
+)
+
+
+def starts_transaction(text: str) -> bool:
+    normalized = normalize_text(text)
+    return any(rule.search(normalized) for rule in TRANSACTION_START_RULES)
+
+
+def cancels_transaction(text: str) -> bool:
+    return bool(CANCEL_PATTERN.search(normalize_text(text)))
+
+
+def awaits_user(messages: Sequence[BaseMessage]) -> bool:
+    """Whether the agent ended its turn asking the user something."""
+    if not messages or not isinstance(messages[-1], AIMessage) or messages[-1].tool_calls:
+        return False
+    return "?" in str(messages[-1].content)
+
+
+def transaction_update(state: dict, new_messages: Sequence[BaseMessage]) -> dict:
+    """``transaction_open`` and ``transaction_turns`` after a CLICKUP_AGENT turn."""
+    was_open = bool(state.get("transaction_open"))
+    closed = any(
+        isinstance(message, ToolMessage)
+        and message.name in TRANSACTION_CLOSING_TOOLS
+        and message.status != "error"
+        for message in new_messages
+    )
+    in_flow = was_open or starts_transaction(state["messages"][-1].content)
+    if closed or not in_flow or not awaits_user(new_messages):
+        return {"transaction_open": False, "transaction_turns": 0}
+    turns = int(state.get("transaction_turns") or 0) if was_open else 0
+    return {"transaction_open": True, "transaction_turns": turns + 1}
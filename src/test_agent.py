@@ -69,8 +69,35 @@ async def test_transaction_agent():
         print(chunk.data)
         print("\n\n")
 
+async def test_edwards_streaming():
+    # Answer tokens come from the sub-agents (nested graphs), so subgraphs must be streamed.
+    # The "custom" stream carries the final event with sources, links and time-to-first-token,
+    # and reset events when the answer streamed so far was rejected.
+    async for chunk in client.runs.stream(
+        None,
+        "edwards",
+        input={
+            "messages": ["Que es un hallazgo?"],
+            "user_email": "test_user@snoopconsulting.com",
+        },
+        stream_mode=["messages-tuple", "custom"],
+        stream_subgraphs=True,
+    ):
+        if chunk.event.startswith("messages"):
+            message, metadata = chunk.data
+            if "answer" in metadata.get("tags", []):
+                print(message["content"], end="", flush=True)
+        elif chunk.event.startswith("custom") and chunk.data["event"] == "reset":
+            # The answer streamed so far was rejected, a new one follows
+            print(f"\n[discarded: {chunk.data['reason']}]\n")
+        elif chunk.event.startswith("custom"):
+            print(f"\n\nSources: {chunk.data['sources']}")
+            print(f"Links: {chunk.data['links']}")
+            print(f"Time to first token: {chunk.data['ttft_ms']} ms")
+
 if __name__ == "__main__":
     import asyncio
     asyncio.run(test_rag_agent())
     #asyncio.run(test_sql_agent())
-    #asyncio.run(test_transaction_agent())
\ No newline at end of file
+    #asyncio.run(test_transaction_agent())
+    #asyncio.run(test_edwards_streaming())
\ No newline at end of file
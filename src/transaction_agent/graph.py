@@ -8,10 +8,9 @@ from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
-from langchain_core.messages import SystemMessage
 
-from langchain.chat_models import init_chat_model
-from transaction_agent.prompts.clickup_agent_prompt import QMS_ASSISTANT_PROMPT, HRM_ASSISTANT_PROMPT
+from common.models import get_chat_model
+from common.prompts import get_prompt
 
 class State(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
@@ -19,7 +18,8 @@ class State(TypedDict):
 from dotenv import load_dotenv
 load_dotenv()
 
-model = init_chat_model("azure_openai:gpt-4.1", temperature=0)
+def get_model():
+    return get_chat_model("azure_openai:gpt-4.1")
 
 _available_tools = (
         "create_task", 
@@ -28,11 +28,11 @@ _available_tools = (
     )
 
 
-def get_transaction_info(transaction_type: str) -> tuple[int, str]:
+def get_transaction_info(transaction_type: str) -> tuple[str, int, str]:
     if transaction_type == "qms":
-        return QMS_ASSISTANT_PROMPT, 901409098158, "qms"
+        return "clickup/qms", 901409098158, "qms"
     elif transaction_type == "hrm":
-        return HRM_ASSISTANT_PROMPT, 901409005728, "hrm"
+        return "clickup/hrm", 901409005728, "hrm"
     else:
         raise ValueError(f"Unsupported transaction type: {transaction_type}")
 
@@ -53,10 +53,10 @@ async def make_graph(transaction_type, mcp_host: str = "http://localhost:10000/m
     custom_fields_prompt = await client.get_prompt("clickup", "custom_fields")
     users_prompt = await client.get_resources("clickup", uris=["bigquery://projects/Snoop-RAG/datasets/findings/tables/resource_clickup_user"])
     
-    prompt_template, list_id, form_id = get_transaction_info(transaction_type)
+    prompt_name, list_id, form_id = get_transaction_info(transaction_type)
     form = await client.get_resources("clickup", uris=[f"file://forms/{form_id}"])
     list_id = list_id
-    prompt = prompt_template.format(
+    prompt = get_prompt(prompt_name).partial(
         LIST_ID=list_id, 
         CUSTOM_FIELDS_PROMPT=custom_fields_prompt[0].content,
         CLICKUP_USERS=users_prompt[0].data,
@@ -65,10 +65,10 @@ async def make_graph(transaction_type, mcp_host: str = "http://localhost:10000/m
 
     print(f"Available tools: {[tool.name for tool in mcp_tools]}")
     
-    llm_with_tool = model.bind_tools(mcp_tools)
+    llm_with_tool = get_model().bind_tools(mcp_tools)
 
     def call_model(state: State):
-        response = llm_with_tool.invoke([SystemMessage(prompt)] + state["messages"])
+        response = llm_with_tool.invoke(prompt.format_messages(messages=state["messages"]))
         return {"messages": [response]}
 
     # Compile application and test
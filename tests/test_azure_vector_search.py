@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from rag_agent.principals import azure_filter
+from rag_agent.vector_stores import azure_vector_search
+from rag_agent.vector_stores.azure_vector_search import AzureVectorSearch
+
+
+class Results:
+    def __init__(self, results):
+        self.results = iter(results)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.results)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeSearchClient:
+    created = []
+
+    def __init__(self, endpoint, index_name, credential):
+        self.endpoint = endpoint
+        self.index_name = index_name
+        self.searches = []
+        FakeSearchClient.created.append(self)
+
+    async def search(self, **kwargs):
+        self.searches.append(kwargs)
+        return Results([{"sourcefile": "a.pdf", azure_vector_search.CONTENT_FIELD: "chunk"}])
+
+
+class Embeddings:
+    def __init__(self):
+        self.questions = []
+
+    def embed_query(self, question):
+        raise AssertionError("the sync embedding call blocks the event loop")
+
+    async def aembed_query(self, question):
+        self.questions.append(question)
+        return [0.1, 0.2]
+
+
+@pytest.fixture(autouse=True)
+def search_client(monkeypatch):
+    monkeypatch.setattr(azure_vector_search, "SearchClient", FakeSearchClient)
+    FakeSearchClient.created = []
+
+
+def search(**kwargs):
+    return AzureVectorSearch("key", "https://search", "sgc", Embeddings(), k=3, **kwargs)
+
+
+def test_retrieve_embeds_asynchronously_and_builds_documents():
+    vector_search = search()
+    [document] = asyncio.run(vector_search.retrieve("¿Qué es una auditoría?"))
+    assert vector_search.embedding_model.questions == ["¿Qué es una auditoría?"]
+    assert (document.content, document.filename) == ("chunk", "a.pdf")
+    assert document.source == azure_vector_search.CONTAINER_PATH + "a.pdf"
+
+
+def test_search_arguments():
+    vector_search = search()
+    asyncio.run(vector_search.retrieve("q"))
+    [kwargs] = FakeSearchClient.created[0].searches
+    assert kwargs["search_text"] == "q"
+    assert kwargs["top"] == 3
+    assert kwargs["select"] == list(azure_vector_search.DEFAULT_SELECT_FIELDS)
+    [vector_query] = kwargs["vector_queries"]
+    assert (vector_query.vector, vector_query.k_nearest_neighbors) == ([0.1, 0.2], 3)
+    assert vector_query.fields == azure_vector_search.VECTOR_FIELD
+    assert "query_type" not in kwargs and "filter" not in kwargs
+
+
+def test_semantic_configuration_and_acl_filter_are_passed():
+    vector_search = search(semantic_configuration_name="default", select_fields=("content", "sourcefile", "page"))
+    asyncio.run(vector_search.retrieve("q", principals=("anyone", "user:ana@empresa.com")))
+    [kwargs] = FakeSearchClient.created[0].searches
+    assert (kwargs["query_type"], kwargs["semantic_configuration_name"]) == ("semantic", "default")
+    assert kwargs["filter"] == azure_filter(("anyone", "user:ana@empresa.com"))
+    assert kwargs["select"] == ["content", "sourcefile", "page"]
+
+
+def test_client_is_reused_per_index_and_event_loop():
+    sgc, other = search(), AzureVectorSearch("key", "https://search", "other", Embeddings())
+
+    async def retrieve():
+        for vector_search in (sgc, other, sgc, other):
+            await vector_search.retrieve("q")
+
+    asyncio.run(retrieve())
+    assert [client.index_name for client in FakeSearchClient.created] == ["sgc", "other"]
+    assert [len(client.searches) for client in FakeSearchClient.created] == [2, 2]
+    # A new event loop can't use the session of the previous one
+    asyncio.run(sgc.retrieve("q"))
+    assert len(FakeSearchClient.created) == 3
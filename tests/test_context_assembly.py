@@ -0,0 +1,61 @@
+import pytest
+
+from common import tokens
+from rag_agent.context import CHUNK_SEPARATOR, assemble_context, count_tokens, jaccard, shingles
+from rag_agent.document import Document
+
+
+@pytest.fixture(autouse=True)
+def character_estimate(monkeypatch):
+    # The tiktoken vocabulary is downloaded on first use, the estimate keeps the tests offline
+    monkeypatch.setattr(tokens, "get_encoder", lambda: None)
+
+
+def doc(content, filename="a.pdf"):
+    return Document(content, filename, f"https://{filename}")
+
+
+PASSAGE = "el responsable del proceso revisa los hallazgos de auditoría cada mes y registra las acciones correctivas"
+
+
+def test_jaccard():
+    assert jaccard({1, 2}, {2, 3}) == 1 / 3
+    assert jaccard(set(), set()) == 1.0
+
+
+def test_shingles_ignore_case_and_accents():
+    assert shingles("Auditoría  INTERNA") == shingles("auditoria interna")
+    assert len(shingles(PASSAGE)) == len(PASSAGE.split()) - 4
+
+
+def test_near_duplicates_of_better_ranked_chunks_are_dropped():
+    context = assemble_context([doc(PASSAGE), doc(PASSAGE.upper() + ".", "b.pdf"), doc("procedimiento de compras")])
+    assert [document.content for document in context.documents] == [PASSAGE, "procedimiento de compras"]
+    assert context.duplicates == 1
+
+
+def test_threshold_keeps_partial_overlaps():
+    half = " ".join(PASSAGE.split()[:9]) + " y luego se archivan en la carpeta del sistema de gestión"
+    assert len(assemble_context([doc(PASSAGE), doc(half)], duplicate_threshold=0.8).documents) == 2
+    assert len(assemble_context([doc(PASSAGE), doc(half)], duplicate_threshold=0.1).documents) == 1
+
+
+def test_best_ranked_chunks_that_fit_the_budget_are_kept():
+    long, short = doc("x" * 400), doc("compras")
+    budget = count_tokens(f"[999] a.pdf\n{'x' * 400}")
+    context = assemble_context([long, doc("y" * 400), short], token_budget=budget + 10)
+    assert [document.content for document in context.documents] == ["x" * 400, "compras"]
+    assert context.truncated == 1
+    assert context.tokens <= budget + 10
+
+
+def test_chunks_are_grouped_by_file_and_numbered():
+    documents = [doc("uno", "a.pdf"), doc("dos", "b.pdf"), doc("tres", "a.pdf")]
+    context = assemble_context(documents)
+    assert [document.content for document in context.documents] == ["uno", "tres", "dos"]
+    assert context.text == CHUNK_SEPARATOR.join(["[1] a.pdf\nuno", "[2] a.pdf\ntres", "[3] b.pdf\ndos"])
+
+
+def test_empty_context():
+    context = assemble_context([])
+    assert (context.text, context.documents, context.tokens) == ("", [], 0)
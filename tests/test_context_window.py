@@ -0,0 +1,74 @@
+import random
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from common import tokens
+from supervisor import context
+from supervisor.context import NEXT_TURN_TOKENS, SUMMARY_FOLD_TURNS, messages_to_fold, split_turns, window_messages
+
+
+class WordEncoding:
+    """One token per word, so tests don't need the tiktoken vocabulary."""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(tokens, "get_encoder", lambda: WordEncoding())
+
+
+def words(n):
+    return " ".join(["word"] * n)
+
+
+def test_split_turns_keeps_tool_messages_with_their_turn():
+    messages = [HumanMessage("a"), AIMessage("b"), AIMessage("c"), HumanMessage("d")]
+    assert [len(turn) for turn in split_turns(messages)] == [3, 1]
+
+
+def test_window_keeps_every_unfolded_turn_up_to_the_fold_threshold():
+    keep_turns = 2
+    messages = []
+    for i in range(keep_turns + SUMMARY_FOLD_TURNS):
+        messages += [HumanMessage(f"q{i}"), AIMessage(f"a{i}")]
+    state = {"messages": messages}
+    assert messages_to_fold(state, keep_turns, 4000) == ([], 0)
+    assert window_messages(state, 4000) == messages
+
+
+def test_fold_leaves_the_last_turns():
+    messages = []
+    for i in range(6):
+        messages += [HumanMessage(f"q{i}"), AIMessage(f"a{i}")]
+    fold, cursor = messages_to_fold({"messages": messages}, 2, 4000)
+    assert fold == messages[:8]
+    assert cursor == 8
+
+
+def test_fold_makes_room_for_the_next_turn():
+    messages = [HumanMessage(words(1500)), AIMessage(words(1500)), HumanMessage("q"), AIMessage(words(200))]
+    fold, cursor = messages_to_fold({"messages": messages}, 6, 4000)
+    assert cursor == 2
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_every_turn_is_in_the_window_or_in_the_summary(seed):
+    rng = random.Random(seed)
+    max_tokens, keep_turns = 4000, rng.randint(1, 6)
+    state = {"messages": [], "summary": "", "summary_cursor": 0}
+    for _ in range(30):
+        state["messages"].append(HumanMessage(words(rng.randint(1, NEXT_TURN_TOKENS - 20))))
+        window = window_messages(state, max_tokens)
+        unfolded = state["messages"][state["summary_cursor"]:]
+        assert window[len(window) - len(unfolded):] == unfolded
+        assert context.count_tokens(window) <= max_tokens
+
+        state["messages"].append(AIMessage(words(rng.randint(1, 1200))))
+        fold, cursor = messages_to_fold(state, keep_turns, max_tokens)
+        assert state["messages"][state["summary_cursor"]:cursor] == fold
+        if fold:
+            # Summaries stay under the 300 words asked by the prompt
+            state["summary"], state["summary_cursor"] = words(300), cursor
@@ -0,0 +1,171 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from rag_agent import drive_acl as acl_module
+from rag_agent.document import Document
+from rag_agent.drive_acl import DriveACL, Permission, TTLCache, file_id, is_allowed, permission_principals
+
+
+USER = "ana@empresa.com"
+
+
+def permission(type, email="", domain=""):
+    return {"type": type, "emailAddress": email, "domain": domain}
+
+
+class HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.resp = SimpleNamespace(status=status)
+
+
+class FakeDrive:
+    """Drive client serving ``pages`` (file id -> list of responses, or an exception) in batches."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def permissions(self):
+        return self
+
+    def list(self, fileId, fields, pageToken, supportsAllDrives):
+        drive = self
+
+        class Request:
+            def execute(self):
+                drive.requests.append((fileId, pageToken))
+                pages = drive.pages[fileId]
+                if isinstance(pages, Exception):
+                    raise pages
+                page = pages[int(pageToken or 0)]
+                if isinstance(page, Exception):
+                    raise page
+                return page
+
+        return Request()
+
+    def new_batch_http_request(self, callback):
+        requests = []
+
+        class Batch:
+            def add(self, request, request_id):
+                requests.append((request, request_id))
+
+            def execute(self):
+                for request, request_id in requests:
+                    try:
+                        callback(request_id, request.execute(), None)
+                    except Exception as e:
+                        callback(request_id, None, e)
+
+        return Batch()
+
+
+def drive_doc(drive_id):
+    return Document("chunk", f"{drive_id}.pdf", f"https://docs.google.com/document/d/{drive_id}/edit")
+
+
+def test_file_id():
+    assert file_id("https://docs.google.com/document/d/abc123/edit?tab=t.0") == "abc123"
+    assert file_id("https://example.com/a.pdf") is None
+    assert file_id(None) is None
+
+
+@pytest.mark.parametrize("permissions, groups, allowed", [
+    ({Permission("anyone")}, (), True),
+    ({Permission("user", USER)}, (), True),
+    ({Permission("user", "otro@empresa.com")}, (), False),
+    ({Permission("domain", domain="empresa.com")}, (), True),
+    ({Permission("domain", domain="otra.com")}, (), False),
+    ({Permission("group", "calidad@empresa.com")}, ("calidad@empresa.com",), True),
+    ({Permission("group", "calidad@empresa.com")}, (), False),
+    (set(), (), False),
+])
+def test_is_allowed(permissions, groups, allowed):
+    assert is_allowed(frozenset(permissions), USER, frozenset(groups)) is allowed
+
+
+def test_permission_principals():
+    permissions = frozenset({
+        Permission("anyone"), Permission("user", USER), Permission("group", "calidad@empresa.com"),
+        Permission("domain", domain="empresa.com"), Permission("deleted", "x@empresa.com"),
+    })
+    assert permission_principals(permissions) == [
+        "anyone", "domain:empresa.com", "group:calidad@empresa.com", f"user:{USER}",
+    ]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(acl_module.time, "monotonic", clock)
+    return clock
+
+
+def test_ttl_cache_expires_and_prunes_on_put(clock):
+    cache = TTLCache(ttl=10)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    clock.now += 11
+    assert cache.get("a") is None
+    cache.put("b", 2)
+    clock.now += 11
+    # "b" is never read again: the next put drops it
+    cache.put("c", 3)
+    assert set(cache._items) == {"c"}
+
+
+def test_filter_keeps_readable_documents_and_caches_permissions():
+    drive = FakeDrive({
+        "public": [{"permissions": [permission("anyone")]}],
+        "mine": [{"permissions": [permission("user", USER.upper())]}],
+        "private": [{"permissions": [permission("user", "otro@empresa.com")]}],
+        "missing": HttpError(404),
+    })
+    acl = DriveACL(drive)
+    documents = [drive_doc(i) for i in ("public", "mine", "private", "missing")] + [Document("x", "x.pdf", "https://x")]
+    allowed = asyncio.run(acl.afilter(documents, USER))
+    assert [document.filename for document in allowed] == ["public.pdf", "mine.pdf"]
+    requests = len(drive.requests)
+    acl.filter(documents, USER)
+    assert len(drive.requests) == requests
+    assert acl.stats["cache_hits"] == 4
+
+
+def test_permissions_of_every_page_are_merged():
+    drive = FakeDrive({"shared": [
+        {"permissions": [permission("user", "otro@empresa.com")], "nextPageToken": "1"},
+        {"permissions": [permission("user", USER)]},
+    ]})
+    assert len(DriveACL(drive).filter([drive_doc("shared")], USER)) == 1
+
+
+def test_failed_page_denies_only_that_file_and_leaves_it_uncached():
+    drive = FakeDrive({
+        "long": [{"permissions": [], "nextPageToken": "1"}, HttpError(500)],
+        "public": [{"permissions": [permission("anyone")]}],
+    })
+    acl = DriveACL(drive)
+    allowed = acl.filter([drive_doc("long"), drive_doc("public")], USER)
+    assert [document.filename for document in allowed] == ["public.pdf"]
+    assert acl._permissions.get("long") is None
+    assert acl._permissions.get("public") is not None
+
+
+def test_transient_errors_are_retried_on_the_next_request():
+    drive = FakeDrive({"flaky": HttpError(503)})
+    acl = DriveACL(drive)
+    assert acl.filter([drive_doc("flaky")], USER) == []
+    drive.pages["flaky"] = [{"permissions": [permission("anyone")]}]
+    assert len(acl.filter([drive_doc("flaky")], USER)) == 1
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from common.embedding_batcher import MicroBatchingEmbeddings
+
+
+class RecordingEmbeddings(DeterministicFakeEmbedding):
+    requests: list = []
+    drop: int = 0
+
+    async def aembed_documents(self, texts):
+        self.requests.append(list(texts))
+        return self.embed_documents(texts)[:len(texts) - self.drop]
+
+
+async def embed_all(batcher, texts):
+    return await asyncio.gather(*(batcher.aembed_query(text) for text in texts))
+
+
+def test_concurrent_queries_are_sent_as_one_request():
+    model = RecordingEmbeddings(size=4, requests=[])
+    batcher = MicroBatchingEmbeddings(model, max_wait_ms=5)
+    vectors = asyncio.run(embed_all(batcher, ["a", "b", "c"]))
+    assert model.requests == [["a", "b", "c"]]
+    assert vectors == [model.embed_query(text) for text in "abc"]
+    assert batcher.batching_stats()["mean_batch_size"] == 3
+
+
+def test_full_batches_are_sent_without_waiting():
+    model = RecordingEmbeddings(size=4, requests=[])
+    batcher = MicroBatchingEmbeddings(model, max_batch_size=2, max_wait_ms=60000)
+    asyncio.run(asyncio.wait_for(embed_all(batcher, ["a", "b", "c", "d"]), timeout=1))
+    assert model.requests == [["a", "b"], ["c", "d"]]
+
+
+def test_errors_reach_every_caller():
+    class FailingEmbeddings(RecordingEmbeddings):
+        async def aembed_documents(self, texts):
+            raise RuntimeError("unavailable")
+
+    batcher = MicroBatchingEmbeddings(FailingEmbeddings(size=4, requests=[]))
+    with pytest.raises(RuntimeError):
+        asyncio.run(embed_all(batcher, ["a", "b"]))
+
+
+def test_missing_vectors_fail_the_batch_instead_of_hanging():
+    batcher = MicroBatchingEmbeddings(RecordingEmbeddings(size=4, requests=[], drop=1))
+    with pytest.raises(ValueError):
+        asyncio.run(asyncio.wait_for(embed_all(batcher, ["a", "b"]), timeout=1))
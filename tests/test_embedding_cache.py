@@ -0,0 +1,72 @@
+import asyncio
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from common.embedding_cache import CachedEmbeddings, SQLiteEmbeddingStore, cache_key
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: list = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return super().embed_documents(texts)
+
+
+def counting():
+    return CountingEmbeddings(size=4, calls=[])
+
+
+def test_normalized_texts_share_a_key():
+    assert cache_key("m", "hola  mundo\n") == cache_key("m", "hola mundo")
+    assert cache_key("m", "Hola") != cache_key("m", "hola")
+    assert cache_key("m@1", "hola") != cache_key("m@2", "hola")
+
+
+def test_memory_tier_serves_repeated_texts():
+    model = counting()
+    cached = CachedEmbeddings(model, "m", memory_size=10)
+    first = cached.embed_documents(["a", "b", "a"])
+    assert cached.embed_documents(["b", "a"]) == [first[1], first[0]]
+    assert model.calls == [["a", "b"]]
+    assert cached.cache_stats()["memory_hits"] == 2
+
+
+def test_memory_tier_evicts_the_least_recently_used():
+    cached = CachedEmbeddings(counting(), "m", memory_size=2)
+    cached.embed_documents(["a", "b"])
+    cached.embed_documents(["a"])
+    cached.embed_documents(["c"])
+    assert cached._memory_get([cache_key(cached.key_prefix, text) for text in "abc"]).keys() == {
+        cache_key(cached.key_prefix, "a"), cache_key(cached.key_prefix, "c"),
+    }
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    store = SQLiteEmbeddingStore(tmp_path / "embeddings.sqlite3")
+    vectors = CachedEmbeddings(counting(), "m", disk_store=store).embed_documents(["a", "b"])
+    model = counting()
+    cached = CachedEmbeddings(model, "m", disk_store=store)
+    # Stored as float32
+    assert np.allclose(asyncio.run(cached.aembed_documents(["a", "b"])), vectors)
+    assert model.calls == []
+    assert cached.cache_stats()["disk_hits"] == 2
+
+
+def test_new_model_version_drops_its_vectors(tmp_path):
+    store = SQLiteEmbeddingStore(tmp_path / "embeddings.sqlite3")
+    CachedEmbeddings(counting(), "m", version="1", disk_store=store).embed_documents(["a"])
+    CachedEmbeddings(counting(), "other", version="1", disk_store=store).embed_documents(["a"])
+    model = counting()
+    CachedEmbeddings(model, "m", version="2", disk_store=store).embed_documents(["a"])
+    assert model.calls == [["a"]]
+    count = store._connection.execute("SELECT model, COUNT(*) FROM embeddings GROUP BY model").fetchall()
+    assert dict(count) == {"m": 1, "other": 1}
+
+
+def test_disk_tier_is_trimmed_to_its_size(tmp_path, monkeypatch):
+    monkeypatch.setattr("common.embedding_cache.EVICTION_INTERVAL", 1)
+    store = SQLiteEmbeddingStore(tmp_path / "embeddings.sqlite3", max_rows=2)
+    CachedEmbeddings(counting(), "m", disk_store=store).embed_documents(["a", "b", "c"])
+    assert store._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 2
@@ -0,0 +1,107 @@
+import asyncio
+import sqlite3
+
+import numpy as np
+import pytest
+
+from rag_agent.document import Document
+from rag_agent.vector_stores import faiss_local_vector_search as faiss_local
+from rag_agent.vector_stores.faiss_local_vector_search import FaissLocalVectorSearch, apublish_from_texts, publish_index
+
+
+DIMENSION = 8
+
+
+class Embeddings:
+    """Query i embeds to the basis vector i, documents to their position in the corpus."""
+
+    async def aembed_query(self, question):
+        return np.eye(DIMENSION)[int(question)].tolist()
+
+    async def aembed_documents(self, texts):
+        return [np.eye(DIMENSION)[i].tolist() for i in range(len(texts))]
+
+
+def corpus(prefix, size=4):
+    documents = [Document(f"{prefix} {i}", f"{prefix}{i}.pdf", f"https://{prefix}/{i}") for i in range(size)]
+    # Document i points mostly to axis i, and a bit to the next one
+    vectors = np.eye(DIMENSION, dtype=np.float32)[:size] + 0.3 * np.eye(DIMENSION, k=1, dtype=np.float32)[:size]
+    return documents, vectors
+
+
+@pytest.fixture(autouse=True)
+def loaded(monkeypatch):
+    monkeypatch.setattr(faiss_local, "_loaded", {})
+
+
+def contents(documents):
+    return [document.content for document in documents]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_published_index_is_searched_through_the_sidecar(tmp_path, index_type):
+    publish_index("sgc", *corpus("v1"), index_type=index_type, base_dir=tmp_path)
+    search = FaissLocalVectorSearch("sgc", Embeddings(), k=2, base_dir=tmp_path)
+    # Axis 1 is closest to document 1, then to document 0 (which leans to axis 1)
+    [first, second] = asyncio.run(search.retrieve("1"))
+    assert (first.content, first.filename, first.source) == ("v1 1", "v11.pdf", "https://v1/1")
+    assert second.content == "v1 0"
+
+
+def test_hits_missing_from_the_sidecar_are_dropped(tmp_path):
+    version = publish_index("sgc", *corpus("v1"), index_type="flat", base_dir=tmp_path)
+    with sqlite3.connect(tmp_path / "sgc" / version / faiss_local.SIDECAR_FILE) as sidecar:
+        sidecar.execute("DELETE FROM documents WHERE id = 1")
+    sidecar.close()
+    search = FaissLocalVectorSearch("sgc", Embeddings(), k=2, base_dir=tmp_path)
+    assert contents(asyncio.run(search.retrieve("1"))) == ["v1 0"]
+
+
+def test_new_version_is_swapped_in_while_serving(tmp_path, monkeypatch):
+    monkeypatch.setattr(faiss_local, "RELOAD_CHECK_INTERVAL", 0.01)
+    first = publish_index("sgc", *corpus("v1"), index_type="flat", base_dir=tmp_path)
+    search = FaissLocalVectorSearch("sgc", Embeddings(), k=1, base_dir=tmp_path)
+
+    async def retrieve_until_swapped():
+        assert contents(await search.retrieve("0")) == ["v1 0"]
+        second = publish_index("sgc", *corpus("v2"), index_type="flat", base_dir=tmp_path)
+        served = []
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            served.append(contents(await search.retrieve("0"))[0])
+            if search._index.version_name == second:
+                break
+        return second, served
+
+    second, served = asyncio.run(retrieve_until_swapped())
+    assert second != first
+    # The old version kept answering until the new one was loaded
+    assert set(served[:-1]) <= {"v1 0"}
+    assert contents(asyncio.run(search.retrieve("0"))) == ["v2 0"]
+
+
+def test_only_the_current_and_previous_versions_are_kept(tmp_path):
+    versions = [publish_index("sgc", *corpus(f"v{i}"), index_type="flat", base_dir=tmp_path) for i in range(4)]
+    index_dir = tmp_path / "sgc"
+    assert sorted(path.name for path in index_dir.iterdir() if path.is_dir()) == versions[-2:]
+    assert (index_dir / faiss_local.POINTER_FILE).read_text() == versions[-1]
+
+
+def test_apublish_from_texts_embeds_the_documents(tmp_path):
+    documents, _ = corpus("v1")
+    asyncio.run(apublish_from_texts("sgc", documents, Embeddings(), index_type="flat", base_dir=tmp_path))
+    search = FaissLocalVectorSearch("sgc", Embeddings(), k=1, base_dir=tmp_path)
+    assert contents(asyncio.run(search.retrieve("2"))) == ["v1 2"]
+
+
+def test_index_without_a_published_version(tmp_path):
+    with pytest.raises(ValueError, match="no published version"):
+        FaissLocalVectorSearch("sgc", Embeddings(), base_dir=tmp_path)
+
+
+def test_publish_checks_its_arguments(tmp_path):
+    documents, vectors = corpus("v1")
+    with pytest.raises(ValueError):
+        publish_index("sgc", documents[:2], vectors, base_dir=tmp_path)
+    with pytest.raises(ValueError):
+        publish_index("sgc", documents, vectors, index_type="lsh", base_dir=tmp_path)
@@ -0,0 +1,117 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import StateGraph
+
+from rag_agent import graph as rag_graph
+from rag_agent.document import Document
+from rag_agent.errors import HALLUCINATION_ERROR, NO_DOCUMENTS_FOR_QUESTION_ERROR
+from rag_agent.state import RagState
+
+
+class Graders:
+    """Stubbed reflection graders answering ``grounded`` and ``answers``, with the calls they got."""
+
+    def __init__(self, monkeypatch, grounded, answers):
+        self.calls = []
+
+        def grader(name, **score):
+            def grade(inputs):
+                self.calls.append((name, inputs))
+                return SimpleNamespace(**score)
+
+            return lambda: RunnableLambda(grade)
+
+        monkeypatch.setattr(rag_graph, "get_hallucination_grader", grader("hallucination", binary_score=grounded))
+        monkeypatch.setattr(rag_graph, "get_answer_grader", grader("answer", binary_score=answers))
+        monkeypatch.setattr(
+            rag_graph, "get_generation_grader", grader("combined", grounded=grounded, answers_question=answers)
+        )
+
+    @property
+    def called(self):
+        return sorted(name for name, _ in self.calls)
+
+
+@pytest.fixture(autouse=True)
+def character_estimate(monkeypatch):
+    monkeypatch.setattr("common.tokens.get_encoder", lambda: None)
+
+
+@pytest.fixture
+def resets(monkeypatch):
+    resets = []
+    monkeypatch.setattr(rag_graph, "emit_reset_event", resets.append)
+    return resets
+
+
+def state(retries=3):
+    return {
+        "question": "¿Quién aprueba las auditorías?",
+        "documents": [Document("El comité aprueba las auditorías.", "a.pdf", "https://a")],
+        "generation": "El comité.",
+        "retry_count_hallucinations": retries,
+    }
+
+
+@pytest.mark.parametrize("mode, graders", [
+    ("concurrent", ["answer", "hallucination"]),
+    ("combined", ["combined"]),
+])
+@pytest.mark.parametrize("grounded, answers, retries, goto, error_message, retries_left, reset", [
+    ("yes", "yes", 3, "printer", "", 3, None),
+    ("yes", "no", 3, "printer", NO_DOCUMENTS_FOR_QUESTION_ERROR, 3, "not_answered"),
+    ("no", "yes", 3, "generate", "", 2, "hallucination"),
+    ("no", "no", 1, "generate", "", 0, "hallucination"),
+    ("no", "yes", 0, "printer", HALLUCINATION_ERROR, 0, "hallucination"),
+])
+def test_verdicts_route_the_answer(
+    monkeypatch, resets, mode, graders, grounded, answers, retries, goto, error_message, retries_left, reset,
+):
+    monkeypatch.setenv("REFLECTION_GRADING", mode)
+    stubs = Graders(monkeypatch, grounded, answers)
+    command = asyncio.run(rag_graph.grade_generation_v_documents_and_question(state(retries)))
+    assert stubs.called == graders
+    assert command.goto == goto
+    assert command.update == {
+        "error": bool(error_message),
+        "retry_count_hallucinations": retries_left,
+        "error_message": error_message,
+    }
+    assert resets == ([reset] if reset else [])
+
+
+def test_graders_get_the_assembled_context(monkeypatch):
+    stubs = Graders(monkeypatch, "yes", "yes")
+    asyncio.run(rag_graph.grade_generation("q", "[1] a.pdf\ntexto", "respuesta", "concurrent"))
+    assert dict(stubs.calls) == {
+        "hallucination": {"documents": "[1] a.pdf\ntexto", "generation": "respuesta"},
+        "answer": {"question": "q", "generation": "respuesta"},
+    }
+
+
+def test_unknown_grading_mode(monkeypatch):
+    Graders(monkeypatch, "yes", "yes")
+    with pytest.raises(ValueError):
+        asyncio.run(rag_graph.grade_generation("q", "context", "answer", "sequential"))
+
+
+def test_rejected_answer_resets_the_custom_stream(monkeypatch):
+    Graders(monkeypatch, "no", "yes")
+    workflow = StateGraph(RagState)
+    workflow.add_node("grade", rag_graph.grade_generation_v_documents_and_question, destinations=("printer", "generate"))
+    workflow.add_node("printer", lambda state: {})
+    workflow.add_node("generate", lambda state: {})
+    workflow.set_entry_point("grade")
+
+    async def stream():
+        return [
+            (mode, chunk)
+            async for mode, chunk in workflow.compile().astream(state(retries=1), stream_mode=["custom", "updates"])
+        ]
+
+    chunks = asyncio.run(stream())
+    assert ("custom", {"event": "reset", "reason": "hallucination"}) in chunks
+    assert ("updates", {"generate": None}) in chunks
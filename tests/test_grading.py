@@ -0,0 +1,138 @@
+import asyncio
+from collections import defaultdict
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from rag_agent import grading
+from rag_agent.document import Document
+from rag_agent.grading import (
+    filter_relevant_documents, grade_concurrently, grade_in_batch, grade_with_scorer, grading_stats,
+)
+from rag_agent.relevance import LexicalScorer, RelevanceScorer
+
+
+def documents(*contents):
+    return [Document(content, f"{i}.pdf", f"https://{i}") for i, content in enumerate(contents)]
+
+
+class FixedScorer(RelevanceScorer):
+
+    def __init__(self, scores):
+        self.scores = np.array(scores)
+
+    async def ascore(self, question, documents):
+        return self.scores
+
+
+def grader(calls, relevant=("yes",)):
+    def grade(inputs):
+        calls.append(inputs["document"])
+        return SimpleNamespace(binary_score="yes" if inputs["document"] in relevant else "no")
+
+    return RunnableLambda(grade)
+
+
+def batch_grader(calls, verdicts):
+    """Batch grader answering ``verdicts``, a list of (index, "yes"/"no")."""
+    def grade(inputs):
+        calls.append(inputs["documents"])
+        return SimpleNamespace(grades=[SimpleNamespace(index=i, binary_score=score) for i, score in verdicts])
+
+    return RunnableLambda(grade)
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    monkeypatch.setattr(grading, "_latencies", defaultdict(list))
+    monkeypatch.setattr(grading, "_graded", defaultdict(lambda: [0, 0]))
+
+
+DOCS = documents("a", "b", "c", "d")
+RELEVANT = ("b", "d")
+
+
+def contents(docs):
+    return [doc.content for doc in docs]
+
+
+def test_concurrent_and_batch_modes_filter_the_same_documents(stats):
+    # Verdicts in another order than the documents
+    batch = batch_grader([], [(3, "yes"), (0, "no"), (1, "yes"), (2, "no")])
+    concurrent = asyncio.run(filter_relevant_documents(grader([], RELEVANT), batch, "q", DOCS, mode="concurrent"))
+    batched = asyncio.run(filter_relevant_documents(grader([], RELEVANT), batch, "q", DOCS, mode="batch"))
+    assert contents(concurrent) == contents(batched) == ["b", "d"]
+
+
+def test_batch_sends_every_document_in_one_call():
+    calls = []
+    asyncio.run(grade_in_batch(batch_grader(calls, [(i, "yes") for i in range(4)]), grader([]), "q", DOCS, 4))
+    assert calls == ["[0] a\n\n[1] b\n\n[2] c\n\n[3] d"]
+
+
+def test_missing_and_out_of_range_verdicts_fall_back_to_one_call_each():
+    calls = []
+    batch = batch_grader([], [(0, "yes"), (7, "yes"), (-1, "yes"), (2, "no")])
+    verdicts = asyncio.run(grade_in_batch(batch, grader(calls, RELEVANT), "q", DOCS, 4))
+    assert verdicts == [True, True, False, True]
+    assert sorted(calls) == ["b", "d"]
+
+
+def test_empty_input_makes_no_calls():
+    calls = []
+    assert asyncio.run(grade_concurrently(grader(calls), "q", [], 4)) == []
+    assert asyncio.run(grade_in_batch(batch_grader(calls, []), grader(calls), "q", [], 4)) == []
+    assert calls == []
+
+
+def test_max_concurrency_is_passed_to_abatch():
+    configs = []
+
+    class RecordingGrader:
+        async def abatch(self, inputs, config=None):
+            configs.append(config)
+            return [SimpleNamespace(binary_score="yes") for _ in inputs]
+
+    assert asyncio.run(grade_concurrently(RecordingGrader(), "q", DOCS, 3)) == [True] * 4
+    assert configs == [{"max_concurrency": 3}]
+
+
+def test_each_mode_records_its_latency_under_its_own_key(stats):
+    batch = batch_grader([], [(i, "yes") for i in range(4)])
+    for mode in ("concurrent", "batch", "concurrent"):
+        asyncio.run(filter_relevant_documents(grader([]), batch, "q", DOCS, mode=mode, index_name="sgc"))
+    asyncio.run(filter_relevant_documents(grader([]), batch, "q", DOCS, mode="batch", index_name="other"))
+    recorded = grading_stats()
+    assert set(recorded) == {"sgc/concurrent", "sgc/batch", "other/batch"}
+    assert (recorded["sgc/concurrent"]["count"], recorded["sgc/batch"]["count"]) == (2, 1)
+    assert recorded["sgc/batch"]["llm_ratio"] == 1.0
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        asyncio.run(filter_relevant_documents(grader([]), grader([]), "q", DOCS, mode="sequential"))
+
+
+def test_lexical_scorer_ranks_covering_documents_first():
+    docs = documents("procedimiento de auditoría interna", "auditoría", "menú del comedor")
+    scores = LexicalScorer().score("¿Cuál es el procedimiento de auditoría?", docs)
+    assert scores[0] > scores[1] > scores[2] == 0
+    assert np.all((scores >= 0) & (scores <= 1))
+
+
+def test_only_borderline_scores_are_escalated():
+    calls = []
+    docs = documents("a", "b", "c", "d")
+    verdicts, escalated = asyncio.run(
+        grade_with_scorer(FixedScorer([0.9, 0.5, 0.6, 0.1]), grader(calls, relevant=("b",)), "q", docs, 0.45, 0.7, 4)
+    )
+    assert verdicts == [True, True, False, False]
+    assert escalated == 2
+    assert sorted(calls) == ["b", "c"]
+
+
+def test_local_mode_needs_a_scorer():
+    with pytest.raises(ValueError):
+        asyncio.run(filter_relevant_documents(grader([]), grader([]), "q", documents("a"), mode="local"))
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from common import http_pool
+from common.http_pool import CountingAsyncTransport, CountingTransport, pool_stats
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(0.05)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def registered(monkeypatch):
+    monkeypatch.setattr(http_pool, "_sync_transports", {})
+    monkeypatch.setattr(http_pool, "_async_transports", {})
+    return http_pool
+
+
+def test_sequential_requests_reuse_the_connection(server, registered):
+    transport = CountingTransport(limits=httpx.Limits(max_connections=4))
+    registered._sync_transports["local"] = transport
+    with httpx.Client(transport=transport) as client:
+        for _ in range(3):
+            assert client.get(f"{server}/").status_code == 200
+        stats = pool_stats()["local (sync)"]
+        assert (stats["requests"], stats["new_connections"], stats["reuse_ratio"]) == (3, 1, 0.667)
+        assert (stats["in_flight"], stats["waits"]) == (0, 0)
+        assert stats["open_connections"] == stats["idle_connections"] == 1
+
+
+def test_requests_beyond_the_pool_size_wait_for_a_connection(server, registered):
+    transport = CountingTransport(limits=httpx.Limits(max_connections=1))
+    registered._sync_transports["local"] = transport
+    with httpx.Client(transport=transport) as client:
+        threads = [threading.Thread(target=client.get, args=(f"{server}/slow",)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    stats = pool_stats()["local (sync)"]
+    assert stats["requests"] == 2
+    assert stats["new_connections"] == 1
+    assert stats["waits"] == 1
+    assert stats["max_wait_ms"] >= 30
+
+
+def test_streamed_responses_hold_the_connection(server, registered):
+    transport = CountingAsyncTransport(limits=httpx.Limits(max_connections=1))
+    registered._async_transports["local"] = transport
+
+    async def requests():
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with client.stream("GET", f"{server}/") as response:
+                # Headers received, the body isn't read yet: the second request must wait for it
+                second = asyncio.create_task(client.get(f"{server}/"))
+                await asyncio.sleep(0.05)
+                await response.aread()
+            await second
+
+    asyncio.run(requests())
+    stats = pool_stats()["local (async)"]
+    assert (stats["requests"], stats["new_connections"], stats["waits"]) == (2, 1, 1)
+    assert stats["reuse_ratio"] == 0.5
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from rag_agent.document import Document
+from rag_agent.vector_stores import bm25_index as bm25_module
+from rag_agent.vector_stores.bm25_index import BM25Index, bm25_tokens
+from rag_agent.vector_stores.hybrid_vector_search import HybridVectorSearch, reciprocal_rank_fusion
+from rag_agent.vector_stores.vector_search_service import VectorSearch
+
+
+def doc(content, filename="a.pdf"):
+    return Document(content, filename, f"https://{filename}")
+
+
+def contents(documents):
+    return [document.content for document in documents]
+
+
+def test_rrf_favours_documents_found_by_both_rankings():
+    a, b, c, d = doc("a"), doc("b"), doc("c"), doc("d")
+    fused = reciprocal_rank_fusion([[a, b, c], [d, c, a]], k=4)
+    assert contents(fused) == ["a", "c", "d", "b"]
+
+
+def test_rrf_keeps_each_chunk_once_and_truncates():
+    fused = reciprocal_rank_fusion([[doc("a"), doc("b")], [doc("a"), doc("c")]], k=2)
+    assert contents(fused) == ["a", "b"]
+    # Same content in different files are different chunks
+    assert len(reciprocal_rank_fusion([[doc("a", "x.pdf")], [doc("a", "y.pdf")]], k=5)) == 2
+
+
+def test_codes_are_indexed_as_one_token():
+    assert "hz5678" in bm25_tokens("Hallazgo HZ-5678 abierto")
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "index.sqlite3"
+
+
+def test_search_ranks_the_exact_identifier_first(path):
+    index = BM25Index(path)
+    index.add_documents({
+        "1": doc("El hallazgo HZ-5678 fue cerrado por auditoría"),
+        "2": doc("Los hallazgos de auditoría se cargan en ClickUp"),
+        "3": doc("Procedimiento de compras"),
+    })
+    assert contents(document for document, _ in index.search("HZ-5678", 2))[0].startswith("El hallazgo HZ-5678")
+    assert index.search("inexistente", 2) == []
+
+
+def test_other_processes_apply_only_the_new_changes(path):
+    writer, reader = BM25Index(path), BM25Index(path)
+    writer.add_documents({"1": doc("política de calidad"), "2": doc("política de compras")})
+    reader.refresh()
+    assert set(reader.documents) == {"1", "2"}
+
+    writer.add_documents({"1": doc("manual de calidad")})
+    writer.remove_documents(["2"])
+    reader.refresh()
+    assert set(reader.documents) == {"1"}
+    assert "politica" not in reader.postings
+    assert reader.total_length == writer.total_length
+    assert reader.last_seq == writer._connection.execute("SELECT MAX(seq) FROM changes").fetchone()[0]
+
+
+def test_reader_behind_the_change_log_reloads(path, monkeypatch):
+    monkeypatch.setattr(bm25_module, "CHANGES_KEPT", 2)
+    writer, reader = BM25Index(path), BM25Index(path)
+    for i in range(5):
+        writer.add_documents({str(i): doc(f"chunk {i}")})
+    reader.refresh()
+    assert set(reader.documents) == {str(i) for i in range(5)}
+
+
+def test_search_refreshes_after_the_interval(path, monkeypatch):
+    writer, reader = BM25Index(path), BM25Index(path)
+    writer.add_documents({"1": doc("instructivo de calibración")})
+    assert reader.search("calibración", 1) == []
+    monkeypatch.setattr(bm25_module, "REFRESH_INTERVAL", 0)
+    assert len(reader.search("calibración", 1)) == 1
+
+
+class StaticVectorSearch(VectorSearch):
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def retrieve(self, question):
+        return self.documents
+
+
+def test_hybrid_search_fuses_dense_and_keyword_results(path):
+    index = BM25Index(path)
+    index.add_documents({"1": doc("hallazgo HZ-5678"), "2": doc("política de calidad")})
+    search = HybridVectorSearch(StaticVectorSearch([doc("política de calidad"), doc("manual")]), index, k=3)
+    assert contents(asyncio.run(search.retrieve("HZ-5678"))) == ["política de calidad", "hallazgo HZ-5678", "manual"]
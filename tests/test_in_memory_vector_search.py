@@ -0,0 +1,97 @@
+import asyncio
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag_agent.document import Document
+from rag_agent.vector_stores.in_memory_vector_search import InMemoryIndex, InMemoryVectorSearch
+
+
+DIMENSION = 64
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, DIMENSION)).astype(np.float32)
+    documents = [Document(f"chunk {i}", f"{i}.pdf", f"https://{i}") for i in range(len(vectors))]
+    return documents, vectors
+
+
+def index_of(quantization, corpus):
+    index = InMemoryIndex(quantization)
+    index.add(*corpus)
+    return index
+
+
+def positions(documents, results):
+    # Document declares no dataclass fields, so every instance compares equal: match by identity
+    ids = {id(doc): i for i, doc in enumerate(documents)}
+    return [ids[id(doc)] for doc, _ in results]
+
+
+def exact_top_k(vectors, query, k):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return list(np.argsort(-(unit @ (query / np.linalg.norm(query))))[:k])
+
+
+def test_float32_top_k_is_exact_and_sorted(corpus):
+    documents, vectors = corpus
+    query = np.random.default_rng(1).normal(size=DIMENSION)
+    results = index_of("none", corpus).search(query, 5)
+    assert positions(documents, results) == exact_top_k(vectors, query, 5)
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+# A random ranking has a recall@10 of 10/300, binary codes of 64 bits are coarse but far above it
+@pytest.mark.parametrize("quantization, min_recall", [("int8", 0.9), ("binary", 0.25)])
+def test_quantized_top_k_recall(corpus, quantization, min_recall):
+    documents, vectors = corpus
+    index = index_of(quantization, corpus)
+    queries = np.random.default_rng(2).normal(size=(20, DIMENSION))
+    recall = np.mean([
+        len(set(positions(documents, index.search(query, 10))) & set(exact_top_k(vectors, query, 10))) / 10
+        for query in queries
+    ])
+    assert recall >= min_recall
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_stored_vectors_find_themselves(corpus, quantization):
+    documents, vectors = corpus
+    index = index_of(quantization, corpus)
+    assert all(index.search(vectors[i], 1)[0][0] is documents[i] for i in range(0, 300, 30))
+
+
+def test_quantization_shrinks_the_matrix(corpus):
+    footprint = {quantization: index_of(quantization, corpus).memory_footprint() for quantization in ("none", "int8", "binary")}
+    assert footprint["none"] == 300 * DIMENSION * 4
+    assert footprint["int8"] == 300 * DIMENSION + 300 * 4
+    assert footprint["binary"] == 300 * DIMENSION // 8
+
+
+def test_k_larger_than_the_index_and_empty_index(corpus):
+    assert InMemoryIndex("int8").search(np.ones(DIMENSION), 3) == []
+    documents, vectors = corpus
+    index = InMemoryIndex("none")
+    index.add(documents[:2], vectors[:2])
+    assert len(index.search(np.ones(DIMENSION), 10)) == 2
+
+
+def test_invalid_inputs(corpus):
+    with pytest.raises(ValueError):
+        InMemoryIndex("float16")
+    index = index_of("none", corpus)
+    with pytest.raises(ValueError):
+        index.add([Document("x", "x.pdf", "https://x")], np.ones((1, DIMENSION + 1)))
+    with pytest.raises(ValueError):
+        index.add([], np.ones((1, DIMENSION)))
+
+
+def test_vector_search_retrieves_added_documents():
+    search = InMemoryVectorSearch("test-in-memory", DeterministicFakeEmbedding(size=DIMENSION), k=1)
+    documents = [Document(text, "a.pdf", "https://a") for text in ("calidad", "auditoría", "compras")]
+    asyncio.run(search.add_documents(documents))
+    assert asyncio.run(search.retrieve("auditoría"))[0] is documents[1]
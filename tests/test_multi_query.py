@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from rag_agent.document import Document
+from rag_agent.multi_query import fuse_rankings, multi_query_retrieve, round_robin_fusion
+
+
+def doc(content):
+    return Document(content, "a.pdf", "https://a")
+
+
+def contents(documents):
+    return [document.content for document in documents]
+
+
+RANKINGS = [[doc("a"), doc("b"), doc("c")], [doc("d"), doc("a")], [doc("e")]]
+
+
+def test_round_robin_interleaves_and_skips_repeats():
+    assert contents(round_robin_fusion(RANKINGS)) == ["a", "d", "e", "b", "c"]
+    assert round_robin_fusion([]) == []
+
+
+def test_rrf_keeps_every_distinct_document():
+    fused = contents(fuse_rankings(RANKINGS, "rrf"))
+    assert fused[0] == "a"
+    assert sorted(fused) == ["a", "b", "c", "d", "e"]
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        fuse_rankings(RANKINGS, "borda")
+
+
+def index(query):
+    # One document per query, plus one shared by every query
+    return [doc(f"for {query}"), doc("shared")]
+
+
+def retriever(calls):
+    async def retrieve(query):
+        calls.append(query)
+        return index(query)
+
+    return retrieve
+
+
+def rewriter(queries):
+    return RunnableLambda(lambda inputs: SimpleNamespace(queries=queries))
+
+
+def test_rewrites_are_retrieved_and_fused():
+    calls = []
+    documents, queries = asyncio.run(multi_query_retrieve(
+        retriever(calls), rewriter(["¿Política de calidad?", "manual de calidad", "objetivos", "alcance"]),
+        "política de calidad", rewrites=2,
+    ))
+    # The rewrite equal to the question is dropped and only ``rewrites`` are used
+    assert queries == ["manual de calidad", "objetivos"]
+    assert calls == ["política de calidad", "manual de calidad", "objetivos"]
+    assert contents(documents)[0] == "shared"
+    assert len(documents) == 4
+
+
+def test_failed_rewriter_falls_back_to_the_question():
+    def fail(inputs):
+        raise RuntimeError("timeout")
+
+    calls = []
+    documents, queries = asyncio.run(multi_query_retrieve(retriever(calls), RunnableLambda(fail), "alcance"))
+    assert queries == []
+    assert calls == ["alcance"]
+    assert contents(documents) == ["for alcance", "shared"]
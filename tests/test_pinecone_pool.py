@@ -0,0 +1,163 @@
+import asyncio
+import weakref
+from collections import defaultdict
+
+import aiohttp
+import pytest
+
+from rag_agent.vector_stores import pinecone_pool
+from rag_agent.vector_stores.pinecone_vector_search import PineconeVectorSearch
+
+
+class FakeIndex:
+    def __init__(self, host):
+        self.host = host
+        self.queries = []
+        self.healthy = True
+        self.failures = []  # Exceptions raised by the next queries
+        self.closed = False
+
+    async def describe_index_stats(self):
+        if not self.healthy:
+            raise aiohttp.ClientConnectionError("connection reset")
+        return {"total_vector_count": 1}
+
+    async def query(self, **kwargs):
+        self.queries.append(kwargs)
+        if self.failures:
+            raise self.failures.pop(0)
+        return {"matches": [{"metadata": {"content": "chunk", "filename": "a.pdf", "source": "https://a"}}]}
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePinecone:
+    """Stands in for both the sync control plane client and the async data plane client."""
+
+    def __init__(self):
+        self.described = []
+        self.indexes = []
+
+    def __call__(self, api_key):
+        return self
+
+    def describe_index(self, name):
+        self.described.append(name)
+        return type("Description", (), {"host": f"{name}.pinecone.io"})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def IndexAsyncio(self, host, connection_pool_maxsize):
+        index = FakeIndex(host)
+        self.indexes.append(index)
+        return index
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Embeddings:
+    async def aembed_query(self, question):
+        return [0.1, 0.2]
+
+
+@pytest.fixture
+def pinecone(monkeypatch):
+    fake = FakePinecone()
+    monkeypatch.setenv("PINECONE_API_KEY", "key")
+    monkeypatch.setattr(pinecone_pool, "Pinecone", fake)
+    monkeypatch.setattr(pinecone_pool, "PineconeAsyncio", fake)
+    monkeypatch.setattr(pinecone_pool, "_handles", weakref.WeakKeyDictionary())
+    monkeypatch.setattr(pinecone_pool, "_locks", weakref.WeakKeyDictionary())
+    monkeypatch.setattr(pinecone_pool, "_stats", defaultdict(pinecone_pool._stats.default_factory))
+    pinecone_pool.get_client.cache_clear()
+    pinecone_pool.get_index_host.cache_clear()
+    yield fake
+    pinecone_pool.get_client.cache_clear()
+    pinecone_pool.get_index_host.cache_clear()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(pinecone_pool.time, "monotonic", clock)
+    return clock
+
+
+def test_second_retrieval_reuses_the_handle(pinecone):
+    search = PineconeVectorSearch("sgc", Embeddings(), k=3)
+
+    async def retrieve_twice():
+        first = await search.retrieve("q")
+        second = await search.retrieve("q", principals=("anyone",))
+        return first, second
+
+    first, second = asyncio.run(retrieve_twice())
+    assert [document.content for document in first + second] == ["chunk", "chunk"]
+    assert pinecone.described == ["sgc"]
+    [index] = pinecone.indexes
+    assert index.host == "sgc.pinecone.io"
+    assert [query["top_k"] for query in index.queries] == [3, 3]
+    assert "filter" not in index.queries[0] and "filter" in index.queries[1]
+    stats = pinecone_pool.pinecone_stats()["sgc"]
+    assert (stats["handles_created"], stats["handles_reused"], stats["reuse_ratio"]) == (1, 1, 0.5)
+    assert stats["health_checks"] == 0
+
+
+def test_idle_handle_failing_its_health_check_is_rebuilt(pinecone, clock):
+    async def retrieve_after_idle():
+        await pinecone_pool.query("sgc", vector=[0.1])
+        clock.now += pinecone_pool.HEALTH_CHECK_INTERVAL + 1
+        pinecone.indexes[0].healthy = False
+        await pinecone_pool.query("sgc", vector=[0.1])
+
+    asyncio.run(retrieve_after_idle())
+    broken, rebuilt = pinecone.indexes
+    assert broken.closed and not rebuilt.closed
+    assert len(rebuilt.queries) == 1
+    # The host is resolved once, only the handle is rebuilt
+    assert pinecone.described == ["sgc"]
+    stats = pinecone_pool.pinecone_stats()["sgc"]
+    assert (stats["health_checks"], stats["health_check_failures"]) == (1, 1)
+    assert (stats["handles_created"], stats["handles_reused"], stats["reuse_ratio"]) == (2, 0, 0.0)
+
+
+def test_idle_healthy_handle_is_reused(pinecone, clock):
+    async def retrieve_after_idle():
+        await pinecone_pool.query("sgc", vector=[0.1])
+        clock.now += pinecone_pool.HEALTH_CHECK_INTERVAL + 1
+        await pinecone_pool.query("sgc", vector=[0.1])
+
+    asyncio.run(retrieve_after_idle())
+    assert len(pinecone.indexes) == 1
+    stats = pinecone_pool.pinecone_stats()["sgc"]
+    assert (stats["health_checks"], stats["health_check_failures"], stats["handles_reused"]) == (1, 0, 1)
+
+
+def test_broken_connection_reconnects_once(pinecone):
+    async def query():
+        index = await pinecone_pool.get_async_index("sgc")
+        index.failures.append(aiohttp.ServerDisconnectedError())
+        return await pinecone_pool.query("sgc", vector=[0.1])
+
+    assert asyncio.run(query())["matches"]
+    broken, rebuilt = pinecone.indexes
+    assert broken.closed and len(rebuilt.queries) == 1
+    assert pinecone_pool.pinecone_stats()["sgc"]["query_failures"] == 1
+
+
+def test_handles_are_per_event_loop(pinecone):
+    for _ in range(2):
+        asyncio.run(pinecone_pool.query("sgc", vector=[0.1]))
+    assert len(pinecone.indexes) == 2
+    assert pinecone.described == ["sgc"]
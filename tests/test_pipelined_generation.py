@@ -0,0 +1,115 @@
+import asyncio
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from rag_agent import grading
+from rag_agent.context import assemble_context
+from rag_agent.document import Document
+from rag_agent.grading import GradingRun, filter_relevant_documents, grading_stats
+from rag_agent.pipelined_generation import pipelined_generate
+
+
+def doc(content):
+    return Document(content, f"{content}.pdf", f"https://{content}")
+
+
+DOCUMENTS = [doc(name) for name in ("a", "b", "c", "d", "e")]
+
+
+def grader(relevant):
+    async def grade(documents):
+        await asyncio.sleep(0)
+        return [document for document in documents if document.content in relevant]
+
+    return grade
+
+
+class Generator:
+    def __init__(self):
+        self.contexts = []
+        self.cancelled = 0
+
+    async def __call__(self, context):
+        self.contexts.append([document.content for document in context.documents])
+        try:
+            await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return "answer from " + ",".join(self.contexts[-1])
+
+
+def run(relevant, restart_threshold=0.6, early_chunks=3):
+    generate, restarts = Generator(), []
+    result = asyncio.run(pipelined_generate(
+        grader(relevant), assemble_context, generate, DOCUMENTS,
+        early_chunks=early_chunks, restart_threshold=restart_threshold, on_restart=lambda: restarts.append(True),
+    ))
+    return result, generate, restarts
+
+
+@pytest.fixture(autouse=True)
+def character_estimate(monkeypatch):
+    monkeypatch.setattr("common.tokens.get_encoder", lambda: None)
+
+
+def test_early_answer_is_kept_when_the_context_barely_changes():
+    result, generate, restarts = run({"a", "b", "c", "d"}, restart_threshold=0.7)
+    assert generate.contexts == [["a", "b", "c"]]
+    assert result.generation == "answer from a,b,c"
+    assert not result.restarted and restarts == []
+    assert [document.content for document in result.relevant] == ["a", "b", "c", "d"]
+
+
+def test_changed_context_restarts_after_a_reset():
+    result, generate, restarts = run({"a", "d", "e"})
+    assert generate.contexts == [["a"], ["a", "d", "e"]]
+    assert generate.cancelled == 1
+    assert result.restarted and restarts == [True]
+    assert result.generation == "answer from a,d,e"
+
+
+def test_late_relevant_documents_only_generate_once():
+    result, generate, restarts = run({"d", "e"})
+    assert generate.contexts == [["d", "e"]]
+    assert not result.restarted and restarts == []
+
+
+def test_nothing_relevant_generates_nothing():
+    result, generate, _ = run(set())
+    assert generate.contexts == []
+    assert (result.relevant, result.context, result.generation) == ([], None, "")
+
+
+def test_grading_failure_cancels_the_generation():
+    async def grade(documents):
+        if documents[0].content == "a":
+            return documents
+        await asyncio.sleep(0.001)
+        raise RuntimeError("grader down")
+
+    generate = Generator()
+    with pytest.raises(RuntimeError):
+        asyncio.run(pipelined_generate(grade, assemble_context, generate, DOCUMENTS))
+    assert generate.cancelled == 1
+
+
+def test_split_grading_is_recorded_once(monkeypatch):
+    monkeypatch.setattr(grading, "_latencies", defaultdict(list))
+    monkeypatch.setattr(grading, "_graded", defaultdict(lambda: [0, 0]))
+    llm = RunnableLambda(lambda inputs: SimpleNamespace(binary_score="yes"))
+    run = GradingRun("sgc", "concurrent", parts=2)
+
+    async def grade_parts():
+        await asyncio.gather(*(
+            filter_relevant_documents(llm, llm, "q", part, index_name="sgc", run=run)
+            for part in (DOCUMENTS[:3], DOCUMENTS[3:])
+        ))
+
+    asyncio.run(grade_parts())
+    stats = grading_stats()["sgc/concurrent"]
+    assert (stats["count"], stats["llm_ratio"]) == (1, 1.0)
+    assert grading._graded[("sgc", "concurrent")] == [5, 5]
@@ -0,0 +1,26 @@
+from rag_agent.principals import ACL_METADATA_FIELD, azure_filter, pinecone_filter, principal, user_principals
+
+
+def test_principal():
+    assert principal("anyone") == "anyone"
+    assert principal("group", "Calidad@Empresa.com") == "group:calidad@empresa.com"
+
+
+def test_user_principals_are_sorted_and_lowercase():
+    assert user_principals("Ana@Empresa.com", ["calidad@empresa.com"]) == (
+        "anyone", "domain:empresa.com", "group:calidad@empresa.com", "user:ana@empresa.com",
+    )
+    assert user_principals("") == ("anyone",)
+
+
+def test_pinecone_filter_lets_unlabelled_chunks_through():
+    assert pinecone_filter(("anyone", "user:ana@empresa.com")) == {"$or": [
+        {ACL_METADATA_FIELD: {"$in": ["anyone", "user:ana@empresa.com"]}},
+        {ACL_METADATA_FIELD: {"$exists": False}},
+    ]}
+
+
+def test_azure_filter_escapes_quotes_and_lets_unlabelled_chunks_through():
+    expression = azure_filter(("anyone", "user:o'neil@empresa.com"))
+    assert "search.in(p, 'anyone,user:o''neil@empresa.com', ',')" in expression
+    assert expression.endswith(f"or not {ACL_METADATA_FIELD}/any())")
@@ -0,0 +1,44 @@
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from common.prompts import PROMPT_VERSIONS, PROMPTS, get_prompt, load_prompts
+
+
+def test_every_prompt_is_pinned_and_compiles():
+    assert set(PROMPT_VERSIONS) == set(PROMPTS)
+    assert set(load_prompts()) == set(PROMPTS)
+
+
+@pytest.mark.parametrize("name, variables", [
+    ("supervisor/route", {"messages"}),
+    ("supervisor/route_rag", {"messages"}),
+    ("supervisor/route_clickup", {"messages"}),
+    ("supervisor/help", {"capabilities", "howto", "user_memories", "time", "messages"}),
+    ("supervisor/summary", {"summary", "conversation"}),
+    ("clickup/qms", {"LIST_ID", "CUSTOM_FIELDS_PROMPT", "CLICKUP_USERS", "FORM", "messages"}),
+    ("clickup/hrm", {"LIST_ID", "CUSTOM_FIELDS_PROMPT", "CLICKUP_USERS", "FORM", "messages"}),
+])
+def test_prompt_variables(name, variables):
+    prompt = get_prompt(name)
+    assert set(prompt.input_variables) | set(prompt.optional_variables) == variables
+
+
+def test_routing_prompt_puts_the_conversation_after_the_system_message():
+    messages = get_prompt("supervisor/route").format_messages(messages=[HumanMessage("hola")])
+    assert isinstance(messages[0], SystemMessage)
+    assert "RAG_AGENT" in messages[0].content
+    assert messages[1:] == [HumanMessage("hola")]
+
+
+def test_partial_values_with_braces_are_not_parsed():
+    prompt = get_prompt("clickup/qms").partial(
+        LIST_ID=1, CUSTOM_FIELDS_PROMPT='{"id": "x"}', CLICKUP_USERS="[]", FORM="{}"
+    )
+    assert '{"id": "x"}' in prompt.format_messages(messages=[])[0].content
+
+
+def test_unknown_prompt_or_version():
+    with pytest.raises(ValueError):
+        get_prompt("supervisor/unknown")
+    with pytest.raises(ValueError):
+        get_prompt("supervisor/route", "v0")
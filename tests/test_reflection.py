@@ -0,0 +1,184 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import END
+
+from rag_agent import graph as rag_graph
+from rag_agent.document import Document
+from rag_agent.errors import HALLUCINATION_WARNING
+from rag_agent.reflection_graph import graph as reflection_graph
+from rag_agent.retrieval_cache import RetrievalCache
+
+
+DOCUMENT = Document("El comité aprueba las auditorías.", "a.pdf", "https://a")
+
+
+@pytest.fixture(autouse=True)
+def character_estimate(monkeypatch):
+    monkeypatch.setattr("common.tokens.get_encoder", lambda: None)
+
+
+def stub(calls, name, **output):
+    def run(inputs):
+        calls.append(name)
+        return SimpleNamespace(**output) if output else "El comité."
+
+    return lambda *args: RunnableLambda(run)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Stubbed retriever, graders and generation; the list records the LLM calls in order."""
+    calls = []
+    retriever = SimpleNamespace(supports_acl_filter=False)
+
+    async def retrieve(question):
+        return [DOCUMENT]
+
+    retriever.retrieve = retrieve
+    monkeypatch.setattr(rag_graph, "get_retriever", lambda *args: retriever)
+    monkeypatch.setattr(rag_graph, "retrieval_cache", RetrievalCache())
+    monkeypatch.setattr(rag_graph, "get_retrieval_grader", stub(calls, "relevance", binary_score="yes"))
+    monkeypatch.setattr(rag_graph, "get_batch_retrieval_grader", stub(calls, "batch"))
+    monkeypatch.setattr(rag_graph, "get_rag_chain", stub(calls, "generate"))
+    grounded(monkeypatch, calls, "yes")
+    monkeypatch.delenv("RAG_AUTH_REQUIRED", raising=False)
+    return calls
+
+
+def grounded(monkeypatch, calls, verdict):
+    monkeypatch.setattr(rag_graph, "get_hallucination_grader", stub(calls, "hallucination", binary_score=verdict))
+    monkeypatch.setattr(rag_graph, "get_answer_grader", stub(calls, "answer", binary_score="yes"))
+    monkeypatch.setattr(
+        rag_graph, "get_generation_grader", stub(calls, "combined", grounded=verdict, answers_question="yes")
+    )
+
+
+class Runs:
+    def __init__(self, error=None):
+        self.created = []
+        self.error = error
+
+    async def create(self, **kwargs):
+        if self.error is not None:
+            raise self.error
+        self.created.append(kwargs)
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    runs = Runs()
+    monkeypatch.setattr(rag_graph, "get_client", lambda: SimpleNamespace(runs=runs))
+    return runs
+
+
+@pytest.fixture
+def local_reflections(monkeypatch):
+    reflections = []
+
+    async def reflect_locally(reflection_input):
+        reflections.append(reflection_input)
+
+    monkeypatch.setattr(rag_graph, "_reflect_locally", reflect_locally)
+    return reflections
+
+
+def answered(**state):
+    return {
+        "question": "¿Quién aprueba las auditorías?", "documents": [DOCUMENT], "generation": "El comité.",
+        "reflection": True, "error": False, **state,
+    }
+
+
+@pytest.mark.parametrize("mode, state, route", [
+    ("async", answered(), "schedule_reflection"),
+    ("async", answered(error=True), END),
+    ("async", answered(reflection=False), END),
+    ("blocking", answered(), END),
+])
+def test_reflection_scheduler(monkeypatch, mode, state, route):
+    monkeypatch.setenv("REFLECTION_MODE", mode)
+    assert asyncio.run(rag_graph.reflection_scheduler(state)) == route
+
+
+def schedule(state, config):
+    async def run():
+        await rag_graph.schedule_reflection(state, config)
+        await asyncio.gather(*rag_graph._reflection_tasks)
+
+    asyncio.run(run())
+
+
+def test_reflection_is_enqueued_on_the_thread(monkeypatch, runs, local_reflections):
+    monkeypatch.setenv("REFLECTION_GRADING", "combined")
+    schedule(answered(), {"configurable": {"thread_id": "t1"}})
+    [run] = runs.created
+    assert (run["thread_id"], run["multitask_strategy"]) == ("t1", "enqueue")
+    assert run["assistant_id"] == rag_graph.REFLECTION_ASSISTANT_ID
+    assert run["config"] == {"configurable": {"reflection_grading": "combined"}}
+    assert run["input"]["generation"] == "El comité."
+    assert "El comité aprueba las auditorías." in run["input"]["context"]
+    assert local_reflections == []
+
+
+def test_failed_enqueue_falls_back_to_a_local_reflection(runs, local_reflections, caplog):
+    runs.error = ConnectionError("LangGraph server unreachable")
+    schedule(answered(), {"configurable": {"thread_id": "t1"}})
+    [reflection_input] = local_reflections
+    assert reflection_input["question"] == "¿Quién aprueba las auditorías?"
+    assert "reflecting locally" in caplog.text
+
+
+def test_without_a_thread_the_reflection_runs_locally(runs, local_reflections):
+    schedule(answered(), {"configurable": {}})
+    assert runs.created == [] and len(local_reflections) == 1
+
+
+@pytest.mark.parametrize("mode", ["concurrent", "combined"])
+@pytest.mark.parametrize("verdict, warned", [("yes", False), ("no", True)])
+def test_reflect_records_the_verdict_and_warns_on_hallucinations(monkeypatch, calls, mode, verdict, warned):
+    monkeypatch.setenv("REFLECTION_GRADING", mode)
+    grounded(monkeypatch, calls, verdict)
+    result = asyncio.run(reflection_graph.ainvoke({
+        "messages": [], "question": "q", "context": "[1] a.pdf\ntexto", "generation": "respuesta",
+    }))
+    [verdict_record] = result["reflection_verdicts"]
+    assert (verdict_record["question"], verdict_record["grounded"], verdict_record["answers_question"]) == ("q", verdict, "yes")
+    assert [message.content for message in result["messages"]] == ([HALLUCINATION_WARNING] if warned else [])
+
+
+def run_agent(mode, thread_id=None):
+    config = {"configurable": {"reflection_mode": mode, "thread_id": thread_id}}
+    state = {
+        "messages": [HumanMessage("¿Quién aprueba las auditorías?")], "reflection": True,
+        "retry_count_grade_documents": 1, "retry_count_hallucinations": 3,
+    }
+
+    async def stream():
+        nodes = []
+        async for update in rag_graph.graph.astream(state, config, stream_mode="updates"):
+            nodes.extend(update)
+        return nodes
+
+    return asyncio.run(stream())
+
+
+def test_blocking_mode_grades_before_answering(calls, runs):
+    nodes = run_agent("blocking", thread_id="t1")
+    assert nodes == [
+        "retrieve", "grade_documents", "decide_to_generate", "generate",
+        "grade_generation_v_documents_and_question", "printer",
+    ]
+    assert calls[:2] == ["relevance", "generate"]
+    assert sorted(calls[2:]) == ["answer", "hallucination"]
+    assert runs.created == []
+
+
+def test_async_mode_answers_then_schedules_the_reflection(calls, runs):
+    nodes = run_agent("async", thread_id="t1")
+    assert nodes == ["retrieve", "grade_documents", "decide_to_generate", "generate", "printer", "schedule_reflection"]
+    assert calls == ["relevance", "generate"]
+    assert len(runs.created) == 1
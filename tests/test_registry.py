@@ -0,0 +1,34 @@
+import asyncio
+import json
+
+import pytest
+
+from supervisor import registry
+
+
+@pytest.fixture(autouse=True)
+def fake_agents(monkeypatch):
+    monkeypatch.setattr(registry, "AGENTS", {"JSON_AGENT": "json:dumps"})
+    monkeypatch.setattr(registry, "_agents", {})
+
+
+def test_get_agent_imports_the_registered_attribute():
+    assert registry.get_agent("JSON_AGENT") is json.dumps
+
+
+def test_unknown_agent():
+    with pytest.raises(ValueError):
+        registry.get_agent("NOPE")
+
+
+def test_aget_agent_only_uses_a_thread_for_the_first_import(monkeypatch):
+    calls = []
+
+    async def to_thread(function, *args):
+        calls.append(args)
+        return function(*args)
+
+    monkeypatch.setattr(registry.asyncio, "to_thread", to_thread)
+    assert asyncio.run(registry.aget_agent("JSON_AGENT")) is json.dumps
+    assert asyncio.run(registry.aget_agent("JSON_AGENT")) is json.dumps
+    assert calls == [("JSON_AGENT",)]
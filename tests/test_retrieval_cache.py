@@ -0,0 +1,91 @@
+import pytest
+
+from rag_agent import retrieval_cache as cache_module
+from rag_agent.document import Document
+from rag_agent.retrieval_cache import RetrievalCache, mark_index_ingested, normalize_question
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    monkeypatch.setattr(cache_module, "INDEX_VERSIONS_DIR", tmp_path)
+    monkeypatch.setattr(cache_module, "RETRIEVAL_CACHE_TTL", 600)
+    monkeypatch.setattr(cache_module, "INDEX_VERSION_CHECK_INTERVAL", 10)
+    return clock
+
+
+DOCUMENTS = [Document("política de calidad", "a.pdf", "https://a")]
+SETTINGS = ("vector", 4)
+
+
+def served(documents):
+    # Document declares no dataclass fields, so every instance compares equal: compare by identity
+    return documents is not None and [id(doc) for doc in documents] == [id(doc) for doc in DOCUMENTS]
+
+
+def test_questions_are_normalized():
+    assert normalize_question("¿Cuál es la  Política de calidad?") == normalize_question("cual es la politica de calidad")
+
+
+def test_hits_until_the_ttl_expires(clock):
+    cache = RetrievalCache()
+    cache.put("pinecone", "sgc", SETTINGS, "¿Política de calidad?", DOCUMENTS)
+    assert served(cache.get("pinecone", "sgc", SETTINGS, "política de calidad"))
+    assert cache.get("pinecone", "sgc", ("hybrid", 4), "política de calidad") is None
+    clock.now += 601
+    assert cache.get("pinecone", "sgc", SETTINGS, "política de calidad") is None
+    assert cache.cache_stats()["expired"] == 1
+    assert cache.cache_stats()["entries"] == 0
+
+
+def test_ingestion_invalidates_the_index_after_the_check_interval(clock):
+    cache = RetrievalCache()
+    cache.put("pinecone", "sgc", SETTINGS, "q", DOCUMENTS)
+    cache.put("pinecone", "other", SETTINGS, "q", DOCUMENTS)
+    mark_index_ingested("pinecone", "sgc")
+    # The stamp isn't read again yet: served, and counted as stale once the new version is seen
+    assert served(cache.get("pinecone", "sgc", SETTINGS, "q"))
+    clock.now += 11
+    assert cache.get("pinecone", "sgc", SETTINGS, "q") is None
+    assert served(cache.get("pinecone", "other", SETTINGS, "q"))
+    stats = cache.cache_stats()
+    assert stats["invalidated"] == 1
+    assert stats["stale_serves"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    cache = RetrievalCache(max_entries=2)
+    for question in ("a", "b"):
+        cache.put("pinecone", "sgc", SETTINGS, question, DOCUMENTS)
+    cache.get("pinecone", "sgc", SETTINGS, "a")
+    cache.put("pinecone", "sgc", SETTINGS, "c", DOCUMENTS)
+    assert cache.get("pinecone", "sgc", SETTINGS, "b") is None
+    assert served(cache.get("pinecone", "sgc", SETTINGS, "a"))
+    assert cache.cache_stats()["entries"] == 2
+
+
+def test_memory_is_released_with_the_entries(clock):
+    cache = RetrievalCache(max_entries=1)
+    cache.put("pinecone", "sgc", SETTINGS, "a", DOCUMENTS)
+    one_entry = cache.memory_bytes
+    cache.put("pinecone", "sgc", SETTINGS, "a", DOCUMENTS)
+    cache.put("pinecone", "sgc", SETTINGS, "b", DOCUMENTS)
+    assert cache.memory_bytes == one_entry > 0
+
+
+def test_disabled_and_uncached_providers(clock, monkeypatch):
+    cache = RetrievalCache()
+    cache.put("in_memory", "sgc", SETTINGS, "q", DOCUMENTS)
+    assert cache.get("in_memory", "sgc", SETTINGS, "q") is None
+    monkeypatch.setattr(cache_module, "RETRIEVAL_CACHE_TTL", 0)
+    cache.put("pinecone", "sgc", SETTINGS, "q", DOCUMENTS)
+    assert cache.cache_stats()["entries"] == 0
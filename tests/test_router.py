@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from supervisor.config import ChatConfigurable, parse_bool
+from supervisor.router import LocalRouter
+from supervisor.transactions import awaits_user, cancels_transaction, starts_transaction, transaction_update
+
+
+MEMBERS = ["SQL_AGENT", "CLICKUP_AGENT", "RAG_AGENT", "HELP_AGENT"]
+
+
+@pytest.fixture
+def router():
+    # No examples: only the keyword stage can decide
+    return LocalRouter(MEMBERS, DeterministicFakeEmbedding(size=8), examples=[])
+
+
+@pytest.mark.parametrize("text, member", [
+    ("Quiero crear un nuevo hallazgo", "CLICKUP_AGENT"),
+    ("¿Cuántos hallazgos hay sin cerrar?", "SQL_AGENT"),
+    ("¿Cuál es el procedimiento de auditoría interna?", "RAG_AGENT"),
+    ("¿Qué podés hacer?", "HELP_AGENT"),
+])
+def test_keyword_rules_pick_the_member(router, text, member):
+    scores = router.keyword_scores(text)
+    assert MEMBERS[int(scores.argmax())] == member
+
+
+def test_two_keyword_hits_skip_the_llm(router):
+    decision = asyncio.run(router.route("¿Cuántos hallazgos están sin cerrar?", 0.9))
+    assert decision.next == "SQL_AGENT"
+    assert decision.source == "keywords"
+
+
+def test_unmatched_message_falls_back_to_the_llm(router):
+    decision = asyncio.run(router.route("hola", 0.8))
+    assert decision.next is None
+    assert decision.source == "llm"
+
+
+def test_route_target():
+    router = LocalRouter(MEMBERS, DeterministicFakeEmbedding(size=8), examples=[])
+    assert router.route_target("RAG_AGENT", "política de Freshworks") == "Freshwork_Document_Retriever"
+    assert router.route_target("RAG_AGENT", "política de calidad") == "QMS_Document_Retriever"
+    assert router.route_target("CLICKUP_AGENT", "cargar un perfil para una búsqueda laboral") == "HRM_AGENT"
+    assert router.route_target("CLICKUP_AGENT", "hola") is None
+
+
+def test_transaction_rules():
+    assert starts_transaction("Creame una tarea nueva")
+    assert not starts_transaction("¿Cuál es el estado de la tarea HZ-12?")
+
+
+@pytest.mark.parametrize("text", ["Cancelá, olvidalo", "cancelar", "Olvídalo", "No, dejalo", "  ¡Cancelala!", "salir"])
+def test_explicit_cancel_phrasings(text):
+    assert cancels_transaction(text)
+
+
+@pytest.mark.parametrize("text", [
+    "El responsable es Juan",
+    "deja la prioridad en alta",
+    "no importa la fecha",
+    "otra cosa: agregá a María como observadora",
+    "salir de la planta es parte del proceso",
+    "El motivo es que el proveedor quiere cancelar el pedido",
+])
+def test_field_answers_dont_cancel(text):
+    assert not cancels_transaction(text)
+
+
+def clickup_state(text, **state):
+    return {"messages": [HumanMessage(text)], **state}
+
+
+def test_transaction_opens_when_the_agent_asks_for_fields():
+    update = transaction_update(clickup_state("Quiero cargar un hallazgo"), [AIMessage("¿Quién es el responsable?")])
+    assert update == {"transaction_open": True, "transaction_turns": 1}
+
+
+def test_questions_outside_a_create_or_update_flow_dont_open_it():
+    update = transaction_update(clickup_state("¿Qué tareas tengo?"), [AIMessage("¿Querés ver las cerradas también?")])
+    assert update["transaction_open"] is False
+
+
+def test_refused_or_answered_requests_dont_open_it():
+    update = transaction_update(clickup_state("Quiero cargar un hallazgo"), [AIMessage("No puedo crear hallazgos en esa lista.")])
+    assert update["transaction_open"] is False
+
+
+def test_transaction_closes_when_the_task_is_created():
+    state = clickup_state("Sí, confirmo", transaction_open=True, transaction_turns=2)
+    new_messages = [
+        AIMessage("", tool_calls=[{"name": "create_task", "args": {}, "id": "1"}]),
+        ToolMessage("ok", name="create_task", tool_call_id="1"),
+        AIMessage("Listo, ¿algo más?"),
+    ]
+    assert transaction_update(state, new_messages) == {"transaction_open": False, "transaction_turns": 0}
+
+
+def test_open_transaction_counts_turns():
+    state = clickup_state("Juan", transaction_open=True, transaction_turns=2)
+    assert transaction_update(state, [AIMessage("¿Confirmás?")]) == {"transaction_open": True, "transaction_turns": 3}
+
+
+def test_tool_calls_dont_await_the_user():
+    assert not awaits_user([AIMessage("¿?", tool_calls=[{"name": "get_task", "args": {}, "id": "1"}])])
+    assert not awaits_user([])
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("false", False), ("0", False), ("no", False), ("true", True), ("1", True), (" True ", True), (False, False), (True, True),
+])
+def test_parse_bool(value, expected):
+    assert parse_bool(value) is expected
+
+
+def test_configurable_booleans_from_the_environment(monkeypatch):
+    monkeypatch.setenv("LOCAL_ROUTER", "false")
+    monkeypatch.setenv("RAG_REFLECTION", "true")
+    configurable = ChatConfigurable.from_context()
+    assert configurable.local_router is False
+    assert configurable.rag_reflection is True
+
+
+def test_unset_values_keep_the_defaults(monkeypatch):
+    monkeypatch.delenv("LOCAL_ROUTER", raising=False)
+    monkeypatch.setenv("CONTEXT_KEEP_TURNS", "")
+    configurable = ChatConfigurable.from_context()
+    assert configurable.local_router is True
+    assert configurable.context_keep_turns == 6
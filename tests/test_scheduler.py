@@ -0,0 +1,128 @@
+import asyncio
+
+import httpx
+import pytest
+
+from common import scheduler as scheduler_module
+from common.scheduler import (
+    BACKGROUND, BATCH, INTERACTIVE, DeploymentLimiter, Quota, RateLimitRetryTransport, SyncRateLimitRetryTransport, TokenBucket,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "BACKOFF_BASE", 0.0)
+
+
+def test_token_bucket_refills_up_to_its_capacity(clock):
+    bucket = TokenBucket(capacity=60, per_minute=60)
+    bucket.debit(90)
+    assert not bucket.has(1)
+    clock.now += 31
+    assert bucket.has(1)
+    clock.now += 3600
+    bucket.refill()
+    assert bucket.tokens == 60
+
+
+def test_background_classes_leave_a_reserve(clock):
+    limiter = DeploymentLimiter("gpt", Quota(rpm=100, tpm=100000))
+    limiter.requests.debit(60)  # 40 requests left
+    assert not limiter.acquire(BATCH, blocking=False)  # needs 1 + 50
+    assert limiter.acquire(BACKGROUND, blocking=False)  # needs 1 + 25
+    assert limiter.acquire(INTERACTIVE, blocking=False)
+    limiter.record_usage(80000)  # 20% of the tokens left
+    assert not limiter.acquire(BACKGROUND, blocking=False)
+    assert limiter.acquire(INTERACTIVE, blocking=False)
+
+
+def test_requests_are_admitted_in_priority_order(clock):
+    limiter = DeploymentLimiter("gpt", Quota(rpm=100, tpm=100000))
+    background = limiter._enqueue(BACKGROUND)
+    interactive = limiter._enqueue(INTERACTIVE)
+    assert not limiter._try_admit(background)
+    assert limiter._try_admit(interactive)
+    assert limiter._try_admit(background)
+
+
+def test_cooldown_blocks_every_class(clock):
+    limiter = DeploymentLimiter("gpt", Quota(rpm=100, tpm=100000))
+    limiter.penalize(5)
+    assert not limiter.acquire(INTERACTIVE, blocking=False)
+    clock.now += 6
+    assert limiter.acquire(INTERACTIVE, blocking=False)
+    assert limiter.stats["rate_limited"] == 1
+
+
+def responses(*statuses):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(statuses[len(calls) - 1], headers={"retry-after-ms": "0"})
+
+    return calls, handler
+
+
+URL = "https://x.openai.azure.com/openai/deployments/test-deployment/chat/completions"
+
+
+def test_429_is_retried_and_pauses_the_deployment():
+    calls, handler = responses(429, 200)
+    transport = RateLimitRetryTransport(httpx.MockTransport(handler))
+    response = asyncio.run(httpx.AsyncClient(transport=transport).post(URL, json={}))
+    assert response.status_code == 200
+    assert len(calls) == 2
+    assert scheduler_module.scheduler.get_limiter("test-deployment").stats["rate_limited"] >= 1
+
+
+def test_server_errors_are_retried_without_pausing_the_deployment():
+    calls, handler = responses(503, 200)
+    limiter = scheduler_module.scheduler.get_limiter("test-deployment")
+    rate_limited = limiter.stats["rate_limited"]
+    response = httpx.Client(transport=SyncRateLimitRetryTransport(httpx.MockTransport(handler))).post(URL, json={})
+    assert response.status_code == 200
+    assert limiter.stats["rate_limited"] == rate_limited
+
+
+def test_retries_are_bounded():
+    calls, handler = responses(*[429] * 10)
+    transport = SyncRateLimitRetryTransport(httpx.MockTransport(handler), max_retries=2)
+    assert httpx.Client(transport=transport).post(URL, json={}).status_code == 429
+    assert len(calls) == 3
+
+
+def test_client_errors_are_not_retried():
+    calls, handler = responses(400)
+    transport = SyncRateLimitRetryTransport(httpx.MockTransport(handler))
+    assert httpx.Client(transport=transport).post(URL, json={}).status_code == 400
+    assert len(calls) == 1
+
+
+def test_connection_errors_are_retried():
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) == 1:
+            raise httpx.ConnectError("refused")
+        return httpx.Response(200)
+
+    transport = SyncRateLimitRetryTransport(httpx.MockTransport(handler))
+    assert httpx.Client(transport=transport).post(URL, json={}).status_code == 200
+    assert len(attempts) == 2
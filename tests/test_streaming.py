@@ -0,0 +1,40 @@
+import asyncio
+
+from langgraph.graph import StateGraph
+from typing_extensions import TypedDict
+
+from common.streaming import ANSWER_TAG, NOSTREAM_TAG, FirstTokenTimer, emit_final_event, emit_reset_event, is_answer_run
+
+
+def test_is_answer_run():
+    assert is_answer_run([ANSWER_TAG])
+    assert not is_answer_run([ANSWER_TAG, NOSTREAM_TAG])
+    assert not is_answer_run(None)
+
+
+def test_first_token_timer_ignores_internal_runs():
+    timer = FirstTokenTimer(started_at=0.0)
+    asyncio.run(timer.on_llm_new_token("x", tags=[NOSTREAM_TAG]))
+    assert timer.ttft_ms is None
+    asyncio.run(timer.on_llm_new_token("x", tags=[ANSWER_TAG]))
+    assert timer.ttft_ms is not None
+
+
+class State(TypedDict):
+    answer: str
+
+
+def test_reset_and_final_events_reach_the_custom_stream():
+    def node(state: State):
+        emit_reset_event("hallucination")
+        emit_final_event(["a.pdf"], ["https://a"], 12.0)
+        return {"answer": "ok"}
+
+    workflow = StateGraph(State)
+    workflow.add_node("node", node)
+    workflow.set_entry_point("node")
+    events = list(workflow.compile().stream({"answer": ""}, stream_mode="custom"))
+    assert events == [
+        {"event": "reset", "reason": "hallucination"},
+        {"event": "final", "sources": ["a.pdf"], "links": ["https://a"], "ttft_ms": 12.0},
+    ]
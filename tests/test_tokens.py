@@ -0,0 +1,26 @@
+import tiktoken
+
+from common import tokens
+
+
+def test_missing_vocabulary_falls_back_to_a_character_estimate(monkeypatch):
+    def unavailable(name):
+        raise ConnectionError("no network")
+
+    monkeypatch.setattr(tiktoken, "get_encoding", unavailable)
+    tokens.get_encoder.cache_clear()
+    try:
+        assert tokens.get_encoder() is None
+        assert tokens.count_tokens("x" * 40) == 11
+    finally:
+        tokens.get_encoder.cache_clear()
+
+
+def test_special_tokens_in_user_text_are_counted_as_text(monkeypatch):
+    class Encoder:
+        def encode(self, text, disallowed_special=("all",)):
+            assert disallowed_special == ()
+            return text.split()
+
+    monkeypatch.setattr(tokens, "get_encoder", lambda: Encoder())
+    assert tokens.count_tokens("hola <|endoftext|> mundo") == 3